@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 10:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('authentication', '0006_customuser_virtual_account_reference'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(fields=['date_joined'], name='custom_user_date_jo_505063_idx'),
+        ),
+    ]
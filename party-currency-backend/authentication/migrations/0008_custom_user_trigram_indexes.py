@@ -0,0 +1,40 @@
+# Generated by Django 5.1.7 on 2026-10-18 10:53
+
+from django.db import migrations
+
+# Trigram indexes behind the admin user search, see party_currency_admin.search.
+# Only PostgreSQL has them; on other databases the search falls back to icontains.
+FORWARD_SQL = [
+    "CREATE INDEX custom_user_username_trgm_idx ON custom_user USING gin (username gin_trgm_ops)",
+    "CREATE INDEX custom_user_email_trgm_idx ON custom_user USING gin (email gin_trgm_ops)",
+    "CREATE INDEX custom_user_first_name_trgm_idx ON custom_user USING gin (first_name gin_trgm_ops)",
+    "CREATE INDEX custom_user_last_name_trgm_idx ON custom_user USING gin (last_name gin_trgm_ops)",
+]
+REVERSE_SQL = [
+    "DROP INDEX IF EXISTS custom_user_last_name_trgm_idx",
+    "DROP INDEX IF EXISTS custom_user_first_name_trgm_idx",
+    "DROP INDEX IF EXISTS custom_user_email_trgm_idx",
+    "DROP INDEX IF EXISTS custom_user_username_trgm_idx",
+]
+
+
+def _run_on_postgresql(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0007_customuser_custom_user_date_jo_505063_idx'),
+        # Installs pg_trgm
+        ('events', '0009_events_search_vector'),
+    ]
+
+    operations = [
+        migrations.RunPython(_run_on_postgresql(FORWARD_SQL), _run_on_postgresql(REVERSE_SQL)),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.1.7 on 2026-10-18 11:01
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+BATCH_SIZE = 1000
+
+
+def backfill_spend(apps, schema_editor):
+    """Recount every user's successful spend, which older checkouts may not have added"""
+    CustomUser = apps.get_model('authentication', 'CustomUser')
+    Transaction = apps.get_model('payment', 'Transaction')
+    totals = (
+        Transaction.objects.filter(status='successful').order_by()
+        .values('customer_email').annotate(total=Sum('amount'), count=Count('pk'))
+    )
+    totals = {row['customer_email']: row for row in totals.iterator()}
+    emails = list(totals)
+    for start in range(0, len(emails), BATCH_SIZE):
+        users = list(CustomUser.objects.filter(email__in=emails[start:start + BATCH_SIZE]))
+        for user in users:
+            user.total_amount_spent = totals[user.email]['total']
+            user.successful_transactions = totals[user.email]['count']
+        CustomUser.objects.bulk_update(users, ['total_amount_spent', 'successful_transactions'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('authentication', '0008_custom_user_trigram_indexes'),
+        ('payment', '0011_transaction_payment_tra_custome_31fad6_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='successful_transactions',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(fields=['total_amount_spent', 'id'], name='custom_user_total_a_c05113_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(fields=['successful_transactions', 'id'], name='custom_user_success_39e835_idx'),
+        ),
+        migrations.RunPython(backfill_spend, migrations.RunPython.noop),
+    ]
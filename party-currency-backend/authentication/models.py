@@ -12,6 +12,8 @@ class CustomUser(AbstractUser):
     business_type = models.CharField(max_length=100, blank=True, null=True)
     type = models.CharField(max_length=50, default="user")
     total_amount_spent = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    # Kept with total_amount_spent by payment.services.settle_transaction
+    successful_transactions = models.IntegerField(default=0)
     profile_picture = models.TextField(validators=[FileExtensionValidator(['png', 'jpg', 'jpeg'])], blank=True, null=True)
     virtual_account_reference = models.CharField(max_length=20,null=True,unique=True)
     groups = models.ManyToManyField(
@@ -34,6 +36,13 @@ class CustomUser(AbstractUser):
 
     class Meta:
         db_table = 'custom_user'  # Explicit table name
+        indexes = [
+            # Scanned by the admin analytics rollups, see party_currency_admin.rollups
+            models.Index(fields=['date_joined']),
+            # Spend sorts of the admin user listing
+            models.Index(fields=['total_amount_spent', 'id']),
+            models.Index(fields=['successful_transactions', 'id']),
+        ]
 
 
 class Merchant(CustomUser):
@@ -115,7 +115,7 @@ def google_callback(request):
         
         # Update last login
         user.last_login = timezone.now()
-        user.save()
+        user.save(update_fields=['last_login'])
         
         # Create or get token for the user
         token, _ = Token.objects.get_or_create(user=user)
@@ -163,7 +163,7 @@ def login(request):
         
         # Update last login
         user.last_login = timezone.now()
-        user.save()
+        user.save(update_fields=['last_login'])
         
         token, _ = Token.objects.get_or_create(user=user)
         if user.is_superuser:
@@ -344,7 +344,7 @@ def reset_password(request):
 
         user = request.user
         user.set_password(new_password)
-        user.save()
+        user.save(update_fields=['password'])
 
         # Optionally invalidate all tokens after password reset
         Token.objects.filter(user=user).delete()
@@ -376,7 +376,7 @@ def change_password(request):
         }, status=status.HTTP_400_BAD_REQUEST)
 
     user.set_password(request.data['confirmpassword'])
-    user.save()
+    user.save(update_fields=['password'])
     return Response ({
             "message":"password changed successfully"
         },status=status.HTTP_200_OK)
\ No newline at end of file
@@ -0,0 +1,73 @@
+"""
+Measure the per-call overhead of obtaining a Google Drive service object.
+
+Compares the old path (parse GOOGLE_SERVICE_ACCOUNT, build credentials and
+build the Drive resource on every call) with the cached get_drive_service().
+A throwaway service account key is generated, so no Google project or network
+access is needed.
+
+    python -m benchmarks.bench_drive_service --calls 200
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def throwaway_service_account():
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    ).decode()
+    return json.dumps({
+        'type': 'service_account',
+        'project_id': 'bench',
+        'private_key_id': 'bench',
+        'private_key': pem,
+        'client_email': 'bench@bench.iam.gserviceaccount.com',
+        'client_id': '0',
+        'token_uri': 'https://oauth2.googleapis.com/token',
+    })
+
+
+def time_calls(label, call, calls):
+    started = time.perf_counter()
+    for _ in range(calls):
+        call()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<32}{elapsed / calls * 1000:>10.3f} ms/call")
+    return elapsed / calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Drive service construction")
+    parser.add_argument('--calls', type=int, default=100)
+    args = parser.parse_args()
+
+    os.environ['GOOGLE_SERVICE_ACCOUNT'] = throwaway_service_account()
+
+    import logging
+    from googleapiclient.discovery import build
+    from google_drive import utils
+
+    logging.getLogger("google_drive_utils").setLevel(logging.WARNING)
+
+    def uncached():
+        build('drive', 'v3', credentials=utils.authenticate(), cache_discovery=False, static_discovery=True)
+
+    before = time_calls("authenticate() + build() per call", uncached, args.calls)
+    utils.get_drive_service()
+    after = time_calls("cached get_drive_service()", utils.get_drive_service, args.calls)
+    print(f"speed-up: {before / after:,.0f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""
+Measure sustained ID generation rate and check uniqueness and ordering.
+
+Generates IDs from several threads and several forked processes at once, then
+verifies no duplicates were issued and that each thread's IDs are increasing.
+
+    python -m benchmarks.bench_ids --threads 8 --processes 4 --count 200000
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from party_currency_backend.ids import EVENT_ID_PREFIX, generate_id  # noqa: E402
+
+
+def generate_batch(count):
+    ids = [generate_id(EVENT_ID_PREFIX) for _ in range(count)]
+    return ids, all(a < b for a, b in zip(ids, ids[1:]))
+
+
+def run_process(threads, count):
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        results = list(executor.map(generate_batch, [count] * threads))
+    return [i for ids, _ in results for i in ids], all(ordered for _, ordered in results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the shared ID service")
+    parser.add_argument('--threads', type=int, default=8, help="Threads per process")
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--count', type=int, default=100000, help="IDs per thread")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    single = [generate_id(EVENT_ID_PREFIX) for _ in range(args.count)]
+    single_elapsed = time.perf_counter() - started
+    print(f"single thread: {args.count / single_elapsed:,.0f} ids/s, e.g. {single[-1]} ({len(single[-1])} chars)")
+
+    started = time.perf_counter()
+    context = multiprocessing.get_context('fork')
+    with context.Pool(args.processes) as pool:
+        results = pool.starmap(run_process, [(args.threads, args.count)] * args.processes)
+    elapsed = time.perf_counter() - started
+
+    all_ids = [i for ids, _ in results for i in ids]
+    duplicates = len(all_ids) - len(set(all_ids))
+    ordered = all(ordered for _, ordered in results)
+    print(
+        f"{args.processes} processes x {args.threads} threads: {len(all_ids):,} ids in {elapsed:.2f}s "
+        f"({len(all_ids) / elapsed:,.0f} ids/s), {duplicates} duplicates, "
+        f"per-thread order {'ok' if ordered else 'BROKEN'}"
+    )
+    if duplicates or not ordered:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
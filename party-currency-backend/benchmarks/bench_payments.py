@@ -0,0 +1,248 @@
+"""
+Load test the payment and reserved-account views against the fake Monnify.
+
+Starts the simulator in-process, seeds throwaway users and events, then drives
+the real Django views from a thread pool and reports latency percentiles per
+step. Scenarios:
+
+    checkout   payments/create-transaction -> payments/pay -> payments/callback
+    webhook    signed SUCCESSFUL_TRANSACTION to payments/webhook
+    reserved   merchant/create-reserved-account -> merchant/transactions
+               -> merchant/delete-reserved-account
+
+Example:
+
+    python -m benchmarks.bench_payments --concurrency 32 --iterations 500 --latency-ms 80 --error-rate 0.01
+
+Set BENCH_DATABASE_URL to run against PostgreSQL instead of SQLite.
+"""
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_monnify import (  # noqa: E402
+    SimulatorConfig, build_transaction_webhook, sign_webhook, start_in_background,
+)
+
+BENCH_PREFIX = 'BENCH'
+SCENARIOS = ('checkout', 'webhook', 'reserved')
+
+
+class Recorder:
+    """Thread-safe latency and status collector keyed by step name"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+
+    def record(self, step, status_code, seconds):
+        with self.lock:
+            self.latencies[step].append(seconds)
+            self.statuses[step][status_code] += 1
+
+    def timed(self, step, call):
+        started = time.perf_counter()
+        response = call()
+        self.record(step, response.status_code, time.perf_counter() - started)
+        return response
+
+    def report(self, elapsed):
+        print(f"\n{'step':<28}{'count':>7}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}  statuses")
+        for step, samples in self.latencies.items():
+            ordered = sorted(samples)
+            print(
+                f"{step:<28}{len(ordered):>7}"
+                f"{percentile(ordered, 50):>9.1f}{percentile(ordered, 95):>9.1f}"
+                f"{percentile(ordered, 99):>9.1f}{ordered[-1] * 1000:>9.1f}  "
+                f"{dict(self.statuses[step])}"
+            )
+        total = sum(len(samples) for samples in self.latencies.values())
+        print(f"\n{total} requests in {elapsed:.2f}s ({total / elapsed:.1f} req/s)")
+
+
+def percentile(ordered, pct):
+    if not ordered:
+        return 0.0
+    if len(ordered) == 1:
+        return ordered[0] * 1000
+    return statistics.quantiles(ordered, n=100, method='inclusive')[pct - 1] * 1000
+
+
+def new_reference():
+    # Fits CustomUser.virtual_account_reference (max 20 chars)
+    return f"{BENCH_PREFIX}{uuid.uuid4().hex[:15].upper()}"
+
+
+def seed_user(index):
+    from authentication.models import CustomUser
+
+    email = f"bench-{index}@bench.invalid"
+    user, _ = CustomUser.objects.get_or_create(
+        email=email,
+        defaults={'username': email, 'first_name': 'Bench', 'last_name': str(index)}
+    )
+    return user
+
+
+def seed_event(user):
+    from events.models import Events
+
+    today = date.today()
+    return Events.objects.create(
+        event_id=new_reference(),
+        event_name='Benchmark event',
+        event_author=user.email,
+        start_date=today,
+        end_date=today + timedelta(days=1),
+        delivery_address='Benchmark',
+    )
+
+
+def run_checkout(client, user, recorder):
+    event = seed_event(user)
+    response = recorder.timed('checkout:create-transaction', lambda: client.post(
+        '/payments/create-transaction', {'event_id': event.event_id}, format='json'
+    ))
+    if response.status_code != 200:
+        return
+    payment_reference = response.json()['payment_reference']
+    recorder.timed('checkout:pay', lambda: client.post(
+        '/payments/pay', {'payment_reference': payment_reference}, format='json'
+    ))
+    recorder.timed('checkout:callback', lambda: client.get(
+        '/payments/callback', {'paymentReference': payment_reference}
+    ))
+
+
+def run_webhook(client, user, recorder, secret_key):
+    from payment.models import Transaction
+
+    event = seed_event(user)
+    payment_reference = new_reference()
+    transaction = Transaction.objects.create(
+        amount=1700,
+        customer_email=user.email,
+        payment_reference=payment_reference,
+        transaction_reference=f"MNFY|{payment_reference}",
+        event_id=event.event_id,
+        user_id=user.email,
+    )
+    body = build_transaction_webhook(payment_reference, transaction.transaction_reference, transaction.amount)
+    recorder.timed('webhook:deliver', lambda: client.generic(
+        'POST', '/payments/webhook', body, content_type='application/json',
+        HTTP_MONNIFY_SIGNATURE=sign_webhook(body, secret_key)
+    ))
+
+
+def run_reserved(client, user, recorder):
+    event = seed_event(user)
+    response = recorder.timed('reserved:create', lambda: client.post(
+        '/merchant/create-reserved-account',
+        {'event_id': event.event_id, 'customer_name': 'Bench User', 'bvn': '22222222222'},
+        format='json'
+    ))
+    if response.status_code != 200:
+        return
+    recorder.timed('reserved:transactions', lambda: client.get(
+        '/merchant/transactions', {'account_reference': event.event_id}
+    ))
+    recorder.timed('reserved:delete', lambda: client.delete(
+        f"/merchant/delete-reserved-account?account_reference={event.event_id}"
+    ))
+
+
+def cleanup():
+    from authentication.models import CustomUser
+    from events.models import Events
+    from merchant.models import ReservedAccountSyncState, ReservedAccountTransaction
+    from payment.models import Transaction, WebhookEvent
+
+    bench_events = Events.objects.filter(event_id__startswith=BENCH_PREFIX)
+    Transaction.objects.filter(event_id__in=bench_events.values('event_id')).delete()
+    WebhookEvent.objects.filter(reference__contains=BENCH_PREFIX).delete()
+    ReservedAccountTransaction.objects.filter(account_reference__startswith=BENCH_PREFIX).delete()
+    ReservedAccountSyncState.objects.filter(account_reference__startswith=BENCH_PREFIX).delete()
+    bench_events.delete()
+    CustomUser.objects.filter(email__endswith='@bench.invalid').delete()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark payment views against a fake Monnify")
+    parser.add_argument('--scenario', choices=SCENARIOS + ('all',), default='all')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--iterations', type=int, default=200, help="Iterations per scenario")
+    parser.add_argument('--latency-ms', type=float, default=50)
+    parser.add_argument('--jitter-ms', type=float, default=20)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--paid-rate', type=float, default=1.0)
+    parser.add_argument('--transactions-per-account', type=int, default=50)
+    parser.add_argument('--keep-data', action='store_true', help="Leave seeded rows in the database")
+    args = parser.parse_args()
+
+    os.environ.setdefault('MONNIFY_API_KEY', 'fake-api-key')
+    os.environ.setdefault('MONNIFY_SECRET_KEY', 'fake-secret-key')
+    config = SimulatorConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        paid_rate=args.paid_rate,
+        transactions_per_account=args.transactions_per_account,
+    )
+    simulator = start_in_background(config)
+    os.environ['MONNIFY_BASE_URL'] = simulator.base_url
+    os.environ['DJANGO_SETTINGS_MODULE'] = 'benchmarks.settings'
+
+    import django
+    django.setup()
+
+    from django.core.management import call_command
+    from django.db import connection
+    from rest_framework.test import APIClient
+
+    call_command('migrate', verbosity=0)
+
+    users = [seed_user(index) for index in range(args.concurrency)]
+
+    def worker(scenario, index):
+        try:
+            user = users[index % len(users)]
+            client = APIClient(raise_request_exception=False)
+            client.force_authenticate(user)
+            if scenario == 'checkout':
+                run_checkout(client, user, recorder)
+            elif scenario == 'webhook':
+                run_webhook(client, user, recorder, config.secret_key)
+            else:
+                run_reserved(client, user, recorder)
+        finally:
+            connection.close()
+
+    scenarios = SCENARIOS if args.scenario == 'all' else (args.scenario,)
+    print(f"Fake Monnify at {simulator.base_url}, {args.concurrency} workers, {args.iterations} iterations per scenario")
+
+    recorder = Recorder()
+    started = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            for scenario in scenarios:
+                list(executor.map(lambda i: worker(scenario, i), range(args.iterations)))
+        recorder.report(time.perf_counter() - started)
+        print(f"Simulator calls: {simulator.state.request_counts}")
+    finally:
+        simulator.shutdown()
+        if not args.keep_data:
+            cleanup()
+
+
+if __name__ == '__main__':
+    main()
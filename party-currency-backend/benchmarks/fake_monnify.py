@@ -0,0 +1,430 @@
+"""
+Local stand-in for the Monnify API, for load testing without the sandbox.
+
+Covers the endpoints the backend calls: auth/login, init-transaction,
+transactions/query, reserved-account create/delete/transactions. It can also
+emit signed SUCCESSFUL_TRANSACTION webhooks for initialised checkouts.
+
+Run it and point the backend at it:
+
+    python -m benchmarks.fake_monnify --port 8765 --latency-ms 80 --error-rate 0.02
+    MONNIFY_BASE_URL=http://127.0.0.1:8765 python manage.py runserver
+
+Use the same MONNIFY_API_KEY/MONNIFY_SECRET_KEY on both sides; the secret
+signs emitted webhooks exactly like Monnify does (HMAC-SHA512 of the body).
+"""
+import argparse
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from urllib.request import Request, urlopen
+
+logger = logging.getLogger(__name__)
+
+TOKEN_TTL_SECONDS = 3600
+
+
+class SimulatorConfig:
+    """Knobs controlling how the fake provider behaves"""
+
+    def __init__(self, latency_ms=0, jitter_ms=0, error_rate=0.0, paid_rate=1.0,
+                 transactions_per_account=50, max_page_size=100, description_bytes=32,
+                 webhook_url=None, webhook_delay_ms=0, api_key=None, secret_key=None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.paid_rate = paid_rate
+        self.transactions_per_account = transactions_per_account
+        self.max_page_size = max_page_size
+        self.description_bytes = description_bytes
+        self.webhook_url = webhook_url
+        self.webhook_delay_ms = webhook_delay_ms
+        self.api_key = api_key if api_key is not None else os.getenv('MONNIFY_API_KEY', 'fake-api-key')
+        self.secret_key = secret_key if secret_key is not None else os.getenv('MONNIFY_SECRET_KEY', 'fake-secret-key')
+
+
+def sign_webhook(body, secret_key):
+    """Signature Monnify sends in the monnify-signature header"""
+    return hmac.new(secret_key.encode(), body, hashlib.sha512).hexdigest()
+
+
+def build_transaction_webhook(payment_reference, transaction_reference, amount, reserved_account=None):
+    """
+    Build a SUCCESSFUL_TRANSACTION notification body.
+
+    Args:
+        reserved_account (Optional[str]): Account reference, for reserved-account inflows
+    """
+    event_data = {
+        'transactionReference': transaction_reference,
+        'paymentReference': payment_reference,
+        'amountPaid': str(amount),
+        'totalPayable': str(amount),
+        'paidOn': datetime.now().strftime('%d/%m/%Y %I:%M:%S %p'),
+        'paymentStatus': 'PAID',
+        'paymentDescription': 'Simulated payment',
+        'paymentMethod': 'ACCOUNT_TRANSFER' if reserved_account else 'CARD',
+        'currency': 'NGN',
+        'product': {
+            'type': 'RESERVED_ACCOUNT' if reserved_account else 'WEB_SDK',
+            'reference': reserved_account or payment_reference,
+        },
+    }
+    return json.dumps({'eventType': 'SUCCESSFUL_TRANSACTION', 'eventData': event_data}).encode()
+
+
+class FakeMonnifyState:
+    """In-memory provider state shared by all handler threads"""
+
+    def __init__(self, config):
+        self.config = config
+        self.lock = threading.Lock()
+        self.tokens = {}
+        self.transactions = {}
+        self.reserved_accounts = {}
+        self.request_counts = {}
+        self.webhook_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="fake-monnify-webhook")
+
+    def count(self, endpoint):
+        with self.lock:
+            self.request_counts[endpoint] = self.request_counts.get(endpoint, 0) + 1
+
+    def issue_token(self):
+        token = uuid.uuid4().hex
+        with self.lock:
+            self.tokens[token] = time.time() + TOKEN_TTL_SECONDS
+        return token
+
+    def token_valid(self, token):
+        with self.lock:
+            expires_at = self.tokens.get(token)
+        return expires_at is not None and expires_at > time.time()
+
+    def account_transactions(self, account_reference):
+        """Deterministic inflow history for an account, newest first"""
+        rng = random.Random(account_reference)
+        now = datetime.now().replace(microsecond=0)
+        description = ('x' * self.config.description_bytes)
+        history = []
+        for i in range(self.config.transactions_per_account):
+            history.append({
+                'paymentReference': f"MNFY|{account_reference}|{i}",
+                'transactionReference': f"MNFY|{account_reference}|T{i}",
+                'amount': rng.randint(100, 50000),
+                'currencyCode': 'NGN',
+                'paymentStatus': 'PAID',
+                'paymentMethod': 'ACCOUNT_TRANSFER',
+                'paymentDescription': description,
+                'completedOn': (now - timedelta(minutes=i * 7)).isoformat(),
+            })
+        return history
+
+    def emit_webhook(self, body):
+        if not self.config.webhook_url:
+            return
+        self.webhook_executor.submit(self._post_webhook, body)
+
+    def _post_webhook(self, body):
+        if self.config.webhook_delay_ms:
+            time.sleep(self.config.webhook_delay_ms / 1000)
+        request = Request(self.config.webhook_url, data=body, method='POST', headers={
+            'Content-Type': 'application/json',
+            'monnify-signature': sign_webhook(body, self.config.secret_key),
+        })
+        try:
+            with urlopen(request, timeout=10) as response:
+                response.read()
+        except Exception as e:
+            logger.warning(f"Webhook delivery to {self.config.webhook_url} failed: {str(e)}")
+
+
+class FakeMonnifyHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'FakeMonnify/1.0'
+
+    @property
+    def state(self):
+        return self.server.state
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    # Plumbing
+
+    def _send(self, code, body):
+        payload = json.dumps(body).encode()
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _ok(self, response_body):
+        self._send(200, {
+            'requestSuccessful': True,
+            'responseMessage': 'success',
+            'responseCode': '0',
+            'responseBody': response_body,
+        })
+
+    def _fail(self, code, message, response_code='99'):
+        self._send(code, {
+            'requestSuccessful': False,
+            'responseMessage': message,
+            'responseCode': response_code,
+        })
+
+    def _read_json(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length) if length else b''
+        try:
+            return json.loads(raw or b'{}')
+        except ValueError:
+            return {}
+
+    def _simulate_conditions(self):
+        """Apply latency and random failures; returns True if a failure was sent"""
+        config = self.state.config
+        delay = config.latency_ms + (random.uniform(0, config.jitter_ms) if config.jitter_ms else 0)
+        if delay:
+            time.sleep(delay / 1000)
+        if config.error_rate and random.random() < config.error_rate:
+            self._fail(503, 'Simulated provider failure')
+            return True
+        return False
+
+    def _authorised(self):
+        auth = self.headers.get('Authorization', '')
+        if auth.startswith('Bearer ') and self.state.token_valid(auth[len('Bearer '):]):
+            return True
+        self._fail(401, 'Unauthorized', response_code='401')
+        return False
+
+    def _dispatch(self, method):
+        parsed = urlparse(self.path)
+        path = parsed.path.rstrip('/')
+        query = {key: values[0] for key, values in parse_qs(parsed.query).items()}
+
+        routes = [
+            ('POST', '/api/v1/auth/login', self.login, False),
+            ('POST', '/api/v1/merchant/transactions/init-transaction', self.init_transaction, True),
+            ('GET', '/api/v2/merchant/transactions/query', self.query_transaction, True),
+            ('POST', '/api/v2/bank-transfer/reserved-accounts', self.create_reserved_account, True),
+            ('GET', '/api/v1/bank-transfer/reserved-accounts/transactions', self.reserved_account_transactions, True),
+        ]
+        handler = None
+        for route_method, route_path, route_handler, authenticated in routes:
+            if route_method == method and route_path == path:
+                handler = route_handler
+                break
+        if handler is None and method == 'DELETE' and path.startswith('/api/v1/bank-transfer/reserved-accounts/reference/'):
+            handler = self.delete_reserved_account
+            authenticated = True
+            query['accountReference'] = path.rsplit('/', 1)[-1]
+        if handler is None:
+            self._fail(404, f"No route for {method} {path}")
+            return
+
+        self.state.count(handler.__name__)
+        if self._simulate_conditions():
+            return
+        if authenticated and not self._authorised():
+            return
+        handler(query)
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def do_DELETE(self):
+        self._dispatch('DELETE')
+
+    # Endpoints
+
+    def login(self, query):
+        config = self.state.config
+        expected = base64.b64encode(f"{config.api_key}:{config.secret_key}".encode()).decode()
+        self._read_json()
+        if self.headers.get('Authorization') != f"Basic {expected}":
+            self._fail(401, 'Invalid client credentials', response_code='401')
+            return
+        self._ok({'accessToken': self.state.issue_token(), 'expiresIn': TOKEN_TTL_SECONDS})
+
+    def init_transaction(self, query):
+        data = self._read_json()
+        payment_reference = data.get('paymentReference')
+        if not payment_reference:
+            self._fail(400, 'paymentReference is required')
+            return
+        transaction_reference = f"MNFY|{uuid.uuid4().hex[:20].upper()}"
+        paid = random.random() < self.state.config.paid_rate
+        with self.state.lock:
+            self.state.transactions[payment_reference] = {
+                'transactionReference': transaction_reference,
+                'amount': data.get('amount', 0),
+                'paymentStatus': 'PAID' if paid else 'FAILED',
+            }
+        if paid:
+            self.state.emit_webhook(build_transaction_webhook(
+                payment_reference, transaction_reference, data.get('amount', 0)
+            ))
+        self._ok({
+            'transactionReference': transaction_reference,
+            'paymentReference': payment_reference,
+            'merchantName': 'Fake Monnify',
+            'enabledPaymentMethod': data.get('paymentMethods', []),
+            'checkoutUrl': f"http://{self.headers.get('Host')}/checkout/{transaction_reference}",
+        })
+
+    def query_transaction(self, query):
+        payment_reference = query.get('paymentReference')
+        with self.state.lock:
+            transaction = self.state.transactions.get(payment_reference)
+        if transaction is None:
+            self._fail(404, f"Transaction with reference {payment_reference} not found")
+            return
+        self._ok({
+            'transactionReference': transaction['transactionReference'],
+            'paymentReference': payment_reference,
+            'amountPaid': str(transaction['amount']),
+            'paymentStatus': transaction['paymentStatus'],
+        })
+
+    def create_reserved_account(self, query):
+        data = self._read_json()
+        account_reference = data.get('accountReference')
+        if not account_reference:
+            self._fail(400, 'accountReference is required')
+            return
+        with self.state.lock:
+            if account_reference in self.state.reserved_accounts:
+                exists = True
+            else:
+                exists = False
+                self.state.reserved_accounts[account_reference] = data
+        if exists:
+            self._fail(422, 'You cannot reserve more than one account with the same reference', response_code='99')
+            return
+        self._ok({
+            'contractCode': data.get('contractCode'),
+            'accountReference': account_reference,
+            'accountName': data.get('accountName', ''),
+            'currencyCode': data.get('currencyCode', 'NGN'),
+            'customerEmail': data.get('customerEmail', ''),
+            'customerName': data.get('customerName', ''),
+            'accounts': [{
+                'bankCode': '035',
+                'bankName': 'Wema bank',
+                'accountNumber': str(random.randint(10 ** 9, 10 ** 10 - 1)),
+                'accountName': data.get('accountName', ''),
+            }],
+            'reservationReference': uuid.uuid4().hex[:20].upper(),
+            'reservedAccountType': 'GENERAL',
+            'status': 'ACTIVE',
+            'createdOn': datetime.now().strftime('%Y-%m-%d %H:%M:%S.0'),
+        })
+
+    def delete_reserved_account(self, query):
+        account_reference = query.get('accountReference')
+        with self.state.lock:
+            account = self.state.reserved_accounts.pop(account_reference, None)
+        if account is None:
+            self._fail(404, f"Reserved account with reference {account_reference} does not exist")
+            return
+        self._ok({'accountReference': account_reference, 'status': 'DEACTIVATED'})
+
+    def reserved_account_transactions(self, query):
+        account_reference = query.get('accountReference')
+        try:
+            page = max(int(query.get('page', 0)), 0)
+            size = min(max(int(query.get('size', 10)), 1), self.state.config.max_page_size)
+        except ValueError:
+            self._fail(400, 'Invalid page or size')
+            return
+        history = self.state.account_transactions(account_reference)
+        content = history[page * size:(page + 1) * size]
+        total_pages = (len(history) + size - 1) // size
+        self._ok({
+            'content': content,
+            'number': page,
+            'size': size,
+            'totalElements': len(history),
+            'totalPages': total_pages,
+            'last': page >= total_pages - 1,
+        })
+
+
+class FakeMonnifyServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, address, config):
+        super().__init__(address, FakeMonnifyHandler)
+        self.state = FakeMonnifyState(config)
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def start_in_background(config, host='127.0.0.1', port=0):
+    """Start a simulator on a daemon thread and return the server"""
+    server = FakeMonnifyServer((host, port), config)
+    threading.Thread(target=server.serve_forever, name="fake-monnify", daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local fake Monnify API")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency-ms', type=float, default=0, help="Fixed delay added to every response")
+    parser.add_argument('--jitter-ms', type=float, default=0, help="Random extra delay up to this value")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of calls answered with 503")
+    parser.add_argument('--paid-rate', type=float, default=1.0, help="Fraction of checkouts that end up PAID")
+    parser.add_argument('--transactions-per-account', type=int, default=50)
+    parser.add_argument('--max-page-size', type=int, default=100)
+    parser.add_argument('--description-bytes', type=int, default=32, help="Size of each transaction description")
+    parser.add_argument('--webhook-url', help="Backend webhook URL, e.g. http://127.0.0.1:8000/payments/webhook")
+    parser.add_argument('--webhook-delay-ms', type=float, default=0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    config = SimulatorConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        paid_rate=args.paid_rate,
+        transactions_per_account=args.transactions_per_account,
+        max_page_size=args.max_page_size,
+        description_bytes=args.description_bytes,
+        webhook_url=args.webhook_url,
+        webhook_delay_ms=args.webhook_delay_ms,
+    )
+    server = FakeMonnifyServer((args.host, args.port), config)
+    logger.info(f"Fake Monnify listening on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        logger.info(f"Requests served: {server.state.request_counts}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,27 @@
+"""
+Settings for running benchmarks against the fake Monnify server.
+
+Uses BENCH_DATABASE_URL when set (point it at a disposable PostgreSQL database
+for realistic numbers), otherwise a local SQLite file. Celery tasks run eagerly
+so webhook processing happens inside the measured request.
+"""
+import os
+
+import dj_database_url
+
+from party_currency_backend.settings import *  # noqa: F401,F403
+
+if os.getenv('BENCH_DATABASE_URL'):
+    DATABASES = {'default': dj_database_url.parse(os.getenv('BENCH_DATABASE_URL'), conn_max_age=600)}
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.path.join(os.path.dirname(__file__), 'bench.sqlite3'),
+            'OPTIONS': {'timeout': 30},
+        }
+    }
+
+CELERY_TASK_ALWAYS_EAGER = True
+MONNIFY_BASE_URL = os.getenv('MONNIFY_BASE_URL')
+MONNIFY_CONTRACT_CODE = os.getenv('MONNIFY_CONTRACT_CODE', 'FAKECONTRACT')
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class CurrenciesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'currencies'
+
+    def ready(self):
+        # Fail `check --deploy` when workers cannot read staged uploads
+        from . import checks  # noqa: F401
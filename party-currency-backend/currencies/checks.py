@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core.checks import Error, register
+from django.core.files.storage import FileSystemStorage
+
+
+@register(deploy=True)
+def check_staging_storage(app_configs, **kwargs):
+    """Staged currency images are written by the web process and read by Celery workers"""
+    from .images import STAGING_STORAGE, staging_storage
+
+    if getattr(settings, 'CELERY_TASK_ALWAYS_EAGER', False) or settings.CURRENCY_STAGING_SHARED_FILESYSTEM:
+        return []
+    if not isinstance(staging_storage(), FileSystemStorage):
+        return []
+    return [Error(
+        f"The '{STAGING_STORAGE}' storage is a local directory, which Celery workers on other "
+        "hosts or containers cannot read; staged currency images would never be uploaded.",
+        hint="Set CURRENCY_STAGING_STORAGE to a shared backend such as 'storages.backends.s3.S3Storage', "
+             "or set CURRENCY_STAGING_SHARED_FILESYSTEM=True if web and workers share the directory.",
+        id='currencies.E001',
+    )]
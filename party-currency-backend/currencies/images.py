@@ -0,0 +1,188 @@
+import logging
+import mimetypes
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.core.files.storage import storages
+from django.db import transaction as db_transaction
+from django.utils import timezone
+
+from media_storage import get_storage, storage_for_reference
+from party_currency_backend.ids import generate_id
+from .models import Currency
+
+logger = logging.getLogger(__name__)
+
+ASSET_TYPE = 'currency_images'
+IMAGE_TYPES = ('front_image', 'back_image')
+STAGING_DIR = 'currency_uploads'
+# Pending currencies untouched for this long are re-queued by the sweeper
+STALLED_AFTER = timedelta(minutes=15)
+# STORAGES alias the web process stages uploads in and the worker reads them from
+STAGING_STORAGE = 'currency_staging'
+
+
+def staging_storage():
+    """The storage staged uploads live in; it must be reachable from web and worker hosts"""
+    return storages[STAGING_STORAGE]
+
+
+def _staging_dir(currency_id):
+    return f"{STAGING_DIR}/{currency_id}"
+
+
+def stage_image(currency_id, image_type, image_file):
+    """
+    Save an uploaded image to the staging storage until the worker moves it to storage.
+
+    The name carries a k-sortable ID, so the newest staged file per image type
+    wins when the design is updated again before an earlier upload finished.
+
+    Returns:
+        str: The staged path
+    """
+    extension = os.path.splitext(image_file.name)[1]
+    name = f"{_staging_dir(currency_id)}/{image_type}_{generate_id()}{extension}"
+    return staging_storage().save(name, image_file)
+
+
+def _latest_staged(currency_id):
+    """Return {image_type: path} for the newest staged file of each type"""
+    try:
+        _, file_names = staging_storage().listdir(_staging_dir(currency_id))
+    except FileNotFoundError:
+        return {}
+    latest = {}
+    for file_name in sorted(file_names):
+        for image_type in IMAGE_TYPES:
+            if file_name.startswith(f"{image_type}_"):
+                latest[image_type] = f"{_staging_dir(currency_id)}/{file_name}"
+    return latest
+
+
+def enqueue_currency_images(currency_id, staged):
+    """Queue the upload once the currency row is committed; the sweeper covers a down broker"""
+    from .tasks import upload_currency_images_task
+
+    def send():
+        try:
+            upload_currency_images_task.delay(currency_id, staged)
+        except Exception as e:
+            logger.error(f"Could not queue image upload for currency {currency_id}: {str(e)}")
+
+    db_transaction.on_commit(send)
+
+
+def _upload_staged(currency_id, image_type, path):
+    """Store a staged image in the currency image backend and return its reference"""
+    storage = get_storage(ASSET_TYPE)
+    file_name = f"{currency_id}_{image_type}{os.path.splitext(path)[1]}"
+    with staging_storage().open(path, 'rb') as f:
+        key = storage.put(f, file_name, mimetypes.guess_type(path)[0])
+    return storage.reference(key)
+
+
+def _release(reference):
+    """Drop an image the currency no longer points at"""
+    if not reference:
+        return
+    storage, key = storage_for_reference(reference, ASSET_TYPE)
+    if storage is None:
+        return
+    try:
+        storage.delete(key)
+    except Exception as e:
+        logger.warning(f"Could not delete replaced image {reference}: {str(e)}")
+
+
+def upload_currency_images(currency_id, staged):
+    """
+    Upload a currency's staged images to storage concurrently and store the URLs.
+
+    Each image is applied as soon as its upload succeeds and its staged file is
+    removed, so a retry only re-sends the images that failed. A result is
+    dropped if a newer file for the same image type was staged meanwhile.
+
+    Args:
+        currency_id (str): The currency the images belong to
+        staged (dict): {image_type: staged path} as returned by stage_image
+
+    Raises:
+        Exception: The first upload error, after the successful uploads are saved
+    """
+    pending = {image_type: path for image_type, path in staged.items() if staging_storage().exists(path)}
+
+    def upload(item):
+        image_type, path = item
+        try:
+            return image_type, path, _upload_staged(currency_id, image_type, path), None
+        except Exception as e:
+            return image_type, path, None, e
+
+    errors = []
+    if pending:
+        with ThreadPoolExecutor(max_workers=len(pending), thread_name_prefix="currency-images") as executor:
+            results = list(executor.map(upload, pending.items()))
+
+        latest = _latest_staged(currency_id)
+        for image_type, path, reference, error in results:
+            if error is not None:
+                logger.warning(f"Uploading {image_type} for currency {currency_id} failed: {str(error)}")
+                errors.append(error)
+                continue
+            released = reference
+            if latest.get(image_type, path) == path:
+                with db_transaction.atomic():
+                    previous = Currency.objects.select_for_update().filter(
+                        pk=currency_id
+                    ).values(image_type).first()
+                    if previous is not None:
+                        Currency.objects.filter(pk=currency_id).update(
+                            **{image_type: reference}, updated_at=timezone.now()
+                        )
+                        released = previous[image_type]
+            _release(released)
+            staging_storage().delete(path)
+
+    if errors:
+        raise errors[0]
+
+    if not _latest_staged(currency_id):
+        Currency.objects.filter(pk=currency_id, images_status=Currency.IMAGES_PENDING).update(
+            images_status=Currency.IMAGES_READY, images_error='', updated_at=timezone.now()
+        )
+        logger.info(f"Images for currency {currency_id} are ready")
+
+
+def mark_currency_images_failed(currency_id, error):
+    """Give up on a currency's staged images and record why"""
+    for path in _latest_staged(currency_id).values():
+        staging_storage().delete(path)
+    Currency.objects.filter(pk=currency_id).update(
+        images_status=Currency.IMAGES_FAILED, images_error=str(error), updated_at=timezone.now()
+    )
+    logger.error(f"Images for currency {currency_id} failed: {str(error)}")
+
+
+def requeue_stalled_currency_images():
+    """Re-queue pending uploads that were never queued or whose worker died"""
+    stalled = Currency.objects.filter(
+        images_status=Currency.IMAGES_PENDING,
+        updated_at__lt=timezone.now() - STALLED_AFTER
+    ).values_list('currency_id', flat=True)[:200]
+
+    requeued = 0
+    for currency_id in stalled:
+        staged = _latest_staged(currency_id)
+        if not staged:
+            mark_currency_images_failed(currency_id, "Staged images are missing")
+            continue
+        # Touch the row so the next sweep does not queue it again straight away
+        Currency.objects.filter(pk=currency_id).update(updated_at=timezone.now())
+        enqueue_currency_images(currency_id, staged)
+        requeued += 1
+
+    if requeued:
+        logger.info(f"Re-queued image uploads for {requeued} currencies")
+    return requeued
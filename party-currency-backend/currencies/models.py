@@ -10,6 +10,16 @@ class Currency(models.Model):
         (100, '100'),
     ]
     
+    # Front and back images are uploaded to Google Drive in the background
+    IMAGES_PENDING = 'pending'
+    IMAGES_READY = 'ready'
+    IMAGES_FAILED = 'failed'
+    IMAGES_STATUS_CHOICES = [
+        (IMAGES_PENDING, 'Pending'),
+        (IMAGES_READY, 'Ready'),
+        (IMAGES_FAILED, 'Failed'),
+    ]
+    
     currency_id = models.CharField(max_length=255, unique=True, primary_key=True)
     currency_author = models.CharField(max_length=255, default="user")
     event_id = models.CharField(max_length=255)  # Removed trailing comma
@@ -21,6 +31,8 @@ class Currency(models.Model):
     front_image = models.TextField(null=True)
     back_image = models.TextField(null=True)
     back_celebration_text = models.CharField(max_length=255, default="Party Currency")
+    images_status = models.CharField(max_length=20, choices=IMAGES_STATUS_CHOICES, default=IMAGES_READY)
+    images_error = models.TextField(blank=True, default="")
 
     class Meta:
         ordering = ['-created_at']
\ No newline at end of file
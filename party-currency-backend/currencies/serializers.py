@@ -15,7 +15,8 @@ class CurrencySerializer(serializers.ModelSerializer):
             'front_celebration_text',
             'front_image',
             'back_image',
-            'back_celebration_text'
+            'back_celebration_text',
+            'images_status'
         ]
         
-        read_only_fields = ['currency_id', 'created_at', 'updated_at'] 
\ No newline at end of file
+        read_only_fields = ['currency_id', 'created_at', 'updated_at', 'images_status'] 
\ No newline at end of file
@@ -0,0 +1,30 @@
+from celery import shared_task
+
+from .images import mark_currency_images_failed, requeue_stalled_currency_images, upload_currency_images
+
+MAX_UPLOAD_RETRIES = 3
+
+
+@shared_task(bind=True, max_retries=MAX_UPLOAD_RETRIES)
+def upload_currency_images_task(self, currency_id, staged):
+    """
+    Celery task that uploads a currency's staged front and back images to
+    the configured media storage concurrently. Failed uploads are retried with
+    backoff before the currency is marked failed.
+    """
+    try:
+        upload_currency_images(currency_id, staged)
+    except Exception as e:
+        if self.request.retries >= self.max_retries:
+            mark_currency_images_failed(currency_id, e)
+            return
+        raise self.retry(exc=e, countdown=30 * (2 ** self.request.retries))
+
+
+@shared_task
+def requeue_stalled_currency_images_task():
+    """
+    Celery task that re-queues currency image uploads stuck in pending.
+    This task is scheduled to run every 10 minutes.
+    """
+    return requeue_stalled_currency_images()
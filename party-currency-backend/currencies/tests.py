@@ -1,3 +1,258 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
 
-# Create your tests here.
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+
+from authentication.models import CustomUser
+from google_drive.cache import DriveFileCache
+from media_storage import ObjectInfo, StorageBackend, reset_storages
+from .images import (
+    IMAGE_TYPES,
+    requeue_stalled_currency_images,
+    stage_image,
+    staging_storage,
+    upload_currency_images,
+)
+from .models import Currency
+from .views import RANGE_NOT_SATISFIABLE, parse_range_header
+
+IMAGE_CONTENT = b'\x89PNG\r\n\x1a\n' + bytes(range(256)) * 4
+IMAGE_KEY = 'currencies/note.png'
+
+
+class ParseRangeHeaderTests(SimpleTestCase):
+    def test_ranges(self):
+        cases = [
+            ('bytes=0-99', (0, 99)),
+            ('bytes=100-', (100, 999)),
+            ('bytes=-100', (900, 999)),
+            # Ends past the file and suffixes longer than it are clamped
+            ('bytes=900-5000', (900, 999)),
+            ('bytes=-5000', (0, 999)),
+            ('bytes=999-999', (999, 999)),
+        ]
+        for header, expected in cases:
+            with self.subTest(header=header):
+                self.assertEqual(parse_range_header(header, 1000), expected)
+
+    def test_ignored_headers(self):
+        for header in (None, '', 'items=0-10', 'bytes=0-10,20-30', 'bytes=a-b', 'bytes=-'):
+            with self.subTest(header=header):
+                self.assertIsNone(parse_range_header(header, 1000))
+
+    def test_unsatisfiable(self):
+        for header in ('bytes=1000-', 'bytes=1000-2000', 'bytes=500-100', 'bytes=-0'):
+            with self.subTest(header=header):
+                self.assertEqual(parse_range_header(header, 1000), RANGE_NOT_SATISFIABLE)
+
+
+class DownloadImageTests(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        os.makedirs(os.path.join(self.root, 'currencies'))
+        with open(os.path.join(self.root, IMAGE_KEY), 'wb') as f:
+            f.write(IMAGE_CONTENT)
+
+        settings_override = override_settings(
+            MEDIA_STORAGE={'currency_images': {'BACKEND': 'local', 'PREFIX': 'currencies'}},
+            MEDIA_STORAGE_LOCAL_DIR=self.root,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        reset_storages()
+        self.addCleanup(reset_storages)
+
+        user = CustomUser.objects.create_user(username='dl@example.com', email='dl@example.com', password='secret')
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+
+    def _get(self, **headers):
+        return self.client.get('/currencies/download-image', {'url': f"local://{IMAGE_KEY}"}, **headers)
+
+    def test_full_download(self):
+        response = self._get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), IMAGE_CONTENT)
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertTrue(response['ETag'])
+
+    def test_partial_content(self):
+        response = self._get(HTTP_RANGE='bytes=8-15')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), IMAGE_CONTENT[8:16])
+        self.assertEqual(response['Content-Range'], f"bytes 8-15/{len(IMAGE_CONTENT)}")
+        self.assertEqual(response['Content-Length'], '8')
+
+    def test_stale_if_range_sends_the_whole_file(self):
+        response = self._get(HTTP_RANGE='bytes=8-15', HTTP_IF_RANGE='"outdated"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), IMAGE_CONTENT)
+
+    def test_not_modified(self):
+        etag = self._get()['ETag']
+        response = self._get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(self._get(HTTP_IF_NONE_MATCH='"outdated"').status_code, 200)
+
+    def test_range_not_satisfiable(self):
+        response = self._get(HTTP_RANGE=f"bytes={len(IMAGE_CONTENT)}-")
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f"bytes */{len(IMAGE_CONTENT)}")
+
+    def test_size_of_non_image_is_rejected(self):
+        # Sizes are rendered by every backend, never answered with the original
+        file_cache = DriveFileCache(root=os.path.join(self.root, 'cache'))
+        with mock.patch('google_drive.derivatives.get_drive_file_cache', return_value=file_cache):
+            response = self.client.get('/currencies/download-image', {'url': f"local://{IMAGE_KEY}", 'size': 'thumb'})
+        self.assertEqual(response.status_code, 400)
+
+
+class StreamOnlyStorage(StorageBackend):
+    """A backend with no local copies, so every download streams from it"""
+
+    scheme = 'stream'
+    etag = '"0cc175b9c0f1b6a831c399e269772661"'
+    started = []
+
+    def put(self, file_obj, name, content_type=None):
+        raise NotImplementedError
+
+    def put_variant(self, file_obj, name, content_type):
+        raise NotImplementedError
+
+    def stream(self, key, chunk_size=None):
+        def chunks():
+            self.started.append(key)
+            yield IMAGE_CONTENT
+
+        info = ObjectInfo(key, size=len(IMAGE_CONTENT), modified_time='2025-01-01T00:00:00Z', etag=self.etag)
+        return info, chunks()
+
+    def delete(self, key):
+        return False
+
+    def exists(self, key):
+        return True
+
+    def fetch(self, key):
+        raise NotImplementedError
+
+
+@override_settings(MEDIA_STORAGE={'currency_images': {'BACKEND': 'currencies.tests.StreamOnlyStorage'}})
+class StreamedDownloadTests(TestCase):
+    def setUp(self):
+        reset_storages()
+        self.addCleanup(reset_storages)
+        StreamOnlyStorage.started.clear()
+        user = CustomUser.objects.create_user(username='st@example.com', email='st@example.com', password='secret')
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+
+    def _get(self, **headers):
+        return self.client.get('/currencies/download-image', {'url': 'stream://note.png'}, **headers)
+
+    def test_streams_with_validators(self):
+        response = self._get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), IMAGE_CONTENT)
+        self.assertEqual(response['ETag'], StreamOnlyStorage.etag)
+        self.assertIn('Last-Modified', response)
+
+    def test_not_modified_without_downloading(self):
+        for if_none_match in (StreamOnlyStorage.etag, f'"other", {StreamOnlyStorage.etag}', '*'):
+            with self.subTest(if_none_match=if_none_match):
+                response = self._get(HTTP_IF_NONE_MATCH=if_none_match)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response['ETag'], StreamOnlyStorage.etag)
+        self.assertEqual(StreamOnlyStorage.started, [])
+
+        self.assertEqual(self._get(HTTP_IF_NONE_MATCH='"outdated"').status_code, 200)
+
+
+class CurrencyImagePipelineTests(TestCase):
+    """Staged uploads are moved to media storage by the worker"""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        settings_override = override_settings(
+            MEDIA_STORAGE={'currency_images': {'BACKEND': 'local', 'PREFIX': 'currencies', 'VARIANTS': False}},
+            MEDIA_STORAGE_LOCAL_DIR=os.path.join(self.root, 'media'),
+            STORAGES={
+                'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+                'currency_staging': {
+                    'BACKEND': 'django.core.files.storage.FileSystemStorage',
+                    'OPTIONS': {'location': os.path.join(self.root, 'staging')},
+                },
+            },
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        reset_storages()
+        self.addCleanup(reset_storages)
+        self.currency = Currency.objects.create(
+            currency_id='CURpipeline', event_id='EVTpipeline', images_status=Currency.IMAGES_PENDING
+        )
+
+    def _stage(self, image_type, content=IMAGE_CONTENT):
+        return stage_image(self.currency.pk, image_type, SimpleUploadedFile(f"{image_type}.png", content))
+
+    def _stored(self, reference):
+        self.assertTrue(reference.startswith('local://currencies/'))
+        with open(os.path.join(self.root, 'media', reference[len('local://'):]), 'rb') as f:
+            return f.read()
+
+    def test_staged_images_are_stored(self):
+        staged = {image_type: self._stage(image_type) for image_type in IMAGE_TYPES}
+        upload_currency_images(self.currency.pk, staged)
+
+        self.currency.refresh_from_db()
+        self.assertEqual(self.currency.images_status, Currency.IMAGES_READY)
+        for image_type, path in staged.items():
+            self.assertEqual(self._stored(getattr(self.currency, image_type)), IMAGE_CONTENT)
+            self.assertFalse(staging_storage().exists(path))
+
+    def test_replaced_image_is_released(self):
+        upload_currency_images(self.currency.pk, {'front_image': self._stage('front_image')})
+        self.currency.refresh_from_db()
+        first = self.currency.front_image
+
+        upload_currency_images(self.currency.pk, {'front_image': self._stage('front_image', b'new design')})
+        self.currency.refresh_from_db()
+        self.assertEqual(self._stored(self.currency.front_image), b'new design')
+        self.assertFalse(os.path.exists(os.path.join(self.root, 'media', first[len('local://'):])))
+
+    def test_newer_staged_image_wins(self):
+        older = self._stage('front_image')
+        newer = self._stage('front_image', b'newer design')
+        upload_currency_images(self.currency.pk, {'front_image': older})
+
+        # The older upload is dropped and the currency waits for the newer one
+        self.currency.refresh_from_db()
+        self.assertIsNone(self.currency.front_image)
+        self.assertEqual(self.currency.images_status, Currency.IMAGES_PENDING)
+        self.assertTrue(staging_storage().exists(newer))
+
+        upload_currency_images(self.currency.pk, {'front_image': newer})
+        self.currency.refresh_from_db()
+        self.assertEqual(self._stored(self.currency.front_image), b'newer design')
+        self.assertEqual(self.currency.images_status, Currency.IMAGES_READY)
+
+    @mock.patch('currencies.images.enqueue_currency_images')
+    def test_sweeper_requeues_or_fails_stalled_currencies(self, enqueue):
+        staged = self._stage('front_image')
+        Currency.objects.create(currency_id='CURmissing', event_id='EVTpipeline', images_status=Currency.IMAGES_PENDING)
+        Currency.objects.filter(images_status=Currency.IMAGES_PENDING).update(updated_at='2025-01-01T00:00:00Z')
+
+        self.assertEqual(requeue_stalled_currency_images(), 1)
+        enqueue.assert_called_once_with('CURpipeline', {'front_image': staged})
+        missing = Currency.objects.get(pk='CURmissing')
+        self.assertEqual(missing.images_status, Currency.IMAGES_FAILED)
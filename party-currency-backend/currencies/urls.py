@@ -1,5 +1,5 @@
 from django.urls import path
-from .views import save_currency,get_all_currency,get_currency_by_id,update_currency,delete_currency,download_image_from_drive
+from .views import save_currency,get_all_currency,get_currency_by_id,update_currency,delete_currency,download_image_from_drive,get_currency_images_status
 
 
 urlpatterns = [
@@ -8,6 +8,7 @@ urlpatterns = [
     path("get-all-currencies",get_all_currency),
     path("update-currency/<str:id>",update_currency),
     path("delete-currency/<str:id>",delete_currency),
-    path("download-image",download_image_from_drive)
+    path("download-image",download_image_from_drive),
+    path("images-status/<str:id>",get_currency_images_status)
 
 ]
\ No newline at end of file
@@ -5,21 +5,23 @@ from rest_framework.response import Response
 from rest_framework import status
 from .models import Currency
 from .serializers import CurrencySerializer
+from .images import ASSET_TYPE, IMAGE_TYPES, enqueue_currency_images, stage_image
+from django.db import transaction
 from django.utils import timezone
 from datetime import datetime
 import pytz
-from google_drive.models import GoogleDriveFile
-from google_drive.utils import upload_file_to_drive, download_file_from_drive  # Added download function import
 from authentication.models import CustomUser
-from django.core.files.storage import default_storage
+import itertools
 import os
-import re  # Added for regex pattern matching
-from django.core.files.base import ContentFile
-from django.http import FileResponse, HttpResponse  # Added for file response
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified, StreamingHttpResponse  # Added for file response
+from django.utils.dateparse import parse_datetime
+from django.utils.http import http_date, parse_etags
+from media_storage import VARIANT_SIZES, iter_file_range, sniff_content_type, storage_for_reference
+from PIL import UnidentifiedImageError
+from django.utils.cache import patch_vary_headers
 from rest_framework import status
 from dotenv import load_dotenv
-import random
-import string
+from party_currency_backend.ids import generate_currency_id
 from rest_framework.throttling import UserRateThrottle, AnonRateThrottle
 from events.models import Events
 
@@ -33,51 +35,6 @@ class AnonThrottle(AnonRateThrottle):
     scope = 'anon'
 
 
-def generate_currency_id():
-    """Generate a unique currency ID"""
-    id = 'CUR' + ''.join(random.choices(string.ascii_letters + string.digits, k=5))
-    if Currency.objects.filter(currency_id=id).exists():
-        return generate_currency_id()
-    return id
-
-
-def upload_image(image_file, currency_id, image_type):
-    """Helper function to upload images to Google Drive"""
-    file_path = None
-    try:
-        file_name = f"{currency_id}_{image_type}{os.path.splitext(image_file.name)[1]}"
-        file_path = default_storage.save(f'tmp/{file_name}', ContentFile(image_file.read()))
-        
-        # Upload the file to Google Drive
-        folder_id = os.getenv('GOOGLE_DRIVE_FOLDER_ID')
-        file_id = upload_file_to_drive(file_path, file_name, folder_id)
-        
-        # Clean up the temporary file
-        if file_path and default_storage.exists(file_path):
-            default_storage.delete(file_path)
-        
-        return f"https://drive.google.com/file/d/{file_id}/view?usp=sharing"
-    except Exception as e:
-        # Clean up the temporary file in case of error
-        if file_path and default_storage.exists(file_path):
-            default_storage.delete(file_path)
-        raise e
-
-
-def extract_file_id_from_url(drive_url):
-    """Extract file ID from Google Drive URL"""
-    if not drive_url:
-        return None
-    
-    # Pattern to match Google Drive file URLs
-    pattern = r'https://drive\.google\.com/file/d/([^/]+)'
-    match = re.search(pattern, drive_url)
-    
-    if match:
-        return match.group(1)
-    return None
-
-
 @api_view(["POST"])
 @throttle_classes([UserThrottle])
 @permission_classes([IsAuthenticated])
@@ -92,42 +49,39 @@ def save_currency(request):
     # Get denomination from request data
     denomination = request.data.get("denomination")
     
-    front_image_url = None
-    back_image_url = None
-    
-    # Process front image if provided
-    front_image = request.data.get("front_image")
-    if front_image:
-        try:
-            front_image_url = upload_image(front_image, currency_id, "front_image")
-        except Exception as e:
-            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-    
-    # Process back image if provided
-    back_image = request.data.get("back_image")
-    if back_image:
-        try:
-            back_image_url = upload_image(back_image, currency_id, "back_image")
-        except Exception as e:
-            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    # Images are staged here and moved to storage by a background task
+    images = {
+        image_type: request.data.get(image_type)
+        for image_type in IMAGE_TYPES
+        if request.data.get(image_type)
+    }
 
-    # Create currency object
-    currency = Currency.objects.create(
-        currency_id=currency_id,
-        currency_name=currency_name,
-        currency_author=currency_author,
-        event_id=event_id,
-        front_celebration_text=front_celebration_text,
-        front_image=front_image_url,
-        back_image=back_image_url,
-        back_celebration_text=back_celebration_text,
-        denomination=denomination  # Added denomination field
-    )
+    with transaction.atomic():
+        # Create currency object
+        currency = Currency.objects.create(
+            currency_id=currency_id,
+            currency_name=currency_name,
+            currency_author=currency_author,
+            event_id=event_id,
+            front_celebration_text=front_celebration_text,
+            back_celebration_text=back_celebration_text,
+            denomination=denomination,  # Added denomination field
+            images_status=Currency.IMAGES_PENDING if images else Currency.IMAGES_READY
+        )
+        if images:
+            try:
+                staged = {
+                    image_type: stage_image(currency_id, image_type, image)
+                    for image_type, image in images.items()
+                }
+            except Exception as e:
+                transaction.set_rollback(True)
+                return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            enqueue_currency_images(currency_id, staged)
     event = Events.objects.get(event_id=event_id)
     event.currency_id=currency_id
-    currency.save()
    
-    return Response({"message": "Currency saved successfully","currency_id":currency_id,"event":event.event_name}, status=status.HTTP_200_OK)
+    return Response({"message": "Currency saved successfully","currency_id":currency_id,"event":event.event_name,"images_status":currency.images_status}, status=status.HTTP_200_OK)
 
 
 @api_view(["GET"])
@@ -158,7 +112,7 @@ def get_currency_by_id(request, id):
 @permission_classes([IsAuthenticated])
 def download_image_from_drive(request):
     
-    # Get the Google Drive URL from request data
+    # Get the stored image URL from request data
     image_url = request.query_params.get("url")
     if not image_url:
         return Response(
@@ -169,68 +123,154 @@ def download_image_from_drive(request):
     # Get optional filename from request
     custom_filename = request.data.get("filename", "downloaded_image")
     
-    # Extract file ID from the Google Drive URL
-    file_id = extract_file_id_from_url(image_url)
-    if not file_id:
+    # Find the storage backend holding the image
+    storage, key = storage_for_reference(image_url, ASSET_TYPE)
+    if not key:
         return Response(
-            {"error": "Invalid Google Drive URL format"},
+            {"error": "Invalid image URL format"},
             status=status.HTTP_400_BAD_REQUEST
         )
     
-    # Create temporary directory if it doesn't exist
-    tmp_dir = os.path.join(default_storage.location, 'tmp')
-    os.makedirs(tmp_dir, exist_ok=True)
-    
-    # Generate a temporary file path
-    temp_file_path = os.path.join(tmp_dir, f"temp_download_{file_id}")
+    # Optional thumbnail size, WebP for clients that accept it and JPEG otherwise
+    size = request.query_params.get("size")
+    if size and size not in VARIANT_SIZES:
+        return Response(
+            {"error": f"Invalid size. Use one of: {', '.join(VARIANT_SIZES)}"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
     
     try:
-        # Download the file from Google Drive
-        file_path = download_file_from_drive(file_id, temp_file_path)
+        cached = None
+        if size:
+            variant_format = 'webp' if 'image/webp' in request.headers.get("Accept", "") else 'jpeg'
+            try:
+                cached = storage.variant(key, size, variant_format)
+            except UnidentifiedImageError:
+                return Response({"error": "File is not an image"}, status=status.HTTP_400_BAD_REQUEST)
+        if cached is None:
+            cached = storage.cached(key)
+        
+        if_none_match = parse_etags(request.headers.get("If-None-Match", ""))
+        
+        if cached is None and not request.headers.get("Range"):
+            # No local copy: pipe the backend's chunks to the client while it keeps a copy
+            info, chunks = storage.stream(key)
+            if '*' in if_none_match or (info.etag and info.etag in if_none_match):
+                # The metadata answers it; the download is never started
+                response = HttpResponseNotModified()
+            else:
+                first_chunk = next(chunks, b'')
+                content_type, extension = sniff_content_type(first_chunk)
+                response = StreamingHttpResponse(itertools.chain([first_chunk], chunks), content_type=content_type)
+                response['Content-Disposition'] = f'attachment; filename="{custom_filename}{extension}"'
+                if info.size is not None:
+                    response['Content-Length'] = str(info.size)
+                response['Accept-Ranges'] = 'bytes'
+            modified_time = parse_datetime(info.modified_time or '')
+            if modified_time:
+                response['Last-Modified'] = http_date(modified_time.timestamp())
+            if info.etag:
+                response['ETag'] = info.etag
+            response['Cache-Control'] = 'private, no-cache'
+            return response
+        
+        # Partial requests are served from disk, so make a local copy first
+        if cached is None:
+            cached = storage.fetch(key)
         
-        # Determine the file extension and MIME type
-        with open(file_path, 'rb') as f:
-            # Read first few bytes to determine file type
-            header = f.read(8)
-            f.seek(0)  # Reset file pointer
-            
-            # Get file content
-            file_content = f.read()
+        # Local copies answer conditional requests without touching the backend
+        if cached.etag in if_none_match or '*' in if_none_match:
+            response = _not_modified_response(cached)
+            if size:
+                patch_vary_headers(response, ["Accept"])
+            return response
         
-        # Clean up the temporary file
-        if os.path.exists(file_path):
-            os.remove(file_path)
+        # Determine the file extension and MIME type from the file header
+        with open(cached.path, 'rb') as f:
+            head = f.read(16)
+        content_type, extension = sniff_content_type(head)
         
-        # Determine content type based on file header
-        content_type = "application/octet-stream"  # Default
-        if header.startswith(b'\xFF\xD8'):
-            content_type = "image/jpeg"
-            extension = ".jpg"
-        elif header.startswith(b'\x89PNG'):
-            content_type = "image/png"
-            extension = ".png"
-        elif header.startswith(b'GIF87a') or header.startswith(b'GIF89a'):
-            content_type = "image/gif"
-            extension = ".gif"
-        elif header.startswith(b'%PDF'):
-            content_type = "application/pdf"
-            extension = ".pdf"
+        byte_range = None
+        if_range = request.headers.get("If-Range")
+        if not if_range or if_range == cached.etag:
+            byte_range = parse_range_header(request.headers.get("Range"), cached.size)
+        
+        if byte_range == RANGE_NOT_SATISFIABLE:
+            response = HttpResponse(status=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+            response['Content-Range'] = f"bytes */{cached.size}"
+            return response
+        
+        if byte_range:
+            start, end = byte_range
+            response = StreamingHttpResponse(
+                iter_file_range(cached.path, start, end - start + 1),
+                status=status.HTTP_206_PARTIAL_CONTENT,
+                content_type=content_type
+            )
+            response['Content-Range'] = f"bytes {start}-{end}/{cached.size}"
+            response['Content-Length'] = str(end - start + 1)
         else:
-            extension = ""
+            # Stream the cached copy instead of loading it into memory
+            response = FileResponse(open(cached.path, 'rb'), content_type=content_type)
         
-        # Create the response with the file content
-        response = HttpResponse(file_content, content_type=content_type)
         response['Content-Disposition'] = f'attachment; filename="{custom_filename}{extension}"'
+        response['Accept-Ranges'] = 'bytes'
+        if size:
+            patch_vary_headers(response, ["Accept"])
+        _set_validators(response, cached)
         
         return response
         
     except Exception as e:
-        # Clean up in case of error
-        if os.path.exists(temp_file_path):
-            os.remove(temp_file_path)
         return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+RANGE_NOT_SATISFIABLE = 'not-satisfiable'
+
+
+def parse_range_header(header, size):
+    """
+    Parse a single-range "bytes=" Range header.
+    
+    Returns:
+        (start, end) inclusive offsets, None to ignore the header and send the
+        whole file (absent, malformed or multi-range), or RANGE_NOT_SATISFIABLE
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    start_text, _, end_text = header[len("bytes="):].strip().partition("-")
+    try:
+        if start_text:
+            start = int(start_text)
+            end = int(end_text) if end_text else size - 1
+        else:
+            # Suffix range: the last N bytes
+            suffix = int(end_text)
+            if suffix == 0:
+                return RANGE_NOT_SATISFIABLE
+            start = max(size - suffix, 0)
+            end = size - 1
+    except ValueError:
+        return None
+    if start >= size or start > end:
+        return RANGE_NOT_SATISFIABLE
+    return start, min(end, size - 1)
+
+
+def _set_validators(response, cached):
+    response['ETag'] = cached.etag
+    if cached.last_modified:
+        response['Last-Modified'] = http_date(cached.last_modified.timestamp())
+    # Only the signed-in user's browser may reuse it, and it must revalidate
+    response['Cache-Control'] = 'private, no-cache'
+
+
+def _not_modified_response(cached):
+    response = HttpResponseNotModified()
+    _set_validators(response, cached)
+    return response
+
+
 
 @api_view(["PUT"])
 @throttle_classes([UserThrottle])
@@ -249,23 +289,13 @@ def update_currency(request, id):
     if not data.get("event_id"):
         data["event_id"] = "no_event"
     
-    # Process front image if provided
-    front_image = request.data.get("front_image")
-    if front_image:
-        try:
-            front_image_url = upload_image(front_image, currency.currency_id, "front_image")
-            data["front_image"] = front_image_url
-        except Exception as e:
-            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-    
-    # Process back image if provided
-    back_image = request.data.get("back_image")
-    if back_image:
-        try:
-            back_image_url = upload_image(back_image, currency.currency_id, "back_image")
-            data["back_image"] = back_image_url
-        except Exception as e:
-            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    # Uploaded images are staged and moved to storage by a background task
+    images = {}
+    for image_type in IMAGE_TYPES:
+        image = request.data.get(image_type)
+        if image and hasattr(image, 'read'):
+            images[image_type] = image
+            data.pop(image_type, None)
     
     # Handle denomination update
     if "denomination" in data:
@@ -279,10 +309,49 @@ def update_currency(request, id):
     
     # Update the currency
     serializer = CurrencySerializer(currency, data=data)
-    if serializer.is_valid():
-        serializer.save()
-        return Response(serializer.data, status=status.HTTP_200_OK)
-    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    with transaction.atomic():
+        if images:
+            try:
+                staged = {
+                    image_type: stage_image(currency.currency_id, image_type, image)
+                    for image_type, image in images.items()
+                }
+            except Exception as e:
+                return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            serializer.save(images_status=Currency.IMAGES_PENDING, images_error="")
+            enqueue_currency_images(currency.currency_id, staged)
+        else:
+            serializer.save()
+    return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+@api_view(["GET"])
+@throttle_classes([UserThrottle])
+@permission_classes([IsAuthenticated])
+def get_currency_images_status(request, id):
+    """
+    Report whether a currency's images have finished uploading.
+    
+    Clients poll this after saving or updating a design until images_status
+    is "ready" (URLs filled in) or "failed" (images_error says why).
+    """
+    try:
+        currency = Currency.objects.only(
+            'currency_id', 'images_status', 'images_error', 'front_image', 'back_image'
+        ).get(currency_id=id)
+    except Currency.DoesNotExist:
+        return Response({"error": "Currency not found"}, status=status.HTTP_404_NOT_FOUND)
+    
+    return Response({
+        "currency_id": currency.currency_id,
+        "images_status": currency.images_status,
+        "images_error": currency.images_error,
+        "front_image": currency.front_image,
+        "back_image": currency.back_image,
+    }, status=status.HTTP_200_OK)
 
 
 @api_view(["DELETE"])
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.7 on 2026-10-18 10:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0006_alter_events_delivery_status'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='events',
+            index=models.Index(fields=['created_at'], name='events_even_created_c39501_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='events',
+            index=models.Index(fields=['updated_at'], name='events_even_updated_d40f5f_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.7 on 2026-10-18 10:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0007_events_events_even_created_c39501_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='events',
+            index=models.Index(fields=['event_name', 'event_id'], name='events_even_event_n_12523b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='events',
+            index=models.Index(fields=['start_date', 'event_id'], name='events_even_start_d_9e0b58_idx'),
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 5.1.7 on 2026-10-18 10:51
+
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+# The search vector and trigram indexes behind party_currency_admin.search.
+# Only PostgreSQL has them; on other databases the admin search falls back to icontains.
+FORWARD_SQL = [
+    """
+    CREATE OR REPLACE FUNCTION events_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('simple', coalesce(NEW.event_name, '')), 'A') ||
+            setweight(to_tsvector('simple', coalesce(NEW.event_author, '') || ' ' || coalesce(NEW.city, '') || ' ' || coalesce(NEW.state, '')), 'B') ||
+            setweight(to_tsvector('simple', coalesce(NEW.street_address, '') || ' ' || coalesce(NEW.event_description, '')), 'C') ||
+            setweight(to_tsvector('simple', coalesce(NEW.delivery_status, '')), 'D');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER events_search_vector_trigger
+    BEFORE INSERT OR UPDATE ON events_events
+    FOR EACH ROW EXECUTE FUNCTION events_search_vector_update()
+    """,
+    # Fires the trigger for existing rows
+    "UPDATE events_events SET event_name = event_name",
+    "CREATE INDEX events_search_vector_idx ON events_events USING gin (search_vector)",
+    "CREATE INDEX events_event_name_trgm_idx ON events_events USING gin (event_name gin_trgm_ops)",
+    "CREATE INDEX events_event_author_trgm_idx ON events_events USING gin (event_author gin_trgm_ops)",
+]
+REVERSE_SQL = [
+    "DROP INDEX IF EXISTS events_event_author_trgm_idx",
+    "DROP INDEX IF EXISTS events_event_name_trgm_idx",
+    "DROP INDEX IF EXISTS events_search_vector_idx",
+    "DROP TRIGGER IF EXISTS events_search_vector_trigger ON events_events",
+    "DROP FUNCTION IF EXISTS events_search_vector_update()",
+]
+
+
+def _run_on_postgresql(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0008_events_events_even_event_n_12523b_idx_and_more'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='events',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(_run_on_postgresql(FORWARD_SQL), _run_on_postgresql(REVERSE_SQL)),
+    ]
@@ -1,3 +1,4 @@
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from datetime import date
 
@@ -39,9 +40,19 @@ class Events(models.Model):
             ('refunded', 'Refunded')
         ]
     )
+    # Filled by a database trigger on PostgreSQL, see party_currency_admin.search
+    search_vector = SearchVectorField(null=True, editable=False)
 
     def __str__(self):
         return f"{self.event_name} - {self.event_id}"
 
     class Meta:
-        ordering = ['-created_at']
\ No newline at end of file
+        ordering = ['-created_at']
+        indexes = [
+            # Scanned by the admin analytics rollups, see party_currency_admin.rollups
+            models.Index(fields=['created_at']),
+            models.Index(fields=['updated_at']),
+            # Keyset pagination of the admin listings, see party_currency_admin.pagination
+            models.Index(fields=['event_name', 'event_id']),
+            models.Index(fields=['start_date', 'event_id']),
+        ]
\ No newline at end of file
@@ -9,23 +9,17 @@ from currencies.models import Currency
 from django.utils import timezone
 from datetime import datetime, timedelta
 import pytz
-from google_drive.models import GoogleDriveFile
-from google_drive.utils import upload_file_to_drive
 from authentication.models import CustomUser
 from django.core.files.storage import default_storage
 from django.core.files.base import ContentFile
-import random
-import string
+from party_currency_backend.ids import generate_event_id
 from currencies.serializers import CurrencySerializer
 from payment.serializers import TransactionSerializer
 from payment.models import Transaction
 # Create your views here.
 
 def generate_short_event_id(username):
-    id = 'EVT' + ''.join(random.choices(string.ascii_letters + string.digits, k=5))
-    if Events.objects.filter(event_id=id).exists():
-        return generate_short_event_id(username)
-    return id
+    return generate_event_id()
     
 @api_view(["POST"])
 @permission_classes([IsAuthenticated])
@@ -0,0 +1,333 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Iterator, Optional, Tuple
+
+from django.conf import settings
+from django.utils.dateparse import parse_datetime
+
+from .utils import DEFAULT_DOWNLOAD_CHUNK_SIZE, get_file_metadata, iter_drive_file
+
+logger = logging.getLogger("google_drive_cache")
+
+# A fresh blob may belong to a download whose index entry is still being written
+ORPHAN_GRACE_SECONDS = 60
+# Eviction frees space down to this fraction of max_bytes, so it does not run on every write
+EVICT_LOW_WATER = 0.9
+# The running size total only sees this process's writes; rescan the disk this often
+EVICT_RESCAN_SECONDS = 60
+
+
+class CachedFile:
+    """A Drive file held in the local cache"""
+
+    def __init__(self, file_id, path, size, sha256, name, mime_type, modified_time, md5=None):
+        self.file_id = file_id
+        self.path = path
+        self.size = size
+        self.sha256 = sha256
+        self.name = name
+        self.mime_type = mime_type
+        self.modified_time = modified_time
+        self.md5 = md5
+
+    @property
+    def etag(self):
+        # The MD5 matches Drive's md5Checksum, so cached and streamed responses agree
+        return f'"{self.md5 or self.sha256}"'
+
+    @property
+    def last_modified(self):
+        """Drive's modifiedTime as a datetime, or None"""
+        return parse_datetime(self.modified_time) if self.modified_time else None
+
+
+class DriveFileCache:
+    """
+    Content-addressed, size-bounded on-disk cache of Drive downloads.
+
+    Blobs are stored once under blobs/<sha256>, and index/<file_id>.json maps
+    each Drive file ID to its blob and metadata. Reading an entry touches its
+    index file, so eviction removes the least recently used entries first and
+    deletes a blob once no entry points at it. Files are written to a temp
+    file and renamed into place, so concurrent workers never see partial data.
+
+    Writes add to a running size total, and the directories are only scanned
+    when that total passes max_bytes (or it is older than EVICT_RESCAN_SECONDS,
+    to pick up other processes' writes). A scan evicts down to EVICT_LOW_WATER
+    of max_bytes, so the next one is a while off.
+
+    Drive file IDs are never rewritten in place by this app (a new upload gets
+    a new ID), so a cached entry stays valid until it is evicted.
+    """
+
+    def __init__(self, root=None, max_bytes=None):
+        self.root = Path(root or settings.DRIVE_CACHE_DIR)
+        self.max_bytes = max_bytes if max_bytes is not None else settings.DRIVE_CACHE_MAX_BYTES
+        self.blob_dir = self.root / 'blobs'
+        self.index_dir = self.root / 'index'
+        self.blob_dir.mkdir(parents=True, exist_ok=True)
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        self._evict_lock = threading.Lock()
+        # Bytes on disk as of the last scan plus the blobs written since; None until the first scan
+        self._total_bytes = None
+        self._scanned_at = 0.0
+
+    def get(self, file_id: str) -> Optional[CachedFile]:
+        """Return the cached file, or None on a miss"""
+        index_path = self._index_path(file_id)
+        try:
+            with open(index_path) as f:
+                entry = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+        blob_path = self.blob_dir / entry['sha256']
+        if not blob_path.exists():
+            self._remove(index_path)
+            return None
+
+        try:
+            os.utime(index_path)
+        except FileNotFoundError:
+            pass
+        return CachedFile(file_id=file_id, path=blob_path, **entry)
+
+    def fetch(self, file_id: str) -> CachedFile:
+        """Return the cached file, downloading it from Drive on a miss"""
+        cached = self.get(file_id)
+        if cached is not None:
+            return cached
+        return self._download(file_id)
+
+    def put(self, file_id: str, data: bytes, name: str = '', mime_type: str = '', modified_time: Optional[str] = None) -> CachedFile:
+        """Store content that is already in memory, e.g. a freshly rendered image"""
+        sha256 = hashlib.sha256(data).hexdigest()
+        blob_path = self.blob_dir / sha256
+        if not blob_path.exists():
+            fd, temp_path = tempfile.mkstemp(dir=self.blob_dir, prefix='.put-')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, blob_path)
+            self._added(len(data))
+
+        entry = {
+            'size': len(data),
+            'sha256': sha256,
+            'md5': hashlib.md5(data).hexdigest(),
+            'name': name,
+            'mime_type': mime_type,
+            'modified_time': modified_time,
+        }
+        self._write_index(file_id, entry)
+        self.evict(keep=file_id)
+        return CachedFile(file_id=file_id, path=blob_path, **entry)
+
+    def invalidate(self, file_id: str):
+        self._remove(self._index_path(file_id))
+
+    def remove_stale_temp_files(self, max_age_seconds: float, dry_run: bool = False) -> int:
+        """Remove temp files left behind by workers that died mid-write; returns how many"""
+        cutoff = time.time() - max_age_seconds
+        removed = 0
+        for directory in (self.blob_dir, self.index_dir):
+            for path in directory.glob('.*'):
+                try:
+                    if path.stat().st_mtime >= cutoff:
+                        continue
+                except FileNotFoundError:
+                    continue
+                if not dry_run:
+                    self._remove(path)
+                removed += 1
+        return removed
+
+    def stream(self, file_id: str, chunk_size: Optional[int] = None) -> Tuple[dict, Iterator[bytes]]:
+        """
+        Stream a file from Drive while storing it in the cache.
+
+        The entry is only added once the last chunk has been written; if the
+        consumer stops early (e.g. the client disconnects) the partial copy is
+        discarded.
+
+        Returns:
+            tuple: (Drive metadata dict, iterator of content chunks)
+        """
+        metadata = self._fetch_metadata(file_id)
+        return metadata, self._stream_and_store(file_id, metadata, chunk_size)
+
+    def _fetch_metadata(self, file_id):
+        """Drive-style metadata (name, mimeType, modifiedTime, size); overridden for other sources"""
+        return get_file_metadata(file_id)
+
+    def _iter_source(self, file_id, chunk_size):
+        return iter_drive_file(file_id, chunk_size)
+
+    def _stream_and_store(self, file_id, metadata, chunk_size):
+        fd, temp_path = tempfile.mkstemp(dir=self.blob_dir, prefix='.download-')
+        stored = False
+        try:
+            digest = hashlib.sha256()
+            md5 = hashlib.md5()
+            size = 0
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in self._iter_source(file_id, chunk_size):
+                    f.write(chunk)
+                    digest.update(chunk)
+                    md5.update(chunk)
+                    size += len(chunk)
+                    yield chunk
+
+            sha256 = digest.hexdigest()
+            blob_path = self.blob_dir / sha256
+            is_new = not blob_path.exists()
+            os.replace(temp_path, blob_path)
+            if is_new:
+                self._added(size)
+            self._write_index(file_id, {
+                'size': size,
+                'sha256': sha256,
+                'md5': md5.hexdigest(),
+                'name': metadata.get('name', ''),
+                'mime_type': metadata.get('mimeType', ''),
+                'modified_time': metadata.get('modifiedTime'),
+            })
+            stored = True
+            logger.info(f"Cached file {file_id} ({size} bytes)")
+            self.evict(keep=file_id)
+        finally:
+            if not stored:
+                self._remove(temp_path)
+
+    def _download(self, file_id):
+        metadata, chunks = self.stream(file_id)
+        for _ in chunks:
+            pass
+        cached = self.get(file_id)
+        if cached is None:
+            raise RuntimeError(f"Drive file {file_id} was evicted while being cached")
+        return cached
+
+    def _added(self, size):
+        with self._evict_lock:
+            if self._total_bytes is not None:
+                self._total_bytes += size
+
+    def evict(self, keep=None, force=False):
+        """
+        Drop least recently used entries once the cache outgrows max_bytes.
+
+        Args:
+            keep (Optional[str]): File ID that must survive, e.g. the one just downloaded
+            force (bool): Scan the disk even if the running total is under max_bytes
+        """
+        keep_path = self._index_path(keep) if keep else None
+        with self._evict_lock:
+            if (
+                not force
+                and self._total_bytes is not None
+                and self._total_bytes <= self.max_bytes
+                and time.time() - self._scanned_at < EVICT_RESCAN_SECONDS
+            ):
+                return
+
+            entries = []
+            for index_path in self.index_dir.glob('*.json'):
+                try:
+                    with open(index_path) as f:
+                        entry = json.load(f)
+                    entries.append((index_path.stat().st_mtime, index_path, entry['sha256']))
+                except (FileNotFoundError, ValueError, KeyError):
+                    continue
+
+            blob_sizes = {}
+            blob_mtimes = {}
+            for blob_path in self.blob_dir.iterdir():
+                if not blob_path.name.startswith('.'):
+                    try:
+                        stat = blob_path.stat()
+                    except FileNotFoundError:
+                        continue
+                    blob_sizes[blob_path.name] = stat.st_size
+                    blob_mtimes[blob_path.name] = stat.st_mtime
+
+            total = sum(blob_sizes.values())
+            self._scanned_at = time.time()
+            self._total_bytes = total
+            if total <= self.max_bytes:
+                return
+            target = self.max_bytes * EVICT_LOW_WATER
+
+            references = {}
+            for _, _, sha256 in entries:
+                references[sha256] = references.get(sha256, 0) + 1
+
+            # Blobs no entry points at go first, then entries from least recently used
+            orphan_cutoff = time.time() - ORPHAN_GRACE_SECONDS
+            for sha256, size in list(blob_sizes.items()):
+                if sha256 not in references and blob_mtimes[sha256] < orphan_cutoff:
+                    self._remove(self.blob_dir / sha256)
+                    total -= size
+
+            for _, index_path, sha256 in sorted(entries):
+                if total <= target:
+                    break
+                if index_path == keep_path:
+                    continue
+                self._remove(index_path)
+                references[sha256] -= 1
+                if references[sha256] == 0 and sha256 in blob_sizes:
+                    self._remove(self.blob_dir / sha256)
+                    total -= blob_sizes[sha256]
+            self._total_bytes = total
+
+    def _index_path(self, file_id):
+        # Drive IDs are URL-safe, but never let one escape the index directory
+        safe_id = ''.join(c for c in file_id if c.isalnum() or c in '-_')
+        return self.index_dir / f"{safe_id}.json"
+
+    def _write_index(self, file_id, entry):
+        fd, temp_path = tempfile.mkstemp(dir=self.index_dir, prefix='.index-')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(entry, f)
+        os.replace(temp_path, self._index_path(file_id))
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def iter_file_range(path, start: int, length: int, chunk_size: Optional[int] = None) -> Iterator[bytes]:
+    """Yield length bytes of a cached file starting at offset start"""
+    chunk_size = chunk_size or getattr(settings, 'DRIVE_DOWNLOAD_CHUNK_SIZE', DEFAULT_DOWNLOAD_CHUNK_SIZE)
+    with open(path, 'rb') as f:
+        f.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = f.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_drive_file_cache() -> DriveFileCache:
+    """Return the process-wide Drive download cache"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = DriveFileCache()
+    return _cache
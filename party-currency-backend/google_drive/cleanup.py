@@ -0,0 +1,168 @@
+import logging
+import os
+import time
+from datetime import timedelta
+from typing import Iterable, Optional
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from authentication.models import CustomUser
+from currencies.images import STAGING_DIR, staging_storage
+from currencies.models import Currency
+from media_storage.drive import DriveStorage
+from .cache import get_drive_file_cache
+from .models import GoogleDriveFile, ImageVariant
+from .utils import BATCH_SIZE, delete_files_from_drive, list_files_in_drive
+
+logger = logging.getLogger("google_drive_cleanup")
+
+# Served by users.views.get_picture to users without a picture
+DEFAULT_PROFILE_PICTURE_ID = '1f0umstb0KjrMoDqK-om2jrzyKsI2RhGx'
+ARCHIVED_AUTHOR = 'archived'
+
+
+def drive_folders() -> list:
+    """Drive folders that hold assets configured in settings.MEDIA_STORAGE"""
+    folders = []
+    for config in settings.MEDIA_STORAGE.values():
+        folder_id = config.get('FOLDER_ID')
+        if config['BACKEND'] == 'drive' and folder_id and folder_id not in folders:
+            folders.append(folder_id)
+    return folders
+
+
+def referenced_drive_ids() -> set:
+    """
+    IDs of Drive files still in use: images of live currencies, profile
+    pictures, and the thumbnail variants of both. Images of currencies
+    archived by delete_currency no longer count.
+    """
+    drive = DriveStorage()
+    referenced = {DEFAULT_PROFILE_PICTURE_ID}
+
+    currencies = Currency.objects.exclude(currency_author=ARCHIVED_AUTHOR).values_list('front_image', 'back_image')
+    for front_image, back_image in currencies.iterator(chunk_size=2000):
+        referenced.update(drive.parse_reference(reference) for reference in (front_image, back_image) if reference)
+
+    pictures = CustomUser.objects.exclude(profile_picture__isnull=True).exclude(profile_picture='')
+    for reference in pictures.values_list('profile_picture', flat=True).iterator(chunk_size=2000):
+        referenced.add(drive.parse_reference(reference))
+
+    referenced.discard(None)
+    variants = ImageVariant.objects.values_list('source_file_id', 'google_drive_id')
+    referenced.update(
+        variant_id for source_id, variant_id in variants.iterator(chunk_size=2000) if source_id in referenced
+    )
+    return referenced
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def collect_drive_garbage(
+    dry_run: bool = True,
+    min_age: timedelta = timedelta(days=1),
+    folder_ids: Optional[Iterable[str]] = None
+) -> dict:
+    """
+    Delete Drive files in the asset folders that no record points at.
+
+    References are read before the folders are listed, and files younger than
+    min_age are kept, so an image uploaded while the job runs (or whose
+    currency row has not been updated yet) is never taken for an orphan.
+    Deletes are sent in batches of BATCH_SIZE, and the dedup and variant rows of
+    each batch are dropped first.
+
+    Args:
+        dry_run (bool): Only report what would be deleted
+        min_age (timedelta): Files created more recently than this are kept
+        folder_ids (Optional[Iterable[str]]): Folders to scan, defaults to drive_folders()
+
+    Returns:
+        dict: Counts of scanned, kept, recent and orphaned files, orphaned bytes and deletions
+    """
+    referenced = referenced_drive_ids()
+    cutoff = timezone.now() - min_age
+    report = {'dry_run': dry_run, 'scanned': 0, 'referenced': 0, 'recent': 0, 'orphans': 0, 'orphan_bytes': 0, 'deleted': 0}
+
+    orphans = []
+    for folder_id in (folder_ids if folder_ids is not None else drive_folders()):
+        for drive_file in list_files_in_drive(folder_id):
+            report['scanned'] += 1
+            if drive_file['id'] in referenced:
+                report['referenced'] += 1
+                continue
+            created = parse_datetime(drive_file.get('createdTime') or '')
+            if created is None or created > cutoff:
+                report['recent'] += 1
+                continue
+            orphans.append(drive_file['id'])
+            report['orphan_bytes'] += int(drive_file.get('size') or 0)
+    report['orphans'] = len(orphans)
+
+    if dry_run:
+        logger.info(f"Drive garbage collection (dry run): {report}")
+        return report
+
+    for batch in _chunks(orphans, BATCH_SIZE):
+        GoogleDriveFile.objects.filter(google_drive_id__in=batch).delete()
+        ImageVariant.objects.filter(google_drive_id__in=batch).delete()
+        ImageVariant.objects.filter(source_file_id__in=batch).delete()
+        deleted = delete_files_from_drive(batch)
+        report['deleted'] += sum(deleted.values())
+        for file_id in batch:
+            get_drive_file_cache().invalidate(file_id)
+
+    logger.info(f"Drive garbage collection: {report}")
+    return report
+
+
+def clean_local_leftovers(dry_run: bool = True, min_age: timedelta = timedelta(days=1)) -> dict:
+    """
+    Remove local files nothing will pick up again: the legacy tmp/ upload
+    directory, staged currency images whose upload finished or was given up,
+    and temp files of interrupted Drive cache writes.
+
+    Returns:
+        dict: Number of files removed (or that would be) per location
+    """
+    max_age_seconds = min_age.total_seconds()
+    cutoff = time.time() - max_age_seconds
+    report = {'tmp': 0, 'staged': 0, 'cache_temp': 0}
+
+    tmp_dir = os.path.join(settings.BASE_DIR, 'tmp')
+    if os.path.isdir(tmp_dir):
+        for entry in os.scandir(tmp_dir):
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                if not dry_run:
+                    os.remove(entry.path)
+                report['tmp'] += 1
+
+    staging = staging_storage()
+    try:
+        currency_ids, _ = staging.listdir(STAGING_DIR)
+    except FileNotFoundError:
+        currency_ids = []
+    pending = set(
+        Currency.objects.filter(currency_id__in=currency_ids, images_status=Currency.IMAGES_PENDING)
+        .values_list('currency_id', flat=True)
+    )
+    staged_cutoff = timezone.now() - min_age
+    for currency_id in currency_ids:
+        if currency_id in pending:
+            continue
+        _, file_names = staging.listdir(f"{STAGING_DIR}/{currency_id}")
+        for file_name in file_names:
+            path = f"{STAGING_DIR}/{currency_id}/{file_name}"
+            if staging.get_modified_time(path) < staged_cutoff:
+                if not dry_run:
+                    staging.delete(path)
+                report['staged'] += 1
+
+    report['cache_temp'] = get_drive_file_cache().remove_stale_temp_files(max_age_seconds, dry_run=dry_run)
+    logger.info(f"Local leftovers {'found' if dry_run else 'removed'}: {report}")
+    return report
@@ -0,0 +1,149 @@
+import hashlib
+import logging
+import mimetypes
+from collections import Counter
+from typing import BinaryIO, Dict, Iterable, Optional, Tuple
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import GoogleDriveFile, ImageVariant
+from .utils import UPLOAD_CHUNK_SIZE, delete_file_from_drive, delete_files_from_drive, upload_fileobj_to_drive
+
+logger = logging.getLogger("google_drive_dedup")
+
+
+def hash_fileobj(file_obj: BinaryIO, chunk_size: int = UPLOAD_CHUNK_SIZE) -> Tuple[str, int]:
+    """
+    Hash a seekable file-like object without reading it into memory at once.
+
+    Returns:
+        tuple: (SHA-256 hex digest, size in bytes); the file is rewound afterwards
+    """
+    digest = hashlib.sha256()
+    size = 0
+    file_obj.seek(0)
+    for chunk in iter(lambda: file_obj.read(chunk_size), b''):
+        digest.update(chunk)
+        size += len(chunk)
+    file_obj.seek(0)
+    return digest.hexdigest(), size
+
+
+def _acquire(content_hash):
+    """Take a reference on the Drive file holding this content, or return None"""
+    with transaction.atomic():
+        drive_file = GoogleDriveFile.objects.select_for_update().filter(content_hash=content_hash).first()
+        if drive_file is None:
+            return None
+        GoogleDriveFile.objects.filter(pk=drive_file.pk).update(ref_count=F('ref_count') + 1)
+        return drive_file.google_drive_id
+
+
+def store_file(
+    file_obj: BinaryIO,
+    file_name: str,
+    folder_id: Optional[str] = None,
+    mime_type: Optional[str] = None
+) -> Tuple[str, bool]:
+    """
+    Upload a file to Drive unless a file with the same bytes is already there.
+
+    Every call takes one reference on the returned Drive file; give it back with
+    release_file when the record pointing at it is changed or removed.
+
+    Args:
+        file_obj (BinaryIO): Seekable binary file-like object to upload
+        file_name (str): Name to give the file in Drive if it is uploaded
+        folder_id (Optional[str]): ID of the folder to upload to
+        mime_type (Optional[str]): MIME type of the file (if None, guessed from file_name)
+
+    Returns:
+        tuple: (Drive file ID, True if the file was uploaded by this call)
+    """
+    content_hash, size = hash_fileobj(file_obj)
+    file_id = _acquire(content_hash)
+    if file_id is not None:
+        logger.info(f"Reusing Drive file {file_id} for {file_name}")
+        return file_id, False
+
+    if mime_type is None:
+        mime_type = mimetypes.guess_type(file_name)[0] or ''
+    file_id = upload_fileobj_to_drive(file_obj, file_name, folder_id, mime_type=mime_type or None)
+    try:
+        with transaction.atomic():
+            GoogleDriveFile.objects.create(
+                name=file_name,
+                google_drive_id=file_id,
+                content_hash=content_hash,
+                mime_type=mime_type,
+                byte_size=size,
+            )
+        return file_id, True
+    except IntegrityError:
+        # Another worker uploaded the same content first; keep theirs
+        try:
+            delete_file_from_drive(file_id)
+        except Exception as e:
+            logger.warning(f"Could not delete duplicate Drive file {file_id}: {str(e)}")
+        existing_id = _acquire(content_hash)
+        if existing_id is None:
+            raise
+        return existing_id, False
+
+
+def release_files(google_drive_ids: Iterable[str]) -> Dict[str, bool]:
+    """
+    Give back one reference on each Drive file and delete those, with their
+    image variants, that nothing points at any more. The Drive deletes are
+    sent as batch requests.
+
+    Files that were not stored through store_file are never deleted, as their
+    references are unknown.
+
+    Returns:
+        dict: {google_drive_id: True if the Drive file was deleted}
+    """
+    # An ID listed twice gives back two references
+    counts = Counter(google_drive_id for google_drive_id in google_drive_ids if google_drive_id)
+    released = {google_drive_id: False for google_drive_id in counts}
+    if not released:
+        return {}
+
+    unreferenced = []
+    with transaction.atomic():
+        for drive_file in GoogleDriveFile.objects.select_for_update().filter(
+            google_drive_id__in=list(released), content_hash__isnull=False
+        ):
+            count = counts[drive_file.google_drive_id]
+            if drive_file.ref_count > count:
+                GoogleDriveFile.objects.filter(pk=drive_file.pk).update(ref_count=F('ref_count') - count)
+            else:
+                unreferenced.append(drive_file.google_drive_id)
+        if not unreferenced:
+            return released
+        GoogleDriveFile.objects.filter(google_drive_id__in=unreferenced, content_hash__isnull=False).delete()
+        variants = ImageVariant.objects.filter(source_file_id__in=unreferenced)
+        variant_ids = list(variants.values_list('google_drive_id', flat=True))
+        variants.delete()
+
+    # Drive deletes happen after the rows are gone; a failure only leaves orphan files
+    try:
+        delete_files_from_drive(unreferenced + variant_ids)
+    except Exception as e:
+        logger.warning(f"Could not delete unreferenced Drive files: {str(e)}")
+    for google_drive_id in unreferenced:
+        released[google_drive_id] = True
+    logger.info(f"Deleted {len(unreferenced)} unreferenced Drive files and {len(variant_ids)} variants")
+    return released
+
+
+def release_file(google_drive_id: Optional[str]) -> bool:
+    """
+    Give back one reference on a Drive file, deleting it once nothing points
+    at it. See release_files.
+
+    Returns:
+        bool: True if the Drive file was deleted
+    """
+    return release_files([google_drive_id]).get(google_drive_id, False)
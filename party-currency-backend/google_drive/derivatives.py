@@ -0,0 +1,229 @@
+import io
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Optional
+
+from django.conf import settings
+from PIL import Image, ImageOps
+
+from .cache import get_drive_file_cache
+from .models import ImageVariant
+
+logger = logging.getLogger("google_drive_derivatives")
+
+# Longest edge in pixels for each size bucket; images are never upscaled
+SIZE_BUCKETS = {
+    'thumb': 160,
+    'small': 320,
+    'medium': 640,
+    'large': 1280,
+}
+# format: (Pillow format, content type, extension, save options)
+FORMATS = {
+    'webp': ('WEBP', 'image/webp', '.webp', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', 'image/jpeg', '.jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+# Rendered as soon as an image is uploaded; other sizes are made on first request
+EAGER_SIZES = ('thumb', 'small')
+
+
+def render_variant(data: bytes, max_dimension: int, variant_format: str) -> tuple:
+    """
+    Resize and re-encode an image. Runs in a worker process, so it only takes
+    and returns picklable values.
+
+    Returns:
+        tuple: (encoded bytes, width, height)
+
+    Raises:
+        PIL.UnidentifiedImageError: If data is not an image Pillow can read
+    """
+    pil_format, _, _, options = FORMATS[variant_format]
+    with Image.open(io.BytesIO(data)) as original:
+        image = ImageOps.exif_transpose(original)
+        image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+
+        has_alpha = 'A' in image.getbands() or 'transparency' in image.info
+        if variant_format == 'jpeg' and image.mode != 'RGB':
+            # JPEG has no alpha channel, flatten onto white
+            rgba = image.convert('RGBA')
+            image = Image.new('RGB', rgba.size, (255, 255, 255))
+            image.paste(rgba, mask=rgba.getchannel('A'))
+        elif image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if has_alpha else 'RGB')
+
+        output = io.BytesIO()
+        image.save(output, pil_format, **options)
+        return output.getvalue(), image.width, image.height
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    """
+    Return this process's render pool, or None to render inline. Daemonic
+    processes such as Celery prefork children cannot start a pool.
+    """
+    global _pool, _pool_pid
+    if multiprocessing.current_process().daemon:
+        return None
+    pid = os.getpid()
+    if _pool is None or _pool_pid != pid:
+        with _pool_lock:
+            if _pool is None or _pool_pid != pid:
+                _pool = ProcessPoolExecutor(max_workers=settings.IMAGE_VARIANT_WORKERS)
+                _pool_pid = pid
+    return _pool
+
+
+def render_variants(data: bytes, variants: Iterable[tuple]) -> dict:
+    """
+    Render several (size, format) variants of one image in parallel.
+
+    Returns:
+        dict: {(size, format): (encoded bytes, width, height)}
+    """
+    variants = list(variants)
+    pool = _get_pool()
+    if pool is None:
+        return {
+            (size, variant_format): render_variant(data, SIZE_BUCKETS[size], variant_format)
+            for size, variant_format in variants
+        }
+    futures = {
+        (size, variant_format): pool.submit(render_variant, data, SIZE_BUCKETS[size], variant_format)
+        for size, variant_format in variants
+    }
+    return {key: future.result() for key, future in futures.items()}
+
+
+def variant_cache_key(source_key, size, variant_format):
+    return f"variant-{source_key}-{size}-{variant_format}"
+
+
+def _variant_name(source_key, size, extension):
+    stem = os.path.splitext(os.path.basename(source_key))[0]
+    return f"{stem}_{size}{extension}"
+
+
+def generate_variants(
+    storage,
+    source_key: str,
+    data: Optional[bytes] = None,
+    sizes: Iterable[str] = EAGER_SIZES
+) -> int:
+    """
+    Render the missing WebP and JPEG variants of an image and store them with
+    the backend that holds the original.
+
+    Args:
+        storage (media_storage.StorageBackend): Backend holding the original
+        source_key (str): The original's key in that backend
+        data (Optional[bytes]): The original's bytes, fetched through the backend if None
+        sizes (Iterable[str]): Size buckets to render
+
+    Returns:
+        int: Number of variants created
+    """
+    wanted = {(size, variant_format) for size in sizes for variant_format in FORMATS}
+    existing = set(
+        ImageVariant.objects.filter(source_file_id=source_key).values_list('size', 'format')
+    )
+    missing = wanted - existing
+    if not missing:
+        return 0
+
+    if data is None:
+        with open(storage.fetch(source_key).path, 'rb') as f:
+            data = f.read()
+
+    created = 0
+    for (size, variant_format), (content, width, height) in render_variants(data, missing).items():
+        _, content_type, extension, _ = FORMATS[variant_format]
+        variant_key = storage.put_variant(
+            io.BytesIO(content), _variant_name(source_key, size, extension), content_type
+        )
+        _, was_created = ImageVariant.objects.get_or_create(
+            source_file_id=source_key,
+            size=size,
+            format=variant_format,
+            defaults={
+                'google_drive_id': variant_key,
+                'width': width,
+                'height': height,
+                'byte_size': len(content),
+            }
+        )
+        if not was_created:
+            # Another worker stored this variant first; keep theirs
+            try:
+                storage.delete_variants([variant_key])
+            except Exception as e:
+                logger.warning(f"Could not delete duplicate variant {variant_key}: {str(e)}")
+        created += was_created
+
+    logger.info(f"Created {created} image variants for {source_key}")
+    return created
+
+
+def get_variant_file(storage, source_key: str, size: str, variant_format: str):
+    """
+    Return a variant of an image as a cached file, rendering it on first request.
+
+    A variant rendered here is served from the local cache at once. A
+    background task stores it in the backend for other hosts.
+
+    Returns:
+        google_drive.cache.CachedFile: The variant's bytes on local disk
+    """
+    file_cache = get_drive_file_cache()
+    key = variant_cache_key(source_key, size, variant_format)
+    cached = file_cache.get(key)
+    if cached is not None:
+        return cached
+
+    variant = ImageVariant.objects.filter(
+        source_file_id=source_key, size=size, format=variant_format
+    ).only('google_drive_id').first()
+    if variant is not None:
+        return storage.fetch(variant.google_drive_id)
+
+    with open(storage.fetch(source_key).path, 'rb') as f:
+        data = f.read()
+    content, _, _ = render_variants(data, [(size, variant_format)])[(size, variant_format)]
+    _, content_type, extension, _ = FORMATS[variant_format]
+    cached = file_cache.put(key, content, name=_variant_name(source_key, size, extension), mime_type=content_type)
+
+    from .tasks import generate_image_variants_task
+    try:
+        generate_image_variants_task.delay(storage.reference(source_key), sizes=[size])
+    except Exception as e:
+        logger.error(f"Could not queue variant generation for {source_key}: {str(e)}")
+    return cached
+
+
+def delete_variants_of(storage, source_keys: Iterable[str]) -> int:
+    """
+    Forget the variants of originals that were deleted and remove them from
+    the backend. The Drive backend does this itself in dedup.release_files.
+
+    Returns:
+        int: Number of variants deleted
+    """
+    variants = ImageVariant.objects.filter(source_file_id__in=list(source_keys))
+    variant_keys = list(variants.values_list('google_drive_id', flat=True))
+    if not variant_keys:
+        return 0
+    variants.delete()
+    # Backend deletes happen after the rows are gone; a failure only leaves orphan files
+    try:
+        storage.delete_variants(variant_keys)
+    except Exception as e:
+        logger.warning(f"Could not delete variants {variant_keys}: {str(e)}")
+    return len(variant_keys)
@@ -0,0 +1,30 @@
+# Generated by Django 5.1.7 on 2026-10-18 10:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('google_drive', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageVariant',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source_file_id', models.CharField(max_length=255)),
+                ('size', models.CharField(max_length=20)),
+                ('format', models.CharField(max_length=10)),
+                ('google_drive_id', models.CharField(max_length=255)),
+                ('width', models.IntegerField()),
+                ('height', models.IntegerField()),
+                ('byte_size', models.IntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('source_file_id', 'size', 'format'), name='unique_image_variant')],
+            },
+        ),
+    ]
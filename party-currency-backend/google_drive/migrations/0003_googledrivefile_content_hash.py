@@ -0,0 +1,38 @@
+# Generated by Django 5.1.7 on 2026-10-18 10:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('google_drive', '0002_imagevariant'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='googledrivefile',
+            name='byte_size',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='googledrivefile',
+            name='content_hash',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='googledrivefile',
+            name='mime_type',
+            field=models.CharField(blank=True, default='', max_length=100),
+        ),
+        migrations.AddField(
+            model_name='googledrivefile',
+            name='ref_count',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AlterField(
+            model_name='googledrivefile',
+            name='google_drive_id',
+            field=models.CharField(db_index=True, max_length=255),
+        ),
+    ]
@@ -2,8 +2,37 @@ from django.db import models
 
 class GoogleDriveFile(models.Model):
     name = models.CharField(max_length=255)
+    google_drive_id = models.CharField(max_length=255, db_index=True)
+    # SHA-256 of the file's bytes; identical uploads share one Drive file
+    content_hash = models.CharField(max_length=64, unique=True, null=True, blank=True)
+    mime_type = models.CharField(max_length=100, blank=True, default='')
+    byte_size = models.BigIntegerField(null=True, blank=True)
+    # Number of records pointing at this Drive file; it is deleted when this reaches 0
+    ref_count = models.PositiveIntegerField(default=1)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.name
+
+class ImageVariant(models.Model):
+    """
+    Resized, re-encoded copy of an image, stored by the media storage backend
+    that holds its original. The field names predate the other backends:
+    source_file_id and google_drive_id hold that backend's keys.
+    """
+    source_file_id = models.CharField(max_length=255)
+    size = models.CharField(max_length=20)
+    format = models.CharField(max_length=10)
     google_drive_id = models.CharField(max_length=255)
+    width = models.IntegerField()
+    height = models.IntegerField()
+    byte_size = models.IntegerField()
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['source_file_id', 'size', 'format'], name='unique_image_variant'),
+        ]
+
     def __str__(self):
-        return self.name
\ No newline at end of file
+        return f"{self.source_file_id} {self.size} {self.format}"
@@ -0,0 +1,149 @@
+import json
+import logging
+import os
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from googleapiclient.errors import HttpError
+
+logger = logging.getLogger("google_drive_quota")
+
+RATE_LIMIT_REASONS = {'rateLimitExceeded', 'userRateLimitExceeded'}
+BACKOFF_BASE_SECONDS = 1
+BACKOFF_MAX_SECONDS = 64
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: holds up to capacity tokens and refills at rate
+    tokens per second. acquire() blocks until enough tokens are available.
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def acquire(self, tokens=1):
+        """
+        Take tokens, sleeping until they are available; returns the time waited.
+
+        A request for more than capacity waits for a full bucket and leaves it
+        in debt, so later callers wait until the average rate is respected.
+        """
+        needed = min(tokens, self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill(time.monotonic())
+                if self.tokens >= needed:
+                    self.tokens -= tokens
+                    return waited
+                delay = (needed - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+class DriveQuota:
+    """
+    Keeps Drive API calls under the per-user quota.
+
+    Every call takes a token from this process's bucket, sized by
+    DRIVE_API_RATE_PER_SECOND (the project quota divided by the number of
+    processes calling Drive). When Drive still answers with a rate-limit error,
+    a pause is written to the shared cache so every worker backs off, not just
+    the one that hit the limit.
+    """
+    PAUSE_KEY = "drive_quota_paused_until"
+
+    def __init__(self, rate=None, burst=None):
+        rate = rate if rate is not None else settings.DRIVE_API_RATE_PER_SECOND
+        burst = burst if burst is not None else settings.DRIVE_API_BURST
+        self.bucket = TokenBucket(rate, burst)
+
+    def acquire(self, tokens=1):
+        paused_until = cache.get(self.PAUSE_KEY)
+        if paused_until:
+            remaining = paused_until - time.time()
+            if remaining > 0:
+                time.sleep(remaining)
+        return self.bucket.acquire(tokens)
+
+    def pause(self, seconds):
+        """Make every worker wait seconds before its next Drive call"""
+        until = time.time() + seconds
+        current = cache.get(self.PAUSE_KEY)
+        if not current or current < until:
+            cache.set(self.PAUSE_KEY, until, timeout=int(seconds) + 1)
+        logger.warning(f"Drive rate limit hit, pausing calls for {seconds:.1f}s")
+
+
+def is_rate_limit_error(error):
+    """True for 429s and the 403s Drive uses for rate limits (not permission errors)"""
+    if not isinstance(error, HttpError):
+        return False
+    if error.resp.status == 429:
+        return True
+    if error.resp.status != 403:
+        return False
+    try:
+        details = json.loads(error.content.decode('utf-8'))['error']['errors']
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return False
+    return any(detail.get('reason') in RATE_LIMIT_REASONS for detail in details)
+
+
+def backoff_seconds(attempt, retry_after=None):
+    """Exponential backoff with full jitter, honouring a Retry-After header"""
+    if retry_after:
+        try:
+            return min(float(retry_after), BACKOFF_MAX_SECONDS)
+        except ValueError:
+            pass
+    return random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * (2 ** attempt)))
+
+
+def execute(request, max_attempts=None):
+    """
+    Execute a Drive API request under the quota, retrying rate-limit errors
+    with backoff.
+
+    Raises:
+        HttpError: Any other error, or a rate-limit error after max_attempts
+    """
+    quota = get_drive_quota()
+    max_attempts = max_attempts or settings.DRIVE_API_MAX_ATTEMPTS
+    for attempt in range(max_attempts):
+        quota.acquire()
+        try:
+            return request.execute()
+        except HttpError as e:
+            if not is_rate_limit_error(e) or attempt == max_attempts - 1:
+                raise
+            quota.pause(backoff_seconds(attempt, e.resp.get('retry-after')))
+
+
+_quota = None
+_quota_pid = None
+_quota_lock = threading.Lock()
+
+
+def get_drive_quota():
+    """Return the process-wide Drive quota scheduler, rebuilt after a fork"""
+    global _quota, _quota_pid
+    pid = os.getpid()
+    if _quota is None or _quota_pid != pid:
+        with _quota_lock:
+            if _quota is None or _quota_pid != pid:
+                _quota = DriveQuota()
+                _quota_pid = pid
+    return _quota
@@ -0,0 +1,36 @@
+from datetime import timedelta
+
+from celery import shared_task
+from django.conf import settings
+
+from media_storage import storage_for_reference
+from .cleanup import clean_local_leftovers, collect_drive_garbage
+from .derivatives import EAGER_SIZES, generate_variants
+
+
+@shared_task
+def generate_image_variants_task(reference, sizes=EAGER_SIZES):
+    """
+    Celery task that renders thumbnail variants of an uploaded image and
+    stores them with the media storage backend holding the original.
+    """
+    storage, key = storage_for_reference(reference)
+    if storage is None:
+        raise ValueError(f"No media storage holds {reference}")
+    return generate_variants(storage, key, sizes=sizes)
+
+
+@shared_task
+def collect_drive_garbage_task(dry_run=None):
+    """
+    Celery task that deletes Drive files no currency or user points at any
+    more and removes stale local upload leftovers. Without dry_run it follows
+    settings.DRIVE_GC_DRY_RUN. This task is scheduled to run daily at 03:30.
+    """
+    if dry_run is None:
+        dry_run = settings.DRIVE_GC_DRY_RUN
+    min_age = timedelta(hours=settings.DRIVE_GC_MIN_AGE_HOURS)
+    return {
+        'drive': collect_drive_garbage(dry_run=dry_run, min_age=min_age),
+        'local': clean_local_leftovers(dry_run=dry_run, min_age=min_age),
+    }
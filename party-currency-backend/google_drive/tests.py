@@ -1,3 +1,430 @@
-from django.test import TestCase
+import hashlib
+import io
+import json
+import os
+import shutil
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+import httplib2
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from googleapiclient.errors import HttpError
+from PIL import Image
+
+from authentication.models import CustomUser
+from currencies.models import Currency
+from media_storage import get_storage, reset_storages
+from .cache import DriveFileCache
+from .cleanup import ARCHIVED_AUTHOR, collect_drive_garbage
+from .dedup import release_file, release_files, store_file
+from .derivatives import EAGER_SIZES, FORMATS, SIZE_BUCKETS, generate_variants
+from .models import GoogleDriveFile, ImageVariant
+from .tasks import generate_image_variants_task
+from .utils import BATCH_SIZE, delete_files_from_drive, get_files_metadata, list_files_in_drive
+
+
+def _png(width=800, height=600):
+    output = io.BytesIO()
+    Image.new('RGBA', (width, height), (200, 30, 60, 255)).save(output, 'PNG')
+    output.seek(0)
+    return output
+
+
+class LocalVariantTests(TestCase):
+    """Variants of a non-Drive backend are stored and deleted through that backend"""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        settings_override = override_settings(
+            MEDIA_STORAGE={'currency_images': {'BACKEND': 'local', 'PREFIX': 'currencies'}},
+            MEDIA_STORAGE_LOCAL_DIR=self.root,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        reset_storages()
+        self.addCleanup(reset_storages)
+        self.storage = get_storage('currency_images')
+
+        file_cache = DriveFileCache(root=f"{self.root}/cache")
+        patcher = mock.patch('google_drive.derivatives.get_drive_file_cache', return_value=file_cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        # Run queued variant tasks inline
+        patcher = mock.patch.object(generate_image_variants_task, 'delay', side_effect=generate_image_variants_task)
+        self.delay = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_put_renders_eager_variants(self):
+        key = self.storage.put(_png(), 'note.png')
+        self.delay.assert_called_once_with(f"local://{key}")
+
+        variants = ImageVariant.objects.filter(source_file_id=key)
+        self.assertEqual(variants.count(), len(EAGER_SIZES) * len(FORMATS))
+        for variant in variants:
+            self.assertTrue(self.storage.exists(variant.google_drive_id))
+            self.assertLessEqual(max(variant.width, variant.height), SIZE_BUCKETS[variant.size])
+            self.assertNotEqual(variant.google_drive_id, key)
+
+    def test_variant_is_rendered_on_first_request(self):
+        self.storage.variants = False
+        key = self.storage.put(_png(), 'note.png')
+        self.delay.assert_not_called()
+
+        cached = self.storage.variant(key, 'medium', 'webp')
+        with Image.open(cached.path) as image:
+            self.assertEqual((image.format, image.size), ('WEBP', (640, 480)))
+        # The render is stored in the background for other hosts
+        self.delay.assert_called_once_with(f"local://{key}", sizes=['medium'])
+        stored = ImageVariant.objects.get(source_file_id=key, size='medium', format='webp')
+        self.assertTrue(self.storage.exists(stored.google_drive_id))
+
+    def test_generate_variants_skips_existing(self):
+        self.storage.variants = False
+        key = self.storage.put(_png(), 'note.png')
+        self.assertEqual(generate_variants(self.storage, key, sizes=['thumb']), len(FORMATS))
+        self.assertEqual(generate_variants(self.storage, key, sizes=['thumb']), 0)
+
+    def test_delete_removes_variants(self):
+        key = self.storage.put(_png(), 'note.png')
+        variant_keys = list(ImageVariant.objects.filter(source_file_id=key).values_list('google_drive_id', flat=True))
+        self.assertTrue(variant_keys)
+
+        self.assertTrue(self.storage.delete(key))
+        self.assertFalse(ImageVariant.objects.filter(source_file_id=key).exists())
+        for variant_key in variant_keys:
+            self.assertFalse(self.storage.exists(variant_key))
+
+
+class SourceCache(DriveFileCache):
+    """DriveFileCache filled from a dict instead of Drive"""
+
+    def __init__(self, files, **kwargs):
+        super().__init__(**kwargs)
+        self.files = files
+
+    def _fetch_metadata(self, file_id):
+        return {'name': file_id, 'mimeType': 'image/png', 'size': len(self.files[file_id])}
+
+    def _iter_source(self, file_id, chunk_size):
+        content = self.files[file_id]
+        for start in range(0, len(content), 4):
+            yield content[start:start + 4]
+
+
+class DriveFileCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.cache = DriveFileCache(root=self.root, max_bytes=1000)
+
+    def _age(self, file_id, seconds_ago):
+        """Backdate an entry's last use"""
+        index_path = self.cache._index_path(file_id)
+        mtime = os.stat(index_path).st_mtime - seconds_ago
+        os.utime(index_path, (mtime, mtime))
+
+    def test_least_recently_used_entries_are_evicted(self):
+        self.cache.put('a', b'a' * 400)
+        self.cache.put('b', b'b' * 400)
+        self._age('a', 200)
+        self._age('b', 100)
+        # Reading an entry marks it used
+        self.assertIsNotNone(self.cache.get('a'))
+
+        self.cache.put('c', b'c' * 400)
+        self.assertIsNone(self.cache.get('b'))
+        self.assertIsNotNone(self.cache.get('a'))
+        self.assertIsNotNone(self.cache.get('c'))
+        self.assertEqual(self.cache._total_bytes, 800)
+
+    def test_entry_being_stored_is_kept(self):
+        self.cache.put('a', b'a' * 400)
+        self._age('a', 100)
+        self.cache.put('big', b'x' * 1200)
+        self.assertIsNone(self.cache.get('a'))
+        self.assertIsNotNone(self.cache.get('big'))
+
+    def test_shared_blob_outlives_one_entry(self):
+        self.cache.put('a', b's' * 600)
+        self.cache.put('copy', b's' * 600)
+        self.assertEqual(self.cache.get('a').path, self.cache.get('copy').path)
+        self.assertEqual(self.cache._total_bytes, 600)
+
+        self._age('a', 200)
+        self._age('copy', 100)
+        self.cache.put('b', b'b' * 500)
+        # Dropping 'a' alone freed nothing, so 'copy' went too
+        self.assertIsNone(self.cache.get('a'))
+        self.assertIsNone(self.cache.get('copy'))
+        self.assertEqual(self.cache._total_bytes, 500)
+
+    def test_writes_under_the_limit_do_not_rescan(self):
+        self.cache.put('a', b'a' * 300)
+        with mock.patch.object(type(self.cache.index_dir), 'glob') as glob:
+            self.cache.put('b', b'b' * 300)
+        glob.assert_not_called()
+        self.assertEqual(self.cache._total_bytes, 600)
+
+    def test_stream_stores_a_complete_copy(self):
+        content = b'0123456789abcdef'
+        cache = SourceCache({'img': content}, root=self.root)
+        metadata, chunks = cache.stream('img')
+        self.assertEqual(metadata['size'], len(content))
+        self.assertEqual(b''.join(chunks), content)
+
+        cached = cache.get('img')
+        self.assertEqual(cached.size, len(content))
+        self.assertEqual(cached.etag, f'"{hashlib.md5(content).hexdigest()}"')
+
+    def test_abandoned_stream_is_discarded(self):
+        cache = SourceCache({'img': b'0123456789abcdef'}, root=self.root)
+        _, chunks = cache.stream('img')
+        next(chunks)
+        chunks.close()
+        self.assertIsNone(cache.get('img'))
+        self.assertEqual(os.listdir(cache.blob_dir), [])
+
+
+class DedupTests(TestCase):
+    """Identical uploads share one Drive file, deleted when its last reference goes"""
+
+    def setUp(self):
+        self.uploaded = []
+        upload = mock.patch('google_drive.dedup.upload_fileobj_to_drive', side_effect=self._upload)
+        upload.start()
+        self.addCleanup(upload.stop)
+        delete = mock.patch('google_drive.dedup.delete_files_from_drive')
+        self.delete = delete.start()
+        self.addCleanup(delete.stop)
+
+    def _upload(self, file_obj, file_name, folder_id=None, mime_type=None):
+        self.uploaded.append(file_obj.read())
+        return f"drive{len(self.uploaded)}"
+
+    def _deleted(self):
+        return sorted(file_id for call in self.delete.call_args_list for file_id in call.args[0])
+
+    def test_identical_content_is_uploaded_once(self):
+        first, uploaded = store_file(io.BytesIO(b'same bytes'), 'a.png')
+        self.assertTrue(uploaded)
+        second, uploaded = store_file(io.BytesIO(b'same bytes'), 'b.png')
+        self.assertFalse(uploaded)
+        other, _ = store_file(io.BytesIO(b'other bytes'), 'c.png')
+
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+        self.assertEqual(self.uploaded, [b'same bytes', b'other bytes'])
+        self.assertEqual(GoogleDriveFile.objects.get(google_drive_id=first).ref_count, 2)
+
+    def test_last_release_deletes_the_file_and_its_variants(self):
+        file_id, _ = store_file(io.BytesIO(b'same bytes'), 'a.png')
+        store_file(io.BytesIO(b'same bytes'), 'b.png')
+        ImageVariant.objects.create(
+            source_file_id=file_id, size='thumb', format='webp', google_drive_id='variant1',
+            width=160, height=120, byte_size=10
+        )
+
+        self.assertFalse(release_file(file_id))
+        self.delete.assert_not_called()
+        self.assertTrue(release_file(file_id))
+        self.assertEqual(self._deleted(), [file_id, 'variant1'])
+        self.assertFalse(GoogleDriveFile.objects.exists())
+        self.assertFalse(ImageVariant.objects.exists())
+
+    def test_release_counts_repeated_ids(self):
+        file_id, _ = store_file(io.BytesIO(b'same bytes'), 'a.png')
+        store_file(io.BytesIO(b'same bytes'), 'b.png')
+        # Files uploaded before deduplication have no known references and are kept
+        self.assertEqual(release_files([file_id, file_id, 'legacy']), {file_id: True, 'legacy': False})
+        self.assertEqual(self._deleted(), [file_id])
+
+
+def _http_error(status, reason=''):
+    content = json.dumps({'error': {'errors': [{'reason': reason}]}}).encode()
+    return HttpError(httplib2.Response({'status': status}), content)
+
+
+class FakeRequest:
+    def __init__(self, run):
+        self.run = run
+
+    def execute(self):
+        return self.run()
+
+
+class FakeBatch:
+    def __init__(self, service, callback):
+        self.service = service
+        self.callback = callback
+        self.requests = []
+
+    def add(self, request, request_id):
+        self.requests.append((request_id, request))
+
+    def execute(self):
+        self.service.batches.append([request_id for request_id, _ in self.requests])
+        for request_id, request in self.requests:
+            try:
+                self.callback(request_id, request.execute(), None)
+            except HttpError as e:
+                self.callback(request_id, None, e)
+
+
+class FakeDriveService:
+    """
+    Drive files().get/delete/list and batch requests over a {file_id: metadata}
+    dict. failures maps a file ID to errors its next calls raise, in order.
+    """
+
+    def __init__(self, files):
+        self.stored = files
+        self.failures = {}
+        self.batches = []
+        self.page_tokens = []
+
+    def files(self):
+        return self
+
+    def new_batch_http_request(self, callback):
+        return FakeBatch(self, callback)
+
+    def _call(self, file_id, action):
+        def run():
+            if self.failures.get(file_id):
+                raise self.failures[file_id].pop(0)
+            if file_id not in self.stored:
+                raise _http_error(404, 'notFound')
+            return action()
+        return FakeRequest(run)
+
+    def get(self, fileId, fields=None):
+        return self._call(fileId, lambda: self.stored[fileId])
+
+    def list(self, q=None, pageSize=100, pageToken=None, fields=None):
+        def run():
+            self.page_tokens.append(pageToken)
+            start = int(pageToken or 0)
+            files = list(self.stored.values())[start:start + pageSize]
+            page = {'files': files}
+            if start + pageSize < len(self.stored):
+                page['nextPageToken'] = str(start + pageSize)
+            return page
+        return FakeRequest(run)
+
+    def delete(self, fileId):
+        def remove():
+            del self.stored[fileId]
+            return ''
+        return self._call(fileId, remove)
+
+
+class DriveServiceTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.service = FakeDriveService({
+            f"file{i}": {'id': f"file{i}", 'name': f"file{i}.png", 'size': '10'} for i in range(250)
+        })
+        self.quota = mock.Mock()
+        for target, value in (
+            ('google_drive.utils.get_drive_service', self.service),
+            ('google_drive.utils.get_drive_quota', self.quota),
+            ('google_drive.quota.get_drive_quota', self.quota),
+        ):
+            patcher = mock.patch(target, return_value=value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+
+class BatchRequestTests(DriveServiceTestCase):
+    def test_metadata_lookups_are_batched_and_cached(self):
+        file_ids = [f"file{i}" for i in range(250)] + ['missing']
+        metadata = get_files_metadata(file_ids + ['file0'])
+
+        self.assertEqual(len(metadata), 251)
+        self.assertEqual(metadata['file7']['name'], 'file7.png')
+        self.assertIsNone(metadata['missing'])
+        self.assertEqual([len(batch) for batch in self.service.batches], [BATCH_SIZE, BATCH_SIZE, 51])
+
+        self.service.batches.clear()
+        self.assertEqual(get_files_metadata(['file1', 'file2'])['file2']['name'], 'file2.png')
+        self.assertEqual(self.service.batches, [])
+
+    def test_rate_limited_calls_are_retried(self):
+        self.service.failures['file3'] = [_http_error(429), _http_error(403, 'userRateLimitExceeded')]
+        metadata = get_files_metadata(['file1', 'file3'])
+
+        self.assertEqual(metadata['file3']['name'], 'file3.png')
+        self.assertEqual(self.service.batches, [['file1', 'file3'], ['file3'], ['file3']])
+        self.assertEqual(self.quota.pause.call_count, 2)
+
+    def test_other_errors_are_raised(self):
+        self.service.failures['file3'] = [_http_error(403, 'insufficientFilePermissions')]
+        with self.assertRaises(HttpError):
+            get_files_metadata(['file1', 'file3'])
+
+    def test_deletes_are_batched(self):
+        get_files_metadata(['file1'])
+        deleted = delete_files_from_drive(['file1', 'file2', 'file1', 'missing'])
+
+        self.assertEqual(deleted, {'file1': True, 'file2': True, 'missing': False})
+        self.assertEqual(self.service.batches[-1], ['file1', 'file2', 'missing'])
+        self.assertNotIn('file1', self.service.stored)
+        # The memoised metadata of a deleted file is dropped
+        self.assertIsNone(get_files_metadata(['file1'])['file1'])
+
+
+class DriveGarbageCollectionTests(DriveServiceTestCase):
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch('google_drive.cleanup.get_drive_file_cache')
+        self.file_cache = patcher.start()
+        self.addCleanup(patcher.stop)
+
+        old, recent = '2024-01-01T00:00:00Z', timezone.now().isoformat()
+        self.service.stored = {
+            file_id: {'id': file_id, 'createdTime': created, 'size': '100'}
+            for file_id, created in (
+                ('live', old), ('liveThumb', old), ('picture', old), ('archived', old),
+                ('orphan', old), ('fresh', recent),
+            )
+        }
+        Currency.objects.create(
+            currency_id='CURlive', event_id='EVTgc',
+            front_image='https://drive.google.com/file/d/live/view?usp=sharing'
+        )
+        Currency.objects.create(
+            currency_id='CURarchived', event_id='EVTgc', currency_author=ARCHIVED_AUTHOR,
+            front_image='https://drive.google.com/file/d/archived/view?usp=sharing'
+        )
+        CustomUser.objects.create_user(
+            username='gc@example.com', email='gc@example.com', password='secret', profile_picture='picture'
+        )
+        ImageVariant.objects.create(
+            source_file_id='live', size='thumb', format='webp', google_drive_id='liveThumb',
+            width=160, height=120, byte_size=10
+        )
+        GoogleDriveFile.objects.create(name='orphan.png', google_drive_id='orphan', content_hash='a' * 64)
+
+    def test_listing_follows_page_tokens(self):
+        self.assertEqual(len(list(list_files_in_drive('assets', page_size=4))), 6)
+        self.assertEqual(self.service.page_tokens, [None, '4'])
+
+    def test_dry_run_only_reports(self):
+        report = collect_drive_garbage(dry_run=True, folder_ids=['assets'])
+        self.assertEqual(
+            {key: report[key] for key in ('scanned', 'referenced', 'recent', 'orphans', 'orphan_bytes', 'deleted')},
+            {'scanned': 6, 'referenced': 3, 'recent': 1, 'orphans': 2, 'orphan_bytes': 200, 'deleted': 0}
+        )
+        self.assertEqual(len(self.service.stored), 6)
+
+    def test_orphans_are_deleted(self):
+        report = collect_drive_garbage(dry_run=False, folder_ids=['assets'])
+        self.assertEqual(report['deleted'], 2)
+        self.assertEqual(sorted(self.service.stored), ['fresh', 'live', 'liveThumb', 'picture'])
+        self.assertFalse(GoogleDriveFile.objects.filter(google_drive_id='orphan').exists())
+        self.file_cache.return_value.invalidate.assert_any_call('archived')
@@ -1,15 +1,24 @@
 import os
 import io
-from typing import Optional, Union, Dict, Any
+import mimetypes
+from typing import BinaryIO, Iterator, Optional, Union, Dict, Any
 from pathlib import Path
 import logging
+import threading
 
+import google_auth_httplib2
+from django.conf import settings
+from django.core.cache import cache
+import httplib2
 from google.oauth2 import service_account
 from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload, MediaIoBaseDownload
+from googleapiclient.errors import HttpError
+from googleapiclient.http import MediaIoBaseUpload, MediaIoBaseDownload
 import json
 from dotenv import load_dotenv
 
+from .quota import backoff_seconds, execute, get_drive_quota, is_rate_limit_error
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -24,6 +33,24 @@ load_dotenv()
 # Consider using more specific scopes if you don't need full access
 SCOPES = ['https://www.googleapis.com/auth/drive']
 
+# Resumable upload chunk size; Drive requires a multiple of 256 KiB
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+UPLOAD_NUM_RETRIES = 3
+DEFAULT_DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+DOWNLOAD_NUM_RETRIES = 3
+HTTP_TIMEOUT_SECONDS = 60
+# Fields fetched by get_file_metadata; metadata of files this app uploads never changes
+METADATA_FIELDS = 'id, name, mimeType, modifiedTime, size, parents, md5Checksum'
+METADATA_CACHE_SECONDS = 60 * 60
+# Drive accepts at most 100 calls per batch request
+BATCH_SIZE = 100
+
+# Credentials are shared by the whole process; service objects are per thread
+_credentials = None
+_credentials_pid = None
+_credentials_lock = threading.Lock()
+_thread_local = threading.local()
+
 def get_service_account_info() -> Dict[str, Any]:
     """
     Load the service account information from environment variable.
@@ -64,17 +91,129 @@ def authenticate():
         logger.error(f"Authentication failed: {e}")
         raise
 
+def get_credentials():
+    """
+    Return the process-wide service account credentials, loaded on first use.
+    
+    The credentials fetch and refresh their own access token whenever it is
+    missing or about to expire, so one instance serves every request.
+    
+    Returns:
+        google.oauth2.service_account.Credentials: The shared credentials
+    """
+    global _credentials, _credentials_pid
+    pid = os.getpid()
+    if _credentials is None or _credentials_pid != pid:
+        with _credentials_lock:
+            if _credentials is None or _credentials_pid != pid:
+                _credentials = authenticate()
+                _credentials_pid = pid
+    return _credentials
+
 def get_drive_service():
     """
-    Build and return a Google Drive service object.
+    Return this thread's Google Drive service object, building it on first use.
+    
+    httplib2 connections and API resources are not thread-safe, so each thread
+    keeps its own service over its own keep-alive connection, authorised with
+    the shared process credentials. The discovery document bundled with the
+    client library is used, so building never touches the network.
     
     Returns:
         googleapiclient.discovery.Resource: The Drive service object
     """
-    creds = authenticate()
-    service = build('drive', 'v3', credentials=creds)
+    pid = os.getpid()
+    service = getattr(_thread_local, 'service', None)
+    if service is None or getattr(_thread_local, 'pid', None) != pid:
+        http = google_auth_httplib2.AuthorizedHttp(
+            get_credentials(), http=httplib2.Http(timeout=HTTP_TIMEOUT_SECONDS)
+        )
+        service = build('drive', 'v3', http=http, cache_discovery=False, static_discovery=True)
+        _thread_local.service = service
+        _thread_local.pid = pid
     return service
 
+def reset_drive_service():
+    """Drop the cached credentials and this thread's service, e.g. after rotating the key"""
+    global _credentials, _credentials_pid
+    with _credentials_lock:
+        _credentials = None
+        _credentials_pid = None
+    _thread_local.service = None
+
+def upload_fileobj_to_drive(
+    file_obj: BinaryIO,
+    file_name: str,
+    folder_id: Optional[str] = None,
+    mime_type: Optional[str] = None,
+    chunk_size: int = UPLOAD_CHUNK_SIZE
+) -> str:
+    """
+    Stream a file-like object to Google Drive with a resumable, chunked upload.
+    
+    Only one chunk is held in memory at a time, so a Django UploadedFile can be
+    passed straight from request.FILES without copying it to disk first.
+    
+    Args:
+        file_obj (BinaryIO): Seekable binary file-like object to upload
+        file_name (str): Name to give the file in Drive
+        folder_id (Optional[str]): ID of the folder to upload to (if None, uploads to root)
+        mime_type (Optional[str]): MIME type of the file (if None, guessed from file_name)
+        chunk_size (int): Bytes sent per request, a multiple of 256 KiB
+        
+    Returns:
+        str: The ID of the uploaded file
+        
+    Raises:
+        Exception: For errors during upload that persist after retries
+    """
+    if mime_type is None:
+        mime_type = mimetypes.guess_type(file_name)[0] or 'application/octet-stream'
+    
+    try:
+        service = get_drive_service()
+        
+        file_metadata = {
+            'name': file_name,
+        }
+        
+        # Add folder if specified
+        if folder_id:
+            file_metadata['parents'] = [folder_id]
+        
+        file_obj.seek(0)
+        media = MediaIoBaseUpload(
+            file_obj,
+            mimetype=mime_type,
+            chunksize=chunk_size,
+            resumable=True
+        )
+        
+        logger.info(f"Uploading file: {file_name}")
+        request = service.files().create(
+            body=file_metadata,
+            media_body=media,
+            fields='id'
+        )
+        
+        # Each chunk is retried with exponential backoff and the upload resumes
+        # from the last byte Drive acknowledged
+        response = None
+        quota = get_drive_quota()
+        while response is None:
+            quota.acquire()
+            status, response = request.next_chunk(num_retries=UPLOAD_NUM_RETRIES)
+            if status:
+                logger.debug(f"Upload progress for {file_name}: {int(status.progress() * 100)}%")
+        
+        file_id = response.get('id')
+        logger.info(f"File uploaded successfully. File ID: {file_id}")
+        return file_id
+        
+    except Exception as e:
+        logger.error(f"Error uploading file: {e}")
+        raise
+
 def upload_file_to_drive(
     file_path: Union[str, Path], 
     file_name: Optional[str] = None, 
@@ -108,46 +247,58 @@ def upload_file_to_drive(
     if file_name is None:
         file_name = file_path.name
     
-    try:
-        service = get_drive_service()
-        
-        file_metadata = {
-            'name': file_name,
-        }
-        
-        # Add folder if specified
-        if folder_id:
-            file_metadata['parents'] = [folder_id]
-        
-        media = MediaFileUpload(
-            str(file_path), 
-            mimetype=mime_type, 
-            resumable=True
-        )
-        
-        # Upload with retry (3 attempts)
-        retry_count = 0
-        max_retries = 3
-        while retry_count < max_retries:
-            try:
-                logger.info(f"Uploading file: {file_name} (Attempt {retry_count + 1}/{max_retries})")
-                file = service.files().create(
-                    body=file_metadata,
-                    media_body=media,
-                    fields='id'
-                ).execute()
-                file_id = file.get('id')
-                logger.info(f"File uploaded successfully. File ID: {file_id}")
-                return file_id
-            except Exception as e:
-                retry_count += 1
-                if retry_count >= max_retries:
-                    raise
-                logger.warning(f"Upload attempt {retry_count} failed: {e}. Retrying...")
+    with open(file_path, 'rb') as file_obj:
+        return upload_fileobj_to_drive(file_obj, file_name, folder_id, mime_type)
+
+def sniff_content_type(head: bytes) -> tuple:
+    """
+    Detect a file type from its first bytes.
+    
+    Returns:
+        tuple: (content_type, extension), application/octet-stream and "" if unknown
+    """
+    if head.startswith(b'\xFF\xD8'):
+        return "image/jpeg", ".jpg"
+    if head.startswith(b'\x89PNG'):
+        return "image/png", ".png"
+    if head.startswith(b'GIF87a') or head.startswith(b'GIF89a'):
+        return "image/gif", ".gif"
+    if head.startswith(b'RIFF') and head[8:12] == b'WEBP':
+        return "image/webp", ".webp"
+    if head.startswith(b'%PDF'):
+        return "application/pdf", ".pdf"
+    return "application/octet-stream", ""
+
+def iter_drive_file(file_id: str, chunk_size: Optional[int] = None) -> Iterator[bytes]:
+    """
+    Yield the content of a Drive file chunk by chunk as it is downloaded.
+    
+    Only one chunk is held in memory at a time.
+    
+    Args:
+        file_id (str): The ID of the file to download
+        chunk_size (Optional[int]): Bytes per chunk, defaults to settings.DRIVE_DOWNLOAD_CHUNK_SIZE
         
-    except Exception as e:
-        logger.error(f"Error uploading file: {e}")
-        raise
+    Yields:
+        bytes: The next chunk of the file
+    """
+    if chunk_size is None:
+        chunk_size = getattr(settings, 'DRIVE_DOWNLOAD_CHUNK_SIZE', DEFAULT_DOWNLOAD_CHUNK_SIZE)
+    
+    request = get_drive_service().files().get_media(fileId=file_id)
+    buffer = io.BytesIO()
+    downloader = MediaIoBaseDownload(buffer, request, chunksize=chunk_size)
+    
+    done = False
+    quota = get_drive_quota()
+    while not done:
+        quota.acquire()
+        _, done = downloader.next_chunk(num_retries=DOWNLOAD_NUM_RETRIES)
+        chunk = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        if chunk:
+            yield chunk
 
 def download_file_from_drive(
     file_id: str, 
@@ -170,27 +321,11 @@ def download_file_from_drive(
         Exception: If there's an error downloading the file
     """
     try:
-        service = get_drive_service()
-        
-        # Get file metadata to get the filename
-        file_metadata = service.files().get(fileId=file_id).execute()
+        # Get file metadata to get the filename (usually already memoised)
+        file_metadata = get_file_metadata(file_id)
         filename = file_metadata.get('name', f'downloaded_file_{file_id}')
         
-        # Create a BytesIO object to store the downloaded file
-        request = service.files().get_media(fileId=file_id)
-        file_content = io.BytesIO()
-        downloader = MediaIoBaseDownload(file_content, request)
-        
-        # Download the file with progress reporting
-        done = False
-        while not done:
-            status, done = downloader.next_chunk()
-            logger.info(f"Download progress: {int(status.progress() * 100)}%")
-        
-        # Reset the file pointer to the beginning
-        file_content.seek(0)
-        
-        # If destination path is provided, save the file
+        # If destination path is provided, write chunks straight to it
         if destination_path:
             destination_path = Path(destination_path)
             
@@ -201,63 +336,221 @@ def download_file_from_drive(
             # Create parent directories if they don't exist
             destination_path.parent.mkdir(parents=True, exist_ok=True)
             
-            # Write the file
             with open(destination_path, 'wb') as f:
-                f.write(file_content.read())
+                for chunk in iter_drive_file(file_id):
+                    f.write(chunk)
             
             logger.info(f"File downloaded and saved to: {destination_path}")
             return str(destination_path)
         
         # If no destination path, return the file content
+        file_content = b''.join(iter_drive_file(file_id))
         logger.info(f"File '{filename}' downloaded to memory")
-        return file_content.getvalue()
+        return file_content
         
     except Exception as e:
         logger.error(f"Error downloading file: {e}")
         raise
 
-def list_files_in_drive(
-    folder_id: Optional[str] = None,
-    query: Optional[str] = None,
-    page_size: int = 100
-) -> list:
+def delete_file_from_drive(file_id: str) -> bool:
     """
-    List files in Google Drive, optionally filtered by folder or query.
+    Permanently delete a file from Google Drive.
     
     Args:
-        folder_id (Optional[str]): ID of the folder to list files from
-        query (Optional[str]): Search query (see Google Drive API documentation)
-        page_size (int): Maximum number of files to return
+        file_id (str): ID of the file to delete
         
     Returns:
-        list: List of file metadata dictionaries
+        bool: True if the file was deleted, False if it did not exist
+        
+    Raises:
+        Exception: For other errors during deletion
     """
+    cache.delete(_metadata_key(file_id))
     try:
-        service = get_drive_service()
+        execute(get_drive_service().files().delete(fileId=file_id))
+        logger.info(f"Deleted file {file_id} from Drive")
+        return True
+    except HttpError as e:
+        if e.resp.status == 404:
+            logger.warning(f"File {file_id} was already gone from Drive")
+            return False
+        logger.error(f"Error deleting file: {e}")
+        raise
+
+def _metadata_key(file_id):
+    return f"drive_metadata_{file_id}"
+
+def get_file_metadata(file_id: str) -> Dict[str, Any]:
+    """
+    Get a file's metadata (METADATA_FIELDS), memoised in the shared cache.
+    
+    Raises:
+        HttpError: If the file does not exist or Drive fails
+    """
+    key = _metadata_key(file_id)
+    metadata = cache.get(key)
+    if metadata is None:
+        metadata = execute(get_drive_service().files().get(fileId=file_id, fields=METADATA_FIELDS))
+        cache.set(key, metadata, timeout=METADATA_CACHE_SECONDS)
+    return metadata
+
+def _run_batch(file_ids: list, build_request) -> tuple:
+    """
+    Run one Drive call per file ID in batch requests of up to BATCH_SIZE calls.
+    
+    Every call takes a quota token. Calls rejected for rate limits are retried
+    in a later batch after a shared backoff, up to DRIVE_API_MAX_ATTEMPTS times.
+    
+    Args:
+        file_ids (list): Unique file IDs
+        build_request: Callable (service, file_id) -> HttpRequest
         
-        # Build the query
-        q_parts = []
-        if folder_id:
-            q_parts.append(f"'{folder_id}' in parents")
-        if query:
-            q_parts.append(query)
+    Returns:
+        tuple: ({file_id: response}, {file_id: HttpError})
+    """
+    service = get_drive_service()
+    quota = get_drive_quota()
+    results = {}
+    errors = {}
+    pending = list(file_ids)
+    
+    for attempt in range(settings.DRIVE_API_MAX_ATTEMPTS):
+        rate_limited = {}
         
-        # Combine query parts
-        q = " and ".join(q_parts) if q_parts else None
+        def callback(request_id, response, exception):
+            if exception is None:
+                results[request_id] = response
+            elif is_rate_limit_error(exception):
+                rate_limited[request_id] = exception
+            else:
+                errors[request_id] = exception
         
-        # Execute the query
-        results = service.files().list(
-            q=q,
-            pageSize=page_size,
-            fields="nextPageToken, files(id, name, mimeType, createdTime, modifiedTime, size)"
-        ).execute()
+        for start in range(0, len(pending), BATCH_SIZE):
+            chunk = pending[start:start + BATCH_SIZE]
+            quota.acquire(len(chunk))
+            batch = service.new_batch_http_request(callback=callback)
+            for file_id in chunk:
+                batch.add(build_request(service, file_id), request_id=file_id)
+            try:
+                batch.execute()
+            except HttpError as e:
+                # The batch request itself was refused; retry all of its calls
+                if not is_rate_limit_error(e):
+                    raise
+                rate_limited.update({file_id: e for file_id in chunk})
         
-        files = results.get('files', [])
-        logger.info(f"Found {len(files)} files in Drive")
+        if not rate_limited:
+            break
+        pending = list(rate_limited)
+        if attempt == settings.DRIVE_API_MAX_ATTEMPTS - 1:
+            errors.update(rate_limited)
+        else:
+            quota.pause(backoff_seconds(attempt))
+    
+    return results, errors
+
+def get_files_metadata(file_ids: list) -> Dict[str, Optional[Dict[str, Any]]]:
+    """
+    Get the metadata of many files, with uncached lookups coalesced into batch requests.
+    
+    Returns:
+        dict: {file_id: metadata}, with None for files that do not exist
         
-        return files
+    Raises:
+        HttpError: The first error other than a missing file
+    """
+    file_ids = list(dict.fromkeys(file_ids))
+    keys = {file_id: _metadata_key(file_id) for file_id in file_ids}
+    cached = cache.get_many(list(keys.values()))
+    metadata = {file_id: cached.get(key) for file_id, key in keys.items()}
+    
+    missing = [file_id for file_id, value in metadata.items() if value is None]
+    if missing:
+        results, errors = _run_batch(
+            missing, lambda service, file_id: service.files().get(fileId=file_id, fields=METADATA_FIELDS)
+        )
+        cache.set_many({keys[file_id]: value for file_id, value in results.items()}, timeout=METADATA_CACHE_SECONDS)
+        metadata.update(results)
+        for file_id, error in errors.items():
+            if error.resp.status != 404:
+                raise error
+        logger.info(f"Fetched metadata of {len(results)} files in {len(missing)} batched calls")
+    return metadata
+
+def delete_files_from_drive(file_ids: list) -> Dict[str, bool]:
+    """
+    Permanently delete many files, coalescing the calls into batch requests.
+    
+    Returns:
+        dict: {file_id: True if deleted, False if it did not exist}
         
-    except Exception as e:
-        logger.error(f"Error listing files: {e}")
-        raise
+    Raises:
+        HttpError: The first error other than a missing file, after the rest were attempted
+    """
+    file_ids = list(dict.fromkeys(file_ids))
+    if not file_ids:
+        return {}
+    cache.delete_many([_metadata_key(file_id) for file_id in file_ids])
+    results, errors = _run_batch(file_ids, lambda service, file_id: service.files().delete(fileId=file_id))
+    
+    deleted = {file_id: True for file_id in results}
+    for file_id, error in errors.items():
+        if error.resp.status != 404:
+            logger.error(f"Error deleting file {file_id}: {error}")
+            raise error
+        deleted[file_id] = False
+    logger.info(f"Deleted {len(results)} of {len(file_ids)} files from Drive")
+    return deleted
 
+def list_files_in_drive(
+    folder_id: Optional[str] = None,
+    query: Optional[str] = None,
+    page_size: int = 1000
+) -> Iterator[Dict[str, Any]]:
+    """
+    Lazily list files in Google Drive, optionally filtered by folder or query.
+    
+    Pages are requested one at a time as the caller iterates, following
+    nextPageToken until Drive has no more results. Trashed files are skipped.
+    
+    Args:
+        folder_id (Optional[str]): ID of the folder to list files from
+        query (Optional[str]): Search query (see Google Drive API documentation)
+        page_size (int): Files requested per page (Drive allows up to 1000)
+        
+    Yields:
+        dict: File metadata (id, name, mimeType, createdTime, modifiedTime, size)
+    """
+    service = get_drive_service()
+    
+    # Build the query
+    q_parts = ["trashed = false"]
+    if folder_id:
+        q_parts.append(f"'{folder_id}' in parents")
+    if query:
+        q_parts.append(query)
+    q = " and ".join(q_parts)
+    
+    page_token = None
+    found = 0
+    while True:
+        try:
+            results = execute(service.files().list(
+                q=q,
+                pageSize=page_size,
+                pageToken=page_token,
+                fields="nextPageToken, files(id, name, mimeType, createdTime, modifiedTime, size)"
+            ))
+        except Exception as e:
+            logger.error(f"Error listing files: {e}")
+            raise
+        
+        files = results.get('files', [])
+        found += len(files)
+        yield from files
+        
+        page_token = results.get('nextPageToken')
+        if not page_token:
+            break
+    
+    logger.info(f"Found {found} files in Drive")
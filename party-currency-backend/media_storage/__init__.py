@@ -0,0 +1,16 @@
+from google_drive.cache import iter_file_range
+from google_drive.derivatives import SIZE_BUCKETS as VARIANT_SIZES
+from google_drive.utils import sniff_content_type
+from .base import ObjectInfo, StorageBackend
+from .registry import get_storage, reset_storages, storage_for_reference
+
+__all__ = (
+    'ObjectInfo',
+    'StorageBackend',
+    'VARIANT_SIZES',
+    'get_storage',
+    'iter_file_range',
+    'reset_storages',
+    'sniff_content_type',
+    'storage_for_reference',
+)
@@ -0,0 +1,169 @@
+import logging
+import mimetypes
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from google_drive.derivatives import get_variant_file
+
+logger = logging.getLogger(__name__)
+
+
+class ObjectInfo:
+    """Metadata of a stored object, as returned alongside its content by stream()"""
+
+    def __init__(self, key, size=None, content_type='', modified_time=None, name='', etag=None):
+        self.key = key
+        self.size = size
+        self.content_type = content_type
+        # ISO 8601 string, the format Drive reports modifiedTime in
+        self.modified_time = modified_time
+        self.name = name
+        # Quoted HTTP validator, the same one the local copy (CachedFile.etag) will carry
+        self.etag = etag
+
+
+class StorageBackend(ABC):
+    """
+    Interface every media storage backend implements.
+
+    Objects are addressed by a backend-specific key returned from put(). Models
+    store reference(key) instead, a string that also says which backend holds
+    the object, so an asset type can move to another backend without breaking
+    the records written before the move.
+
+    Reads that need random access (conditional and Range requests, thumbnail
+    rendering) go through fetch()/cached(), which return a
+    google_drive.cache.CachedFile for a copy of the object on local disk.
+
+    Resized copies of images (see google_drive.derivatives) are stored with
+    put_variant() next to their original. With variants set, put() queues the
+    eager sizes as soon as an image is stored; other sizes are rendered on
+    their first variant() request.
+    """
+
+    # Prefix of reference strings, e.g. "local" for "local://<key>"
+    scheme = None
+    # Threads used by the default batch operations
+    batch_workers = 4
+    # Render thumbnail variants of new images in the background
+    variants = True
+
+    @classmethod
+    def from_settings(cls, config: dict) -> 'StorageBackend':
+        """Build the backend for one MEDIA_STORAGE entry"""
+        return cls()
+
+    @abstractmethod
+    def put(self, file_obj: BinaryIO, name: str, content_type: Optional[str] = None) -> str:
+        """
+        Store a file-like object.
+
+        Args:
+            file_obj (BinaryIO): Seekable binary file-like object
+            name (str): File name, used for the key and the content type
+            content_type (Optional[str]): MIME type (if None, guessed from name)
+
+        Returns:
+            str: The key of the stored object
+        """
+
+    def get(self, key: str) -> bytes:
+        """Return an object's content"""
+        _, chunks = self.stream(key)
+        return b''.join(chunks)
+
+    @abstractmethod
+    def stream(self, key: str, chunk_size: Optional[int] = None) -> Tuple[ObjectInfo, Iterator[bytes]]:
+        """Return an object's metadata and an iterator over its content"""
+
+    @abstractmethod
+    def delete(self, key: str) -> bool:
+        """
+        Delete an object. Backends that share objects between records (see
+        DriveStorage) only drop one reference.
+
+        Returns:
+            bool: True if the object is gone from the backend
+        """
+
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        """Return True if the object is stored"""
+
+    @abstractmethod
+    def fetch(self, key: str):
+        """Return a local copy of an object as a CachedFile, downloading it if needed"""
+
+    def cached(self, key: str):
+        """Return a local copy of an object if one is available without a download, else None"""
+        return None
+
+    def variant(self, key: str, size: str, variant_format: str):
+        """
+        Return a resized copy of an image as a CachedFile, rendering it on first request.
+
+        Raises:
+            PIL.UnidentifiedImageError: If the object is not an image
+        """
+        return get_variant_file(self, key, size, variant_format)
+
+    @abstractmethod
+    def put_variant(self, file_obj: BinaryIO, name: str, content_type: str) -> str:
+        """Store a rendered variant. Unlike put() this never queues variants of its own."""
+
+    def delete_variants(self, keys: Iterable[str]) -> None:
+        """Delete stored variants, which are never shared between records"""
+        self.delete_many(keys)
+
+    def _queue_variants(self, key: str, content_type: str) -> None:
+        """Queue the eager thumbnail sizes of a newly stored image"""
+        if not (self.variants and content_type.startswith('image/')):
+            return
+        from google_drive.tasks import generate_image_variants_task
+        try:
+            generate_image_variants_task.delay(self.reference(key))
+        except Exception as e:
+            logger.error(f"Could not queue thumbnails for {key}: {str(e)}")
+
+    def put_many(self, items: Iterable[Tuple[BinaryIO, str, Optional[str]]]) -> List[str]:
+        """Store several (file_obj, name, content_type) items; returns their keys in order"""
+        items = list(items)
+        if not items:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.batch_workers, len(items))) as executor:
+            return list(executor.map(lambda item: self.put(*item), items))
+
+    def delete_many(self, keys: Iterable[str]) -> Dict[str, bool]:
+        """Delete several objects; returns {key: deleted}"""
+        keys = list(keys)
+        if not keys:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(self.batch_workers, len(keys))) as executor:
+            return dict(zip(keys, executor.map(self.delete, keys)))
+
+    def exists_many(self, keys: Iterable[str]) -> Dict[str, bool]:
+        """Check several objects; returns {key: exists}"""
+        keys = list(keys)
+        if not keys:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(self.batch_workers, len(keys))) as executor:
+            return dict(zip(keys, executor.map(self.exists, keys)))
+
+    def reference(self, key: str) -> str:
+        """
+        The string stored in models for an object. Clients hand it back to the
+        currencies download-image view to fetch the object.
+        """
+        return f"{self.scheme}://{key}"
+
+    def parse_reference(self, reference: str) -> Optional[str]:
+        """Return the key of a reference this backend can read, or None"""
+        prefix = f"{self.scheme}://"
+        if reference and reference.startswith(prefix):
+            return reference[len(prefix):] or None
+        return None
+
+    @staticmethod
+    def guess_content_type(name: str) -> str:
+        return mimetypes.guess_type(name)[0] or 'application/octet-stream'
@@ -0,0 +1,105 @@
+import re
+from typing import BinaryIO, Iterator, Optional, Tuple
+
+from google_drive.cache import get_drive_file_cache, iter_file_range
+from google_drive.dedup import release_file, release_files, store_file
+from google_drive.utils import delete_files_from_drive, get_files_metadata, upload_fileobj_to_drive
+from .base import ObjectInfo, StorageBackend
+
+DRIVE_URL_PATTERN = re.compile(r'https://drive\.google\.com/file/d/([^/?]+)')
+DRIVE_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]+$')
+
+
+class DriveStorage(StorageBackend):
+    """
+    Google Drive backend.
+
+    Uploads are deduplicated by content hash (see google_drive.dedup), so a key
+    may be shared by several records and delete() only gives back one
+    reference. Reads go through the on-disk Drive cache. Variants are stored
+    next to their original and deleted with it by release_files.
+    """
+
+    scheme = 'drive'
+
+    def __init__(self, folder_id: Optional[str] = None, variants: bool = True):
+        self.folder_id = folder_id
+        self.variants = variants
+
+    @classmethod
+    def from_settings(cls, config):
+        return cls(folder_id=config.get('FOLDER_ID'), variants=config.get('VARIANTS', True))
+
+    def put(self, file_obj: BinaryIO, name: str, content_type: Optional[str] = None) -> str:
+        content_type = content_type or self.guess_content_type(name)
+        file_id, uploaded = store_file(file_obj, name, self.folder_id, mime_type=content_type)
+        if uploaded:
+            self._queue_variants(file_id, content_type)
+        return file_id
+
+    def put_variant(self, file_obj: BinaryIO, name: str, content_type: str) -> str:
+        # Variants bypass deduplication; release_files deletes them with their original
+        return upload_fileobj_to_drive(file_obj, name, self.folder_id, mime_type=content_type)
+
+    def delete_variants(self, keys):
+        delete_files_from_drive(list(keys))
+
+    def stream(self, key: str, chunk_size: Optional[int] = None) -> Tuple[ObjectInfo, Iterator[bytes]]:
+        cached = self.cached(key)
+        if cached is not None:
+            return _info(cached), iter_file_range(cached.path, 0, cached.size, chunk_size)
+        metadata, chunks = get_drive_file_cache().stream(key, chunk_size)
+        info = ObjectInfo(
+            key,
+            size=int(metadata['size']) if metadata.get('size') else None,
+            content_type=metadata.get('mimeType', ''),
+            modified_time=metadata.get('modifiedTime'),
+            name=metadata.get('name', ''),
+            etag=f'"{metadata["md5Checksum"]}"' if metadata.get('md5Checksum') else None,
+        )
+        return info, chunks
+
+    def delete(self, key: str) -> bool:
+        return release_file(key)
+
+    def delete_many(self, keys):
+        return release_files(keys)
+
+    def exists(self, key: str) -> bool:
+        return self.exists_many([key])[key]
+
+    def exists_many(self, keys):
+        """Metadata lookups are memoised and sent to Drive as batch requests"""
+        return {key: metadata is not None for key, metadata in get_files_metadata(keys).items()}
+
+    def fetch(self, key: str):
+        return get_drive_file_cache().fetch(key)
+
+    def cached(self, key: str):
+        return get_drive_file_cache().get(key)
+
+    def reference(self, key: str) -> str:
+        # Drive references stay plain share links, as they were before backends existed
+        return f"https://drive.google.com/file/d/{key}/view?usp=sharing"
+
+    def parse_reference(self, reference: str) -> Optional[str]:
+        """Accepts share links and bare file IDs (how profile pictures used to be stored)"""
+        if not reference:
+            return None
+        match = DRIVE_URL_PATTERN.search(reference)
+        if match:
+            return match.group(1)
+        if DRIVE_ID_PATTERN.match(reference):
+            return reference
+        return super().parse_reference(reference)
+
+
+def _info(cached):
+    return ObjectInfo(
+        cached.file_id,
+        size=cached.size,
+        content_type=cached.mime_type,
+        modified_time=cached.modified_time,
+        name=cached.name,
+        etag=cached.etag,
+    )
@@ -0,0 +1,122 @@
+import mimetypes
+import os
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import BinaryIO, Iterator, Optional, Tuple
+
+from django.conf import settings
+
+from google_drive.cache import CachedFile, iter_file_range
+from google_drive.derivatives import delete_variants_of
+from party_currency_backend.ids import generate_id
+from .base import ObjectInfo, StorageBackend
+
+COPY_CHUNK_SIZE = 1024 * 1024
+
+
+class LocalStorage(StorageBackend):
+    """
+    Local filesystem backend, for development, offline load tests and hot
+    assets on a fast disk. Objects are plain files under root, so they are
+    their own local copy.
+    """
+
+    scheme = 'local'
+
+    def __init__(self, root, prefix: str = '', variants: bool = True):
+        self.root = Path(root).resolve()
+        self.prefix = prefix.strip('/')
+        self.variants = variants
+
+    @classmethod
+    def from_settings(cls, config):
+        return cls(
+            root=settings.MEDIA_STORAGE_LOCAL_DIR,
+            prefix=config.get('PREFIX', ''),
+            variants=config.get('VARIANTS', True),
+        )
+
+    def _path(self, key):
+        path = (self.root / key).resolve()
+        if self.root not in path.parents:
+            raise ValueError(f"Invalid storage key: {key}")
+        return path
+
+    def put(self, file_obj: BinaryIO, name: str, content_type: Optional[str] = None) -> str:
+        key = self._write(file_obj, name)
+        self._queue_variants(key, content_type or self.guess_content_type(name))
+        return key
+
+    def put_variant(self, file_obj: BinaryIO, name: str, content_type: str) -> str:
+        return self._write(file_obj, name)
+
+    def _write(self, file_obj, name):
+        key = f"{self.prefix}/{generate_id()}{os.path.splitext(name)[1].lower()}".lstrip('/')
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Write to a temp file and rename, so readers never see a partial object
+        fd, temp_path = tempfile.mkstemp(dir=path.parent, prefix='.upload-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                file_obj.seek(0)
+                for chunk in iter(lambda: file_obj.read(COPY_CHUNK_SIZE), b''):
+                    f.write(chunk)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return key
+
+    def stream(self, key: str, chunk_size: Optional[int] = None) -> Tuple[ObjectInfo, Iterator[bytes]]:
+        local = self.fetch(key)
+        info = ObjectInfo(
+            key,
+            size=local.size,
+            content_type=local.mime_type,
+            modified_time=local.modified_time,
+            name=local.name,
+            etag=local.etag,
+        )
+        return info, iter_file_range(local.path, 0, local.size, chunk_size)
+
+    def delete(self, key: str) -> bool:
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            return False
+        delete_variants_of(self, [key])
+        return True
+
+    def delete_variants(self, keys):
+        for key in keys:
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+
+    def exists(self, key: str) -> bool:
+        return self._path(key).is_file()
+
+    def fetch(self, key: str):
+        path = self._path(key)
+        stat = path.stat()
+        modified_time = datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc).isoformat()
+        return CachedFile(
+            file_id=key,
+            path=path,
+            size=stat.st_size,
+            # Only used as an opaque validator, so size and mtime stand in for a content hash
+            sha256=f"{stat.st_size:x}-{stat.st_mtime_ns:x}",
+            name=path.name,
+            mime_type=mimetypes.guess_type(path.name)[0] or '',
+            modified_time=modified_time,
+        )
+
+    def cached(self, key: str):
+        try:
+            return self.fetch(key)
+        except FileNotFoundError:
+            return None
@@ -0,0 +1,72 @@
+import threading
+from typing import Optional, Tuple
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+
+from .base import StorageBackend
+
+BACKEND_ALIASES = {
+    'drive': 'media_storage.drive.DriveStorage',
+    'local': 'media_storage.local.LocalStorage',
+    's3': 'media_storage.s3.S3Storage',
+}
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def get_storage(asset_type: str) -> StorageBackend:
+    """
+    Return the backend configured for an asset type in settings.MEDIA_STORAGE.
+
+    Raises:
+        ImproperlyConfigured: If the asset type or its backend is unknown
+    """
+    backend = _backends.get(asset_type)
+    if backend is None:
+        with _backends_lock:
+            backend = _backends.get(asset_type)
+            if backend is None:
+                try:
+                    config = settings.MEDIA_STORAGE[asset_type]
+                except KeyError:
+                    raise ImproperlyConfigured(f"No media storage is configured for '{asset_type}'")
+                path = BACKEND_ALIASES.get(config['BACKEND'], config['BACKEND'])
+                try:
+                    backend_class = import_string(path)
+                except ImportError as e:
+                    raise ImproperlyConfigured(f"Unknown media storage backend '{config['BACKEND']}': {e}")
+                if not (isinstance(backend_class, type) and issubclass(backend_class, StorageBackend)):
+                    raise ImproperlyConfigured(f"Media storage backend '{config['BACKEND']}' is not a StorageBackend")
+                backend = _backends[asset_type] = backend_class.from_settings(config)
+    return backend
+
+
+def storage_for_reference(reference: str, asset_type: Optional[str] = None) -> Tuple[Optional[StorageBackend], Optional[str]]:
+    """
+    Find the backend that holds a stored reference.
+
+    The asset type's own backend is tried first, then every other configured
+    one, so records written before an asset type moved backends still resolve.
+
+    Returns:
+        tuple: (backend, key), or (None, None) if no backend recognises the reference
+    """
+    asset_types = list(settings.MEDIA_STORAGE)
+    if asset_type in asset_types:
+        asset_types.remove(asset_type)
+        asset_types.insert(0, asset_type)
+    for name in asset_types:
+        backend = get_storage(name)
+        key = backend.parse_reference(reference)
+        if key:
+            return backend, key
+    return None, None
+
+
+def reset_storages():
+    """Forget the backends built so far, e.g. after changing MEDIA_STORAGE in tests"""
+    with _backends_lock:
+        _backends.clear()
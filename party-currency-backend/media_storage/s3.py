@@ -0,0 +1,181 @@
+import hashlib
+import os
+from typing import BinaryIO, Iterator, Optional, Tuple
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+from google_drive.cache import DriveFileCache
+from google_drive.derivatives import delete_variants_of
+from party_currency_backend.ids import generate_id
+from .base import ObjectInfo, StorageBackend
+
+try:
+    import boto3
+    from botocore.exceptions import ClientError
+except ImportError:  # boto3 is only needed when an asset type is stored in S3
+    boto3 = None
+    ClientError = None
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+# DeleteObjects accepts at most this many keys per request
+DELETE_BATCH_SIZE = 1000
+
+
+class S3ObjectCache(DriveFileCache):
+    """DriveFileCache filled from an S3 bucket instead of Drive"""
+
+    def __init__(self, storage, root, max_bytes=None):
+        super().__init__(root=root, max_bytes=max_bytes)
+        self.storage = storage
+
+    def _fetch_metadata(self, key):
+        head = self.storage.client.head_object(Bucket=self.storage.bucket, Key=key)
+        etag = head.get('ETag', '').strip('"')
+        return {
+            'name': os.path.basename(key),
+            'mimeType': head.get('ContentType', ''),
+            'modifiedTime': head['LastModified'].isoformat() if head.get('LastModified') else None,
+            'size': head.get('ContentLength'),
+            # Multipart uploads get an ETag that is not the content MD5
+            'md5Checksum': etag if etag and '-' not in etag else None,
+        }
+
+    def _iter_source(self, key, chunk_size):
+        body = self.storage.client.get_object(Bucket=self.storage.bucket, Key=key)['Body']
+        return body.iter_chunks(chunk_size or DEFAULT_CHUNK_SIZE)
+
+    def _index_path(self, key):
+        # S3 keys contain slashes, so index entries are named by a hash of the key
+        return self.index_dir / f"{hashlib.sha256(key.encode()).hexdigest()}.json"
+
+
+class S3Storage(StorageBackend):
+    """
+    S3-compatible backend. endpoint_url points it at a stand-in such as MinIO
+    for local and load testing. Local copies are kept in an S3ObjectCache next
+    to the Drive cache.
+    """
+
+    scheme = 's3'
+
+    def __init__(
+        self,
+        bucket: str,
+        prefix: str = '',
+        endpoint_url: Optional[str] = None,
+        region_name: Optional[str] = None,
+        access_key_id: Optional[str] = None,
+        secret_access_key: Optional[str] = None,
+        variants: bool = True,
+    ):
+        if boto3 is None:
+            raise ImproperlyConfigured("boto3 must be installed to store media in S3")
+        if not bucket:
+            raise ImproperlyConfigured("MEDIA_S3_BUCKET must be set to store media in S3")
+        self.bucket = bucket
+        self.prefix = prefix.strip('/')
+        self.variants = variants
+        self.client = boto3.client(
+            's3',
+            endpoint_url=endpoint_url,
+            region_name=region_name,
+            aws_access_key_id=access_key_id,
+            aws_secret_access_key=secret_access_key,
+        )
+        self.cache = S3ObjectCache(self, root=os.path.join(settings.DRIVE_CACHE_DIR, 's3', bucket))
+
+    @classmethod
+    def from_settings(cls, config):
+        return cls(
+            bucket=settings.MEDIA_S3_BUCKET,
+            prefix=config.get('PREFIX', ''),
+            endpoint_url=settings.MEDIA_S3_ENDPOINT_URL,
+            region_name=settings.MEDIA_S3_REGION,
+            access_key_id=settings.MEDIA_S3_ACCESS_KEY_ID,
+            secret_access_key=settings.MEDIA_S3_SECRET_ACCESS_KEY,
+            variants=config.get('VARIANTS', True),
+        )
+
+    def put(self, file_obj: BinaryIO, name: str, content_type: Optional[str] = None) -> str:
+        content_type = content_type or self.guess_content_type(name)
+        key = self._upload(file_obj, name, content_type)
+        self._queue_variants(key, content_type)
+        return key
+
+    def put_variant(self, file_obj: BinaryIO, name: str, content_type: str) -> str:
+        return self._upload(file_obj, name, content_type)
+
+    def _upload(self, file_obj, name, content_type):
+        key = f"{self.prefix}/{generate_id()}{os.path.splitext(name)[1].lower()}".lstrip('/')
+        file_obj.seek(0)
+        # upload_fileobj switches to a multipart upload for large files
+        self.client.upload_fileobj(file_obj, self.bucket, key, ExtraArgs={'ContentType': content_type})
+        return key
+
+    def stream(self, key: str, chunk_size: Optional[int] = None) -> Tuple[ObjectInfo, Iterator[bytes]]:
+        metadata, chunks = self.cache.stream(key, chunk_size)
+        info = ObjectInfo(
+            key,
+            size=metadata.get('size'),
+            content_type=metadata.get('mimeType', ''),
+            modified_time=metadata.get('modifiedTime'),
+            name=metadata.get('name', ''),
+            etag=f'"{metadata["md5Checksum"]}"' if metadata.get('md5Checksum') else None,
+        )
+        return info, chunks
+
+    def delete(self, key: str) -> bool:
+        # S3 deletes are idempotent and do not say whether the key existed
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+        self.cache.invalidate(key)
+        delete_variants_of(self, [key])
+        return True
+
+    def delete_many(self, keys):
+        results = self._delete_objects(keys)
+        delete_variants_of(self, [key for key, deleted in results.items() if deleted])
+        return results
+
+    def delete_variants(self, keys):
+        self._delete_objects(keys)
+
+    def _delete_objects(self, keys):
+        keys = list(keys)
+        results = {}
+        for start in range(0, len(keys), DELETE_BATCH_SIZE):
+            batch = keys[start:start + DELETE_BATCH_SIZE]
+            response = self.client.delete_objects(
+                Bucket=self.bucket,
+                Delete={'Objects': [{'Key': key} for key in batch], 'Quiet': True}
+            )
+            failed = {error['Key'] for error in response.get('Errors', [])}
+            for key in batch:
+                results[key] = key not in failed
+                if key not in failed:
+                    self.cache.invalidate(key)
+        return results
+
+    def exists(self, key: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=key)
+            return True
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return False
+            raise
+
+    def fetch(self, key: str):
+        return self.cache.fetch(key)
+
+    def cached(self, key: str):
+        return self.cache.get(key)
+
+    def reference(self, key: str) -> str:
+        return f"s3://{self.bucket}/{key}"
+
+    def parse_reference(self, reference: str) -> Optional[str]:
+        prefix = f"s3://{self.bucket}/"
+        if reference and reference.startswith(prefix):
+            return reference[len(prefix):] or None
+        return None
@@ -0,0 +1,29 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase, override_settings
+
+from .base import StorageBackend
+from .registry import get_storage, reset_storages
+
+
+class PartialStorage(StorageBackend):
+    scheme = 'partial'
+
+    def put(self, file_obj, name, content_type=None):
+        return name
+
+
+class StorageBackendTests(SimpleTestCase):
+    def tearDown(self):
+        reset_storages()
+
+    def test_interface_must_be_implemented(self):
+        with self.assertRaises(TypeError) as raised:
+            PartialStorage()
+        for method in ('stream', 'delete', 'exists', 'fetch', 'put_variant'):
+            self.assertIn(method, str(raised.exception))
+
+    @override_settings(MEDIA_STORAGE={'currency_images': {'BACKEND': 'media_storage.registry.reset_storages'}})
+    def test_backend_must_be_a_storage_backend(self):
+        reset_storages()
+        with self.assertRaises(ImproperlyConfigured):
+            get_storage('currency_images')
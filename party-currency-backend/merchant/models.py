@@ -1,3 +1,49 @@
 from django.db import models
 
 # Create your models here.
+
+
+class ReservedAccountTransaction(models.Model):
+    """Local copy of an inflow into an event's Monnify reserved account"""
+    payment_reference = models.CharField(max_length=255, unique=True)
+    transaction_reference = models.CharField(max_length=255, blank=True)
+    account_reference = models.CharField(max_length=255)
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    currency_code = models.CharField(max_length=3, default='NGN')
+    payment_status = models.CharField(max_length=50, blank=True)
+    payment_method = models.CharField(max_length=50, blank=True)
+    payment_description = models.TextField(blank=True)
+    completed_on = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-completed_on']
+        indexes = [
+            models.Index(fields=['account_reference', '-completed_on']),
+        ]
+
+    def __str__(self):
+        return f"{self.account_reference} - {self.payment_reference}"
+
+
+class ReservedAccountSyncState(models.Model):
+    """Incremental sync cursor for one reserved account"""
+    account_reference = models.CharField(max_length=255, unique=True)
+    last_completed_on = models.DateTimeField(null=True, blank=True)
+    last_synced_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return self.account_reference
+
+
+class ReservedAccountDeletionFailure(models.Model):
+    """Reserved account whose scheduled deletion failed and is waiting for a retry"""
+    event_id = models.CharField(max_length=255, unique=True)
+    attempts = models.IntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    next_attempt_at = models.DateTimeField(db_index=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.event_id} ({self.attempts} attempts)"
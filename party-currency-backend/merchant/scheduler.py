@@ -1,38 +1,140 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
 from django.utils import timezone
+
+from authentication.models import CustomUser
 from events.models import Events
-from .views import deleteReservedAccount
-import requests
-import os
-from datetime import datetime, timedelta
-from payment.utils import MonnifyAuth
+from payment.utils import RateLimiter
+from .models import ReservedAccountDeletionFailure
+from .services import delete_reserved_account
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 100
+MAX_WORKERS = 8
+REQUESTS_PER_SECOND = 5
+RETRY_BASE_DELAY = timedelta(hours=1)
+RETRY_MAX_DELAY = timedelta(days=1)
+MAX_ATTEMPTS = 8
+
+
+def _try_delete(limiter, event_id):
+    limiter.acquire()
+    try:
+        delete_reserved_account(event_id)
+        return None
+    except Exception as e:
+        return str(e) or e.__class__.__name__
+
+
+def _record_failures(errors, now):
+    """Bump the attempt count and schedule the next retry with exponential backoff"""
+    existing = {
+        failure.event_id: failure
+        for failure in ReservedAccountDeletionFailure.objects.filter(event_id__in=errors.keys())
+    }
+    new_failures = []
+    for event_id, error in errors.items():
+        failure = existing.get(event_id) or ReservedAccountDeletionFailure(event_id=event_id)
+        failure.attempts += 1
+        failure.last_error = error
+        failure.next_attempt_at = now + min(RETRY_BASE_DELAY * (2 ** (failure.attempts - 1)), RETRY_MAX_DELAY)
+        failure.updated_at = now
+        if event_id not in existing:
+            new_failures.append(failure)
+
+    ReservedAccountDeletionFailure.objects.bulk_create(new_failures)
+    ReservedAccountDeletionFailure.objects.bulk_update(
+        list(existing.values()), ['attempts', 'last_error', 'next_attempt_at', 'updated_at']
+    )
+
+
+def delete_reserved_accounts(events):
+    """
+    Delete the reserved accounts of the given events on Monnify.
+
+    Events are processed in chunks on a bounded thread pool behind a shared
+    rate limiter. Each chunk clears its flags with one update() per table and
+    records failures for retry.
+
+    Args:
+        events: Queryset of events.models.Events with a reserved account
+
+    Returns:
+        tuple: (deleted, failed) counts
+    """
+    limiter = RateLimiter(REQUESTS_PER_SECOND)
+    deleted = failed = 0
+    last_event_id = ''
+
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="reserved-account-cleanup") as executor:
+        while True:
+            event_ids = list(
+                events.filter(event_id__gt=last_event_id)
+                .order_by('event_id')
+                .values_list('event_id', flat=True)[:CHUNK_SIZE]
+            )
+            if not event_ids:
+                break
+            last_event_id = event_ids[-1]
+
+            results = dict(zip(event_ids, executor.map(lambda event_id: _try_delete(limiter, event_id), event_ids)))
+            succeeded = [event_id for event_id, error in results.items() if error is None]
+            errors = {event_id: error for event_id, error in results.items() if error is not None}
+            now = timezone.now()
+
+            if succeeded:
+                Events.objects.filter(event_id__in=succeeded).update(has_reserved_account=False, updated_at=now)
+                CustomUser.objects.filter(virtual_account_reference__in=succeeded).update(virtual_account_reference=None)
+                ReservedAccountDeletionFailure.objects.filter(event_id__in=succeeded).delete()
+            if errors:
+                for event_id, error in errors.items():
+                    logger.warning(f"Error deleting reserved account for event {event_id}: {error}")
+                _record_failures(errors, now)
+
+            deleted += len(succeeded)
+            failed += len(errors)
+
+    return deleted, failed
+
 
 def check_and_delete_reserved_accounts():
     """
     Daily scheduler to check for concluded events and delete their reserved accounts.
     This function should be called by a task scheduler (e.g., Celery, Django-Q, or cron).
+    Events whose earlier deletion failed are skipped until their retry is due.
     """
-    today = timezone.now().date()
-    
+    now = timezone.now()
+
     # Get all events that have ended and have a reserved account
     concluded_events = Events.objects.filter(
-        end_date__lt=today,
+        end_date__lt=now.date(),
         has_reserved_account=True
+    ).exclude(
+        event_id__in=ReservedAccountDeletionFailure.objects.filter(next_attempt_at__gt=now).values('event_id')
+    ).exclude(
+        event_id__in=ReservedAccountDeletionFailure.objects.filter(attempts__gte=MAX_ATTEMPTS).values('event_id')
     )
-    
-    for event in concluded_events:
-        try:
-            # Call the deleteReservedAccount function
-            response = deleteReservedAccount(None, account_reference=event.event_id)
-            
-            # If the deletion was successful, update the event
-            if response.status_code == 200:
-                event.has_reserved_account = False
-                event.save()
-                print(f"Successfully deleted reserved account for event {event.event_id}")
-            else:
-                print(f"Failed to delete reserved account for event {event.event_id}: {response.data}")
-                
-        except Exception as e:
-            print(f"Error deleting reserved account for event {event.event_id}: {str(e)}")
-            
-    print(f"Completed checking {concluded_events.count()} concluded events for reserved account deletion") 
\ No newline at end of file
+
+    deleted, failed = delete_reserved_accounts(concluded_events)
+    logger.info(f"Reserved account cleanup finished: {deleted} deleted, {failed} failed")
+    return deleted, failed
+
+
+def retry_failed_reserved_account_deletions():
+    """Retry deletions whose backoff has elapsed"""
+    now = timezone.now()
+    due_events = Events.objects.filter(
+        has_reserved_account=True,
+        event_id__in=ReservedAccountDeletionFailure.objects.filter(
+            next_attempt_at__lte=now,
+            attempts__lt=MAX_ATTEMPTS
+        ).values('event_id')
+    )
+
+    deleted, failed = delete_reserved_accounts(due_events)
+    if deleted or failed:
+        logger.info(f"Reserved account retry finished: {deleted} deleted, {failed} failed")
+    return deleted, failed
@@ -0,0 +1,35 @@
+import logging
+
+from payment.monnify import get_monnify_client
+
+logger = logging.getLogger(__name__)
+
+
+class ReservedAccountDeletionError(Exception):
+    """Raised when Monnify refuses to delete a reserved account"""
+
+
+def delete_reserved_account(account_reference):
+    """
+    Delete a reserved account on Monnify outside of any DRF request.
+
+    An account Monnify no longer knows about counts as deleted.
+
+    Raises:
+        ReservedAccountDeletionError: If Monnify rejects the deletion
+        requests.exceptions.RequestException: If Monnify cannot be reached
+    """
+    response = get_monnify_client().delete_reserved_account(account_reference)
+
+    if response.status_code in (200, 404):
+        return
+
+    try:
+        detail = response.json().get('responseMessage', response.text)
+    except ValueError:
+        detail = response.text
+
+    if response.status_code == 400 and ("does not exist" in detail.lower() or "not found" in detail.lower()):
+        return
+
+    raise ReservedAccountDeletionError(f"Monnify returned {response.status_code}: {detail}")
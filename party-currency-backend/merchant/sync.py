@@ -0,0 +1,153 @@
+import logging
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from zoneinfo import ZoneInfo
+
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from events.models import Events
+from payment.monnify import get_monnify_client
+from .models import ReservedAccountTransaction, ReservedAccountSyncState
+
+logger = logging.getLogger(__name__)
+
+# Monnify reports naive timestamps in West Africa Time
+MONNIFY_TIMEZONE = ZoneInfo('Africa/Lagos')
+SYNC_PAGE_SIZE = 100
+UPSERT_FIELDS = [
+    'transaction_reference', 'account_reference', 'amount', 'currency_code',
+    'payment_status', 'payment_method', 'payment_description', 'completed_on', 'updated_at',
+]
+
+
+def parse_monnify_datetime(value):
+    """Parse the timestamp formats Monnify uses across its API and webhooks"""
+    if not value:
+        return None
+    parsed = parse_datetime(value)
+    if parsed is None:
+        for fmt in ('%d/%m/%Y %I:%M:%S %p', '%d/%m/%Y %H:%M:%S'):
+            try:
+                parsed = datetime.strptime(value, fmt)
+                break
+            except ValueError:
+                continue
+    if parsed is None:
+        logger.warning(f"Unrecognised Monnify timestamp: {value}")
+        return None
+    if timezone.is_naive(parsed):
+        parsed = parsed.replace(tzinfo=MONNIFY_TIMEZONE)
+    return parsed
+
+
+def _to_decimal(value):
+    try:
+        return Decimal(str(value))
+    except (InvalidOperation, TypeError):
+        return Decimal('0')
+
+
+def upsert_transactions(rows):
+    """Insert or refresh mirrored transactions keyed by payment reference"""
+    if not rows:
+        return 0
+    now = timezone.now()
+    for row in rows:
+        row.updated_at = now
+    ReservedAccountTransaction.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=['payment_reference'],
+        update_fields=UPSERT_FIELDS,
+    )
+    return len(rows)
+
+
+def transaction_from_api(account_reference, item):
+    """Build a mirror row from a reserved-accounts/transactions entry"""
+    return ReservedAccountTransaction(
+        payment_reference=item.get('paymentReference'),
+        transaction_reference=item.get('transactionReference') or '',
+        account_reference=account_reference,
+        amount=_to_decimal(item.get('amount')),
+        currency_code=item.get('currencyCode') or 'NGN',
+        payment_status=item.get('paymentStatus') or '',
+        payment_method=item.get('paymentMethod') or '',
+        payment_description=item.get('paymentDescription') or '',
+        completed_on=parse_monnify_datetime(item.get('completedOn')),
+    )
+
+
+def transaction_from_webhook(event_data):
+    """Build a mirror row from a RESERVED_ACCOUNT webhook notification"""
+    return ReservedAccountTransaction(
+        payment_reference=event_data.get('paymentReference'),
+        transaction_reference=event_data.get('transactionReference') or '',
+        account_reference=(event_data.get('product') or {}).get('reference') or '',
+        amount=_to_decimal(event_data.get('amountPaid')),
+        currency_code=event_data.get('currency') or 'NGN',
+        payment_status=event_data.get('paymentStatus') or '',
+        payment_method=event_data.get('paymentMethod') or '',
+        payment_description=event_data.get('paymentDescription') or '',
+        completed_on=parse_monnify_datetime(event_data.get('paidOn')),
+    )
+
+
+def sync_account_transactions(account_reference):
+    """
+    Pull new inflows for one reserved account into the local mirror.
+
+    Pages are walked newest first until a page holds nothing newer than the
+    stored completedOn cursor. Rows at the cursor itself are re-read, which is
+    harmless because the upsert is keyed by payment reference.
+
+    Returns:
+        int: Number of rows written
+    """
+    client = get_monnify_client()
+    state, _ = ReservedAccountSyncState.objects.get_or_create(account_reference=account_reference)
+    cursor = state.last_completed_on
+    newest = cursor
+    written = 0
+    page = 0
+
+    while True:
+        response = client.get_reserved_account_transactions(account_reference, page=page, size=SYNC_PAGE_SIZE)
+        response.raise_for_status()
+        data = response.json()
+        if not data.get('requestSuccessful', False):
+            raise ValueError(data.get('responseMessage', 'Unknown error'))
+
+        body = data.get('responseBody') or {}
+        rows = [
+            transaction_from_api(account_reference, item)
+            for item in body.get('content', [])
+            if item.get('paymentReference')
+        ]
+        fresh = [row for row in rows if cursor is None or row.completed_on is None or row.completed_on >= cursor]
+        written += upsert_transactions(fresh)
+
+        for row in fresh:
+            if row.completed_on and (newest is None or row.completed_on > newest):
+                newest = row.completed_on
+
+        if not fresh or body.get('last', True) or not rows:
+            break
+        page += 1
+
+    state.last_completed_on = newest
+    state.last_synced_at = timezone.now()
+    state.save(update_fields=['last_completed_on', 'last_synced_at'])
+    logger.info(f"Synced {written} transactions for reserved account {account_reference}")
+    return written
+
+
+def sync_all_accounts():
+    """Sync every event that still holds a reserved account"""
+    account_references = Events.objects.filter(has_reserved_account=True).values_list('event_id', flat=True)
+    for account_reference in account_references.iterator():
+        try:
+            sync_account_transactions(account_reference)
+        except Exception as e:
+            logger.error(f"Failed to sync reserved account {account_reference}: {str(e)}")
@@ -1,5 +1,6 @@
 from celery import shared_task
-from .scheduler import check_and_delete_reserved_accounts
+from .scheduler import check_and_delete_reserved_accounts, retry_failed_reserved_account_deletions
+from .sync import sync_account_transactions, sync_all_accounts
 
 @shared_task
 def check_and_delete_reserved_accounts_task():
@@ -7,4 +8,25 @@ def check_and_delete_reserved_accounts_task():
     Celery task that runs the check_and_delete_reserved_accounts function.
     This task is scheduled to run daily at midnight.
     """
-    check_and_delete_reserved_accounts() 
\ No newline at end of file
+    check_and_delete_reserved_accounts() 
+
+@shared_task
+def sync_reserved_account_transactions_task(account_reference=None):
+    """
+    Celery task that pulls new reserved-account inflows into the local mirror.
+    Without an account_reference every active reserved account is synced;
+    that form is scheduled to run every 15 minutes.
+    """
+    if account_reference:
+        sync_account_transactions(account_reference)
+    else:
+        sync_all_accounts()
+
+
+@shared_task
+def retry_failed_reserved_account_deletions_task():
+    """
+    Celery task that retries reserved-account deletions whose backoff has
+    elapsed. This task is scheduled to run hourly.
+    """
+    retry_failed_reserved_account_deletions()
@@ -1,3 +1,233 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock
+
+from django.core.cache import cache
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from authentication.models import CustomUser
+from events.models import Events
+from .models import ReservedAccountDeletionFailure, ReservedAccountSyncState, ReservedAccountTransaction
+from .scheduler import (
+    MAX_ATTEMPTS,
+    RETRY_BASE_DELAY,
+    check_and_delete_reserved_accounts,
+    retry_failed_reserved_account_deletions,
+)
+from .services import ReservedAccountDeletionError, delete_reserved_account
+from .sync import sync_account_transactions
+from .views import MIRROR_STALE_AFTER
+
+ACCOUNT_REFERENCE = 'EVTmirror'
+
+
+class FakeResponse:
+    def __init__(self, data, status_code=200):
+        self.data = data
+        self.status_code = status_code
+        self.text = str(data)
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.data
+
+
+class FakeMonnifyClient:
+    """Serves reserved-account transaction pages, newest first"""
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.requested = []
+
+    def get_reserved_account_transactions(self, account_reference, page=0, size=100):
+        self.requested.append(page)
+        return FakeResponse({
+            'requestSuccessful': True,
+            'responseBody': {'content': self.pages[page], 'last': page == len(self.pages) - 1},
+        })
+
+
+def _inflow(reference, completed_on, amount='1000.00'):
+    return {
+        'paymentReference': reference,
+        'transactionReference': f"MNFY|{reference}",
+        'amount': amount,
+        'paymentStatus': 'PAID',
+        'completedOn': completed_on,
+    }
+
+
+class SyncAccountTransactionsTests(TestCase):
+    def _sync(self, pages):
+        client = FakeMonnifyClient(pages)
+        with mock.patch('merchant.sync.get_monnify_client', return_value=client):
+            written = sync_account_transactions(ACCOUNT_REFERENCE)
+        return written, client.requested
+
+    def test_first_sync_walks_every_page(self):
+        written, requested = self._sync([
+            [_inflow('in3', '2025-01-03T10:00:00'), _inflow('in2', '2025-01-02T10:00:00')],
+            [_inflow('in1', '01/01/2025 10:00:00 AM')],
+        ])
+        self.assertEqual(written, 3)
+        self.assertEqual(requested, [0, 1])
+
+        state = ReservedAccountSyncState.objects.get(account_reference=ACCOUNT_REFERENCE)
+        self.assertEqual(state.last_completed_on, ReservedAccountTransaction.objects.get(payment_reference='in3').completed_on)
+        self.assertIsNotNone(state.last_synced_at)
+        # Monnify's naive timestamps are West Africa Time
+        self.assertEqual(
+            ReservedAccountTransaction.objects.get(payment_reference='in1').completed_on,
+            datetime(2025, 1, 1, 9, 0, tzinfo=dt_timezone.utc)
+        )
+
+    def test_later_sync_stops_at_the_cursor(self):
+        self._sync([[_inflow('in1', '2025-01-01T10:00:00')]])
+        written, requested = self._sync([
+            [_inflow('in2', '2025-01-02T10:00:00'), _inflow('in1', '2025-01-01T10:00:00', amount='1500.00')],
+            [_inflow('in0', '2024-12-31T10:00:00')],
+        ])
+        # The row at the cursor is re-read and refreshed; the walk ends on the
+        # first page with nothing newer, whose rows are not written
+        self.assertEqual(requested, [0, 1])
+        self.assertEqual(written, 2)
+        self.assertEqual(ReservedAccountTransaction.objects.count(), 2)
+        self.assertEqual(ReservedAccountTransaction.objects.get(payment_reference='in1').amount, Decimal('1500.00'))
+
+
+@mock.patch('merchant.views.sync_reserved_account_transactions_task')
+class TransactionListTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        user = CustomUser.objects.create_user(
+            username='merchant@example.com', email='merchant@example.com', password='secret'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+        ReservedAccountTransaction.objects.create(
+            payment_reference='listed', account_reference=ACCOUNT_REFERENCE,
+            amount=Decimal('2500.00'), completed_on=timezone.now()
+        )
+
+    def _get(self):
+        response = self.client.get('/merchant/transactions', {'account_reference': ACCOUNT_REFERENCE})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_first_load_queues_the_sync(self, task):
+        data = self._get()
+        self.assertTrue(data['syncing'])
+        self.assertEqual([row['reference'] for row in data['transactions']], ['listed'])
+        task.delay.assert_called_once_with(ACCOUNT_REFERENCE)
+
+    def test_stale_mirror_is_queued_once(self, task):
+        ReservedAccountSyncState.objects.create(
+            account_reference=ACCOUNT_REFERENCE,
+            last_synced_at=timezone.now() - MIRROR_STALE_AFTER - timedelta(minutes=1)
+        )
+        for _ in range(3):
+            self.assertFalse(self._get()['syncing'])
+        task.delay.assert_called_once_with(ACCOUNT_REFERENCE)
+
+    def test_fresh_mirror_is_not_queued(self, task):
+        ReservedAccountSyncState.objects.create(account_reference=ACCOUNT_REFERENCE, last_synced_at=timezone.now())
+        self.assertFalse(self._get()['syncing'])
+        task.delay.assert_not_called()
+
+
+@mock.patch('merchant.scheduler.CHUNK_SIZE', 2)
+class ReservedAccountCleanupTests(TestCase):
+    def setUp(self):
+        for event_id, end_date in (
+            ('EVTdone1', '2025-01-01'), ('EVTdone2', '2025-01-02'),
+            ('EVTdone3', '2025-01-03'), ('EVTupcoming', '2999-01-01'),
+        ):
+            Events.objects.create(
+                event_id=event_id, event_name='Party', start_date='2025-01-01', end_date=end_date,
+                delivery_address='Lagos', has_reserved_account=True
+            )
+        self.user = CustomUser.objects.create_user(
+            username='host@example.com', email='host@example.com', password='secret',
+            virtual_account_reference='EVTdone1'
+        )
+        self.failing = {'EVTdone2'}
+        patcher = mock.patch('merchant.scheduler.delete_reserved_account', side_effect=self._delete)
+        self.delete = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _delete(self, event_id):
+        if event_id in self.failing:
+            raise ReservedAccountDeletionError('Monnify returned 500')
+
+    def _has_account(self, event_id):
+        return Events.objects.get(event_id=event_id).has_reserved_account
+
+    def test_concluded_events_are_cleaned_up(self):
+        self.assertEqual(check_and_delete_reserved_accounts(), (2, 1))
+
+        self.assertFalse(self._has_account('EVTdone1'))
+        self.assertFalse(self._has_account('EVTdone3'))
+        self.assertTrue(self._has_account('EVTdone2'))
+        self.assertTrue(self._has_account('EVTupcoming'))
+        self.user.refresh_from_db()
+        self.assertIsNone(self.user.virtual_account_reference)
+
+        failure = ReservedAccountDeletionFailure.objects.get()
+        self.assertEqual((failure.event_id, failure.attempts), ('EVTdone2', 1))
+        self.assertAlmostEqual(
+            failure.next_attempt_at, timezone.now() + RETRY_BASE_DELAY, delta=timedelta(minutes=1)
+        )
+
+    def test_failures_wait_for_their_backoff(self):
+        check_and_delete_reserved_accounts()
+        self.delete.reset_mock()
+
+        # Neither the daily run nor the retry picks it up before it is due
+        self.assertEqual(check_and_delete_reserved_accounts(), (0, 0))
+        self.assertEqual(retry_failed_reserved_account_deletions(), (0, 0))
+        self.delete.assert_not_called()
+
+        ReservedAccountDeletionFailure.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(retry_failed_reserved_account_deletions(), (0, 1))
+        failure = ReservedAccountDeletionFailure.objects.get()
+        self.assertEqual(failure.attempts, 2)
+        self.assertAlmostEqual(
+            failure.next_attempt_at, timezone.now() + RETRY_BASE_DELAY * 2, delta=timedelta(minutes=1)
+        )
+
+        self.failing.clear()
+        ReservedAccountDeletionFailure.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(retry_failed_reserved_account_deletions(), (1, 0))
+        self.assertFalse(self._has_account('EVTdone2'))
+        self.assertFalse(ReservedAccountDeletionFailure.objects.exists())
+
+    def test_gives_up_after_max_attempts(self):
+        ReservedAccountDeletionFailure.objects.create(
+            event_id='EVTdone2', attempts=MAX_ATTEMPTS, next_attempt_at=timezone.now() - timedelta(days=1)
+        )
+        check_and_delete_reserved_accounts()
+        retry_failed_reserved_account_deletions()
+        self.assertNotIn(mock.call('EVTdone2'), self.delete.call_args_list)
+
+
+class DeleteReservedAccountTests(TestCase):
+    def _delete(self, status_code, message=''):
+        client = mock.Mock()
+        client.delete_reserved_account.return_value = FakeResponse({'responseMessage': message}, status_code)
+        with mock.patch('merchant.services.get_monnify_client', return_value=client):
+            delete_reserved_account('EVTgone')
+
+    def test_missing_accounts_count_as_deleted(self):
+        self._delete(200)
+        self._delete(404)
+        self._delete(400, 'Reserved account does not exist')
 
-# Create your tests here.
+    def test_rejection_raises(self):
+        for status_code, message in ((400, 'Invalid account reference'), (500, 'Internal error')):
+            with self.subTest(status_code=status_code), self.assertRaises(ReservedAccountDeletionError):
+                self._delete(status_code, message)
@@ -1,32 +1,59 @@
 from django.shortcuts import render
-from payment.utils import MonnifyAuth
+from payment.monnify import get_monnify_client, MonnifyUnavailable, provider_unavailable_response
+from payment.utils import MonnifyAuthError
 from rest_framework.response import Response
 from rest_framework.decorators import api_view, permission_classes, throttle_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.throttling import UserRateThrottle, AnonRateThrottle
 from rest_framework import status
 from events.models import Events
+from django.core.cache import cache
+from django.utils import timezone
+from datetime import datetime, timedelta
+from .models import ReservedAccountTransaction, ReservedAccountSyncState
+from .tasks import sync_reserved_account_transactions_task
 import requests
 import os
 import logging
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_TRANSACTIONS_PAGE_SIZE = 100
+MAX_TRANSACTIONS_PAGE_SIZE = 1000
+MIRROR_STALE_AFTER = timedelta(minutes=5)
+# How long a queued sync holds off further enqueues for the same account
+SYNC_QUEUE_LOCK_SECONDS = 60
+
 class UserThrottle(UserRateThrottle):
     scope = 'user'
 
+
+def _queue_account_sync(account_reference):
+    """Queue a mirror refresh unless one was queued for this account recently"""
+    if not cache.add(f"merchant:sync_queued:{account_reference}", True, timeout=SYNC_QUEUE_LOCK_SECONDS):
+        return
+    try:
+        sync_reserved_account_transactions_task.delay(account_reference)
+    except Exception as e:
+        logger.error(f"Could not queue reserved account sync: {str(e)}")
+
 # Create your views here.
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
 # @throttle_classes([UserThrottle])
 def getAllTransaction(request):
+    """
+    List reserved-account inflows from the local mirror.
+
+    Query Parameters:
+        account_reference: The reserved account to list (required)
+        page, page_size: Pagination, page_size is capped at MAX_TRANSACTIONS_PAGE_SIZE
+        date_from, date_to: Optional YYYY-MM-DD bounds on the completion date
+
+    The response carries syncing=True until the account's first background
+    sync has finished.
+    """
     try:
-        headers = {
-            'Authorization': f"Bearer {MonnifyAuth.get_access_token()['token']}",
-            'Content-Type': 'application/json',
-            'Accept': 'application/json'
-        }
-        
         # Get parameters from query_params instead of data
         account_reference = request.query_params.get("account_reference")
         
@@ -35,47 +62,60 @@ def getAllTransaction(request):
                 "error": "account_reference is required"
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Build the URL with query parameters - using a large size to get all transactions
-        base_url = os.getenv("MONNIFY_BASE_URL")
-        if not base_url:
-            logger.error("MONNIFY_BASE_URL not configured")
-            return Response({
-                "error": "Service misconfiguration: API base URL not found"
-            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-            
-        url = f"{base_url}/api/v1/bank-transfer/reserved-accounts/transactions?accountReference={account_reference}&page=0&size=1000"
-        
-        response = requests.get(url, headers=headers, timeout=30).json()
-        
-        if not response.get("requestSuccessful", False):
-            error_message = response.get("responseMessage", "Unknown error")
-            error_code = response.get("responseCode", "unknown")
-            
-            return Response({
-                "error": error_message,
-                "error_code": error_code
-            }, status=status.HTTP_400_BAD_REQUEST)
-        
-        # Extract only the transactions from the response
-        transactions = response.get("responseBody", {}).get("content", [])
+        try:
+            page = max(int(request.query_params.get("page", 1)), 1)
+            page_size = min(max(int(request.query_params.get("page_size", DEFAULT_TRANSACTIONS_PAGE_SIZE)), 1), MAX_TRANSACTIONS_PAGE_SIZE)
+        except ValueError:
+            return Response({"error": "Invalid page or page_size parameter"}, status=status.HTTP_400_BAD_REQUEST)
+        
+        transactions = ReservedAccountTransaction.objects.filter(account_reference=account_reference)
+        
+        for param, lookup in (("date_from", "completed_on__date__gte"), ("date_to", "completed_on__date__lte")):
+            value = request.query_params.get(param)
+            if value:
+                try:
+                    transactions = transactions.filter(**{lookup: datetime.strptime(value, '%Y-%m-%d').date()})
+                except ValueError:
+                    return Response({"error": f"Invalid {param} format. Use YYYY-MM-DD"}, status=status.HTTP_400_BAD_REQUEST)
+        
+        # Serve from the mirror and refresh it in the background when stale.
+        # An account that has never been synced is reported as syncing so the
+        # client knows an empty list may fill in shortly.
+        sync_state = ReservedAccountSyncState.objects.filter(account_reference=account_reference).first()
+        syncing = sync_state is None or sync_state.last_synced_at is None
+        if syncing or sync_state.last_synced_at < timezone.now() - MIRROR_STALE_AFTER:
+            _queue_account_sync(account_reference)
+        
+        offset = (page - 1) * page_size
+        rows = list(transactions.order_by('-completed_on', '-pk')[offset:offset + page_size + 1])
+        has_next = len(rows) > page_size
         
         # Format the transactions to include only necessary information
         formatted_transactions = []
-        for transaction in transactions:
+        for transaction in rows[:page_size]:
             formatted_transaction = {
-                "amount": transaction.get("amount"),
-                "currency": transaction.get("currencyCode"),
-                "status": transaction.get("paymentStatus"),
-                "reference": transaction.get("paymentReference"),
-                "date": transaction.get("completedOn"),
-                "description": transaction.get("paymentDescription"),
-                "payment_method": transaction.get("paymentMethod")
+                "amount": transaction.amount,
+                "currency": transaction.currency_code,
+                "status": transaction.payment_status,
+                "reference": transaction.payment_reference,
+                "date": transaction.completed_on.isoformat() if transaction.completed_on else None,
+                "description": transaction.payment_description,
+                "payment_method": transaction.payment_method
             }
             formatted_transactions.append(formatted_transaction)
             
         return Response({
-            "transactions": formatted_transactions
+            "transactions": formatted_transactions,
+            "syncing": syncing,
+            "pagination": {
+                "current_page": page,
+                "page_size": page_size,
+                "has_next": has_next,
+                "next_page": page + 1 if has_next else None,
+            }
         }, status=status.HTTP_200_OK)
+    except MonnifyUnavailable as e:
+        return provider_unavailable_response(e)
     except requests.exceptions.RequestException as req_err:
         logger.error(f"Request to Monnify API failed: {str(req_err)}")
         return Response({
@@ -109,23 +149,10 @@ def createReservedAccount(request):
                 "error": "Event not found"
             }, status=status.HTTP_404_NOT_FOUND)
 
-        # Get access token
-        access_token = MonnifyAuth.get_access_token()
-        if not access_token or 'token' not in access_token:
-            logger.error("Failed to obtain Monnify access token")
-            return Response({
-                "error": "Failed to authenticate with payment provider"
-            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-        headers = {
-            'Authorization': f"Bearer {access_token['token']}",
-            'Content-Type': 'application/json'
-        }
-        
-        base_url = os.getenv("MONNIFY_BASE_URL")
-        contract_code = os.getenv("MONNIFY_CONTRACT_CODE")
+        client = get_monnify_client()
+        contract_code = client.contract_code
         
-        if not base_url or not contract_code:
+        if not client.base_url or not contract_code:
             logger.error("MONNIFY_BASE_URL or MONNIFY_CONTRACT_CODE not configured")
             return Response({
                 "error": "Service misconfiguration: Required environment variables not found"
@@ -142,12 +169,7 @@ def createReservedAccount(request):
             "getAllAvailableBanks": "true",
         }
         
-        response = requests.post(
-            f"{base_url}/api/v2/bank-transfer/reserved-accounts", 
-            headers=headers, 
-            json=payload,
-            timeout=30
-        ).json()
+        response = client.create_reserved_account(payload).json()
         
         if not response.get("requestSuccessful", False):
             error_message = response.get("responseMessage", "Unknown error")
@@ -171,7 +193,7 @@ def createReservedAccount(request):
         # Update the user's virtual account reference
         user = request.user
         user.virtual_account_reference = response["responseBody"]["accountReference"]
-        user.save()
+        user.save(update_fields=['virtual_account_reference'])
         
         # Get response body data
         response_body = response.get("responseBody", {})
@@ -204,6 +226,13 @@ def createReservedAccount(request):
             "account_details": account_details
         }, status=status.HTTP_200_OK)
                                                                             
+    except MonnifyAuthError:
+        logger.error("Failed to obtain Monnify access token")
+        return Response({
+            "error": "Failed to authenticate with payment provider"
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    except MonnifyUnavailable as e:
+        return provider_unavailable_response(e)
     except requests.exceptions.RequestException as req_err:
         logger.error(f"Request to Monnify API failed: {str(req_err)}")
         return Response({
@@ -287,41 +316,18 @@ def deleteReservedAccount(request, account_reference=None):
             logger.error(f"Invalid account reference: {account_reference}")
             return Response({"error": error_msg}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Get Monnify base URL using the consistent MONNIFY spelling
-        base_url = os.getenv('MONNIFY_BASE_URL')
-        if not base_url:
+        client = get_monnify_client()
+        if not client.base_url:
             logger.error("MONNIFY_BASE_URL not configured")
             return Response(
                 {"error": "Service misconfiguration: API base URL not found"}, 
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
         
-        # Get access token
-        access_token = MonnifyAuth.get_access_token()
-        if not access_token or 'token' not in access_token:
-            logger.error("Failed to obtain Monnify access token")
-            return Response(
-                {"error": "Failed to authenticate with payment provider"}, 
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
-                
-        headers = {
-            'Authorization': f"Bearer {access_token['token']}",
-            'Content-Type': 'application/json'
-        }
-        
         logger.info(f"Deleting reserved account: {account_reference}")
         
-        # Log the request details (without sensitive info)
-        request_url = f"{base_url}/api/v1/bank-transfer/reserved-accounts/reference/{account_reference}"
-        logger.info(f"Sending delete request to: {request_url}")
-        
         # Make API request
-        api_response = requests.delete(
-            request_url, 
-            headers=headers,
-            timeout=30
-        )
+        api_response = client.delete_reserved_account(account_reference)
         
         # Log response status before raising any exceptions
         logger.info(f"Monnify API response status: {api_response.status_code}")
@@ -348,7 +354,7 @@ def deleteReservedAccount(request, account_reference=None):
         if request is not None and hasattr(request, 'user'):
             user = request.user
             user.virtual_account_reference = None
-            user.save()
+            user.save(update_fields=['virtual_account_reference'])
         
         # Log success
         logger.info(f"Successfully deleted reserved account: {account_reference}")
@@ -383,7 +389,7 @@ def deleteReservedAccount(request, account_reference=None):
                 # Still update user if the account doesn't exist
                 if request is not None and hasattr(request, 'user'):
                     request.user.virtual_account_reference = None
-                    request.user.save()
+                    request.user.save(update_fields=['virtual_account_reference'])
             else:
                 message = "Invalid request to payment provider"
                 
@@ -413,6 +419,22 @@ def deleteReservedAccount(request, account_reference=None):
                 status=status.HTTP_502_BAD_GATEWAY
             )
             
+    except MonnifyUnavailable as e:
+        if request is None:
+            return {"error": "Payment provider temporarily unavailable", "detail": str(e), "status_code": status.HTTP_503_SERVICE_UNAVAILABLE}
+        
+        return provider_unavailable_response(e)
+        
+    except MonnifyAuthError:
+        logger.error("Failed to obtain Monnify access token")
+        if request is None:
+            return {"error": "Failed to authenticate with payment provider", "status_code": status.HTTP_500_INTERNAL_SERVER_ERROR}
+        
+        return Response(
+            {"error": "Failed to authenticate with payment provider"}, 
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+        
     except requests.exceptions.RequestException as req_err:
         # Handle other request errors (timeouts, connection issues)
         error_msg = f"Request to Monnify API failed: {str(req_err)}"
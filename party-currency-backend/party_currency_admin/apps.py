@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class PartyCurrencyAdminConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'party_currency_admin'
+
+    def ready(self):
+        # Keep the cached dashboard counters current
+        from . import signals  # noqa: F401
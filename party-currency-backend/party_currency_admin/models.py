@@ -1,3 +1,46 @@
 from django.db import models
 
-# Create your models here.
+
+class DailyTransactionRollup(models.Model):
+    """Transactions created on a day, per status, kept by party_currency_admin.rollups"""
+    day = models.DateField()
+    status = models.CharField(max_length=50)
+    count = models.IntegerField(default=0)
+    amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'status'], name='unique_daily_transaction_rollup'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.status}: {self.count}"
+
+
+class DailyMetricRollup(models.Model):
+    """A per-day count such as new users, kept by party_currency_admin.rollups"""
+    METRIC_NEW_USERS = 'new_users'
+    METRIC_NEW_EVENTS = 'new_events'
+
+    day = models.DateField()
+    metric = models.CharField(max_length=50)
+    value = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'metric'], name='unique_daily_metric_rollup'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.metric}: {self.value}"
+
+
+class RollupWatermark(models.Model):
+    """Latest change timestamp of a source table already folded into the rollups"""
+    name = models.CharField(max_length=50, unique=True)
+    value = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
@@ -0,0 +1,197 @@
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+
+DEFAULT_PAGE_SIZE = 10
+MAX_PAGE_SIZE = 100
+TRUE_VALUES = ('1', 'true', 'yes')
+# Deepest row the deprecated ?page= path will OFFSET to; deeper pages must use cursors
+MAX_OFFSET_ROWS = 10000
+
+
+class InvalidCursor(ValueError):
+    """A cursor that was tampered with or belongs to another sort order"""
+
+
+def estimate_count(queryset):
+    """
+    Row count of a queryset from the PostgreSQL planner's estimate, so no rows
+    are scanned. Other databases get an exact COUNT(*).
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return queryset.count()
+    sql, params = queryset.order_by().values('pk').query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class KeysetPaginator:
+    """
+    Pages through a queryset by remembering the last row seen instead of
+    counting and skipping rows, so every page costs the same as the first.
+
+    Rows are ordered by one non-null field or annotation (such as the search
+    rank), with the primary key as tie-breaker
+    in the same direction. Cursors are opaque base64 tokens holding the sort
+    key of the row to continue from, the direction and the ordering they were
+    issued for.
+    """
+
+    def __init__(self, queryset, ordering, page_size=DEFAULT_PAGE_SIZE):
+        self.queryset = queryset
+        self.ordering = ordering
+        self.descending = ordering.startswith('-')
+        self.name = ordering.lstrip('-')
+        self.annotation = queryset.query.annotations.get(self.name)
+        if self.annotation is not None:
+            self.field = self.annotation.output_field
+        else:
+            self.field = queryset.model._meta.get_field(self.name)
+        self.pk_field = queryset.model._meta.pk
+        self.page_size = page_size
+
+    def _descending(self, backwards):
+        return self.descending != backwards
+
+    def ordering_fields(self, backwards=False):
+        prefix = '-' if self._descending(backwards) else ''
+        return f"{prefix}{self.name}", f"{prefix}pk"
+
+    def _after(self, value, pk, backwards):
+        lookup = 'lt' if self._descending(backwards) else 'gt'
+        return Q(**{f"{self.name}__{lookup}": value}) | Q(**{self.name: value, f"pk__{lookup}": pk})
+
+    def _value_to_string(self, obj):
+        if self.annotation is not None:
+            return str(getattr(obj, self.name))
+        return self.field.value_to_string(obj)
+
+    def encode_cursor(self, obj, direction):
+        payload = {
+            'o': self.ordering,
+            'd': direction,
+            'k': [self._value_to_string(obj), self.pk_field.value_to_string(obj)],
+        }
+        return base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        """
+        Returns:
+            tuple: (direction, sort field value, primary key)
+
+        Raises:
+            InvalidCursor: If the cursor cannot be read or was issued for another ordering
+        """
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+            value, pk = payload['k']
+            direction = payload['d']
+            ordering = payload['o']
+            value = self.field.to_python(value)
+            pk = self.pk_field.to_python(pk)
+        except (binascii.Error, ValueError, KeyError, TypeError, ValidationError):
+            raise InvalidCursor('Invalid cursor')
+        if ordering != self.ordering or direction not in ('next', 'prev') or value is None:
+            raise InvalidCursor('Cursor does not match the requested sort order')
+        return direction, value, pk
+
+    def page(self, cursor=None):
+        """
+        Fetch the page after (or, for a 'prev' cursor, before) the cursor.
+
+        Returns:
+            tuple: (list of rows, dict of pagination details)
+        """
+        direction, backwards = 'next', False
+        queryset = self.queryset
+        if cursor:
+            direction, value, pk = self.decode_cursor(cursor)
+            backwards = direction == 'prev'
+            queryset = queryset.filter(self._after(value, pk, backwards))
+
+        rows = list(queryset.order_by(*self.ordering_fields(backwards))[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if backwards:
+            rows.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, bool(cursor)
+
+        return rows, {
+            'page_size': self.page_size,
+            'has_next': has_next and bool(rows),
+            'has_previous': has_previous and bool(rows),
+            'next_cursor': self.encode_cursor(rows[-1], 'next') if has_next and rows else None,
+            'previous_cursor': self.encode_cursor(rows[0], 'prev') if has_previous and rows else None,
+        }
+
+
+def parse_page_size(request):
+    """page_size from the query string, capped at MAX_PAGE_SIZE; raises ValueError if not a number"""
+    page_size = int(request.GET.get('page_size', DEFAULT_PAGE_SIZE))
+    if page_size < 1:
+        raise ValueError('page_size must be positive')
+    return min(page_size, MAX_PAGE_SIZE)
+
+
+def paginate(request, queryset, ordering, page_size):
+    """
+    Paginate an admin listing from the request's query string.
+
+    With ?cursor= (or neither cursor nor page) pages are fetched by keyset;
+    ?with_total=true adds an approximate total_count. Requests that still send
+    ?page= get the previous offset pagination, with exact counts, plus a
+    next_cursor to move on with. That path is deprecated: it counts every
+    matching row and skips the ones before the page, so it is refused past
+    MAX_OFFSET_ROWS rows.
+
+    Returns:
+        tuple: (list of rows, dict of pagination details)
+
+    Raises:
+        InvalidCursor: If the cursor is not valid for this ordering
+        ValueError: If page is not a number or is deeper than MAX_OFFSET_ROWS
+    """
+    paginator = KeysetPaginator(queryset, ordering, page_size)
+    cursor = request.GET.get('cursor')
+    page = request.GET.get('page')
+
+    if page is not None and not cursor:
+        try:
+            page = int(page)
+        except ValueError:
+            raise ValueError('Invalid page parameter')
+        if (page - 1) * page_size >= MAX_OFFSET_ROWS:
+            raise ValueError('page is too deep for offset pagination; follow next_cursor instead')
+        offset_paginator = Paginator(queryset.order_by(*paginator.ordering_fields()), page_size)
+        current = offset_paginator.get_page(page)
+        rows = list(current)
+        has_next = current.has_next()
+        return rows, {
+            'current_page': current.number,
+            'page_size': page_size,
+            'total_pages': offset_paginator.num_pages,
+            'total_count': offset_paginator.count,
+            'has_next': has_next,
+            'has_previous': current.has_previous(),
+            'next_page': current.number + 1 if has_next else None,
+            'previous_page': current.number - 1 if current.has_previous() else None,
+            'next_cursor': paginator.encode_cursor(rows[-1], 'next') if has_next and rows else None,
+        }
+
+    rows, pagination = paginator.page(cursor)
+    if request.GET.get('with_total', '').lower() in TRUE_VALUES:
+        pagination['total_count'] = estimate_count(queryset)
+        pagination['total_count_is_estimate'] = connections[queryset.db].vendor == 'postgresql'
+    return rows, pagination
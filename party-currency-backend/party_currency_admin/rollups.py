@@ -0,0 +1,207 @@
+import logging
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate, TruncWeek
+from django.utils import timezone
+
+from authentication.models import CustomUser
+from events.models import Events as Event
+from payment.models import Transaction
+from .models import DailyMetricRollup, DailyTransactionRollup, RollupWatermark
+
+logger = logging.getLogger(__name__)
+
+# Days rebuilt per aggregate query during a backfill
+DAYS_PER_QUERY = 31
+INTERVALS = ('day', 'week')
+# Statuses a transaction does not leave again
+SETTLED_STATUSES = (Transaction.STATUS_SUCCESSFUL, Transaction.STATUS_FAILED, Transaction.STATUS_EXPIRED)
+
+
+def _day_bounds(days):
+    """Aware datetimes spanning the given dates, for an index-friendly range filter"""
+    tz = timezone.get_current_timezone()
+    start = timezone.make_aware(datetime.combine(min(days), time.min), tz)
+    end = timezone.make_aware(datetime.combine(max(days) + timedelta(days=1), time.min), tz)
+    return start, end
+
+
+def _chunks(days):
+    days = sorted(days)
+    for start in range(0, len(days), DAYS_PER_QUERY):
+        yield days[start:start + DAYS_PER_QUERY]
+
+
+def _rebuild_transactions(days):
+    rows = []
+    for chunk in _chunks(days):
+        start, end = _day_bounds(chunk)
+        totals = (
+            Transaction.objects.filter(created_at__gte=start, created_at__lt=end)
+            .annotate(day=TruncDate('created_at'))
+            .values('day', 'status')
+            .annotate(count=Count('pk'), amount=Sum('amount'))
+        )
+        wanted = set(chunk)
+        rows.extend(
+            DailyTransactionRollup(day=total['day'], status=total['status'], count=total['count'], amount=total['amount'] or 0)
+            for total in totals if total['day'] in wanted
+        )
+    DailyTransactionRollup.objects.filter(day__in=days).delete()
+    DailyTransactionRollup.objects.bulk_create(rows)
+
+
+def _metric_rebuilder(model, field, metric):
+    def rebuild(days):
+        rows = []
+        for chunk in _chunks(days):
+            start, end = _day_bounds(chunk)
+            totals = (
+                model.objects.filter(**{f'{field}__gte': start, f'{field}__lt': end})
+                .annotate(day=TruncDate(field))
+                .values('day')
+                .annotate(value=Count('pk'))
+            )
+            wanted = set(chunk)
+            rows.extend(
+                DailyMetricRollup(day=total['day'], metric=metric, value=total['value'])
+                for total in totals if total['day'] in wanted
+            )
+        DailyMetricRollup.objects.filter(metric=metric, day__in=days).delete()
+        DailyMetricRollup.objects.bulk_create(rows)
+    return rebuild
+
+
+# name: (model, field that moves when a row changes, field that picks its day, rebuild)
+SOURCES = {
+    'transactions': (Transaction, 'updated_at', 'created_at', _rebuild_transactions),
+    'new_users': (
+        CustomUser, 'date_joined', 'date_joined',
+        _metric_rebuilder(CustomUser, 'date_joined', DailyMetricRollup.METRIC_NEW_USERS),
+    ),
+    'new_events': (
+        Event, 'updated_at', 'created_at',
+        _metric_rebuilder(Event, 'created_at', DailyMetricRollup.METRIC_NEW_EVENTS),
+    ),
+}
+
+
+def refresh_source(name, now=None):
+    """
+    Fold rows of one source changed since its watermark into the rollups.
+
+    The days those rows were created on are recounted in full from the source
+    table and replaced, so re-running over the same rows is harmless. The scan
+    starts ROLLUP_WATERMARK_OVERLAP_SECONDS before the watermark to pick up rows
+    whose transactions committed after a later timestamp was already seen.
+    Without a watermark every day is rebuilt.
+
+    Returns:
+        int: Number of days rebuilt
+    """
+    model, changed_field, day_field, rebuild = SOURCES[name]
+    now = now or timezone.now()
+    watermark = RollupWatermark.objects.filter(name=name).first()
+
+    changed = model.objects.filter(**{f'{changed_field}__lte': now})
+    if watermark is not None:
+        since = watermark.value - timedelta(seconds=settings.ROLLUP_WATERMARK_OVERLAP_SECONDS)
+        changed = changed.filter(**{f'{changed_field}__gt': since})
+    days = set(
+        changed.annotate(day=TruncDate(day_field)).order_by().values_list('day', flat=True).distinct()
+    )
+
+    with transaction.atomic():
+        if days:
+            rebuild(days)
+        RollupWatermark.objects.update_or_create(name=name, defaults={'value': now})
+    return len(days)
+
+
+def refresh_rollups(now=None):
+    """
+    Bring every daily rollup up to date.
+
+    Rows deleted from a source are only reflected once their day is rebuilt
+    again, e.g. by clearing that source's watermark.
+
+    Returns:
+        dict: Number of days rebuilt per source
+    """
+    now = now or timezone.now()
+    report = {name: refresh_source(name, now=now) for name in SOURCES}
+    logger.info(f"Refreshed admin rollups: {report}")
+    return report
+
+
+def _periods(start, end, interval):
+    if interval == 'week':
+        period = start - timedelta(days=start.weekday())
+        step = timedelta(days=7)
+    else:
+        period = start
+        step = timedelta(days=1)
+    while period <= end:
+        yield period
+        period += step
+
+
+def get_timeseries(start, end, interval='day'):
+    """
+    Per-period admin figures between two dates (inclusive), read only from
+    the daily rollups. Weeks start on Monday; the first week is labelled with
+    its Monday even when start falls later in it, and only days within the
+    range are counted.
+
+    Returns:
+        list: One dict per period, oldest first, with revenue (sum of
+        successful transactions), transaction counts, success_rate (percentage
+        of settled transactions that succeeded), new_users and new_events
+    """
+    if interval not in INTERVALS:
+        raise ValueError(f"interval must be one of {', '.join(INTERVALS)}")
+    bucket = TruncWeek('day') if interval == 'week' else F('day')
+
+    series = {
+        period: {
+            'transactions': 0, 'successful_transactions': 0, 'settled_transactions': 0,
+            'revenue': 0, 'new_users': 0, 'new_events': 0,
+        }
+        for period in _periods(start, end, interval)
+    }
+
+    transactions = (
+        DailyTransactionRollup.objects.filter(day__gte=start, day__lte=end)
+        .annotate(period=bucket).values('period', 'status')
+        .annotate(count=Sum('count'), amount=Sum('amount')).order_by()
+    )
+    for row in transactions:
+        figures = series[row['period']]
+        figures['transactions'] += row['count']
+        if row['status'] in SETTLED_STATUSES:
+            figures['settled_transactions'] += row['count']
+        if row['status'] == Transaction.STATUS_SUCCESSFUL:
+            figures['successful_transactions'] += row['count']
+            figures['revenue'] += row['amount']
+
+    metrics = (
+        DailyMetricRollup.objects.filter(day__gte=start, day__lte=end)
+        .annotate(period=bucket).values('period', 'metric')
+        .annotate(value=Sum('value')).order_by()
+    )
+    for row in metrics:
+        series[row['period']][row['metric']] += row['value']
+
+    result = []
+    for period, figures in series.items():
+        settled = figures.pop('settled_transactions')
+        result.append({
+            'period': period.isoformat(),
+            **figures,
+            'revenue': f"{figures['revenue']:.2f}",
+            'success_rate': round(figures['successful_transactions'] / settled * 100, 2) if settled else 0,
+        })
+    return result
@@ -0,0 +1,87 @@
+import re
+from functools import reduce
+from operator import or_
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramWordSimilarity
+from django.db import connections
+from django.db.models import F, FloatField, Q
+from django.db.models.functions import Cast, Greatest
+
+# Annotation holding the relevance of each match, for sort_by=relevance
+RANK = 'rank'
+SEARCH_CONFIG = 'simple'
+
+
+class SearchSpec:
+    """
+    How one model is searched.
+
+    On PostgreSQL the model's search_vector column (kept by a trigger, see the
+    migrations adding it) is matched by word prefix through its GIN index, and
+    trigram_fields, which have gin_trgm_ops indexes, catch partial or
+    misspelt names and references. Models without a search_vector
+    (has_vector=False) are matched on trigrams alone. Elsewhere every field is
+    matched with icontains.
+    """
+
+    def __init__(self, trigram_fields, fallback_fields, has_vector=True):
+        self.trigram_fields = trigram_fields
+        self.fallback_fields = fallback_fields
+        self.has_vector = has_vector
+
+
+EVENT_SEARCH = SearchSpec(
+    trigram_fields=['event_name', 'event_author'],
+    fallback_fields=[
+        'event_name', 'event_description', 'street_address', 'city', 'state', 'event_author', 'delivery_status',
+    ],
+)
+TRANSACTION_SEARCH = SearchSpec(
+    trigram_fields=['customer_name', 'customer_email', 'payment_reference', 'transaction_reference'],
+    fallback_fields=['customer_name', 'customer_email', 'transaction_reference', 'payment_reference', 'event_id'],
+)
+USER_SEARCH = SearchSpec(
+    trigram_fields=['username', 'email', 'first_name', 'last_name'],
+    fallback_fields=['username', 'email', 'first_name', 'last_name'],
+    has_vector=False,
+)
+
+
+def _prefix_query(term):
+    """A tsquery matching every word of term as a prefix, or None if it has no words"""
+    words = re.findall(r'\w+', term.lower())
+    if not words:
+        return None
+    return SearchQuery(' & '.join(f"{word}:*" for word in words), search_type='raw', config=SEARCH_CONFIG)
+
+
+def apply_search(queryset, term, spec):
+    """
+    Filter queryset to rows matching term.
+
+    On PostgreSQL matches are annotated with RANK, combining full-text rank
+    and trigram similarity; see is_ranked.
+    """
+    term = term.strip()
+    if not term:
+        return queryset
+
+    if connections[queryset.db].vendor != 'postgresql':
+        return queryset.filter(reduce(or_, (Q(**{f"{field}__icontains": term}) for field in spec.fallback_fields)))
+
+    query = _prefix_query(term) if spec.has_vector else None
+    conditions = [Q(**{f"{field}__trigram_word_similar": term}) for field in spec.trigram_fields]
+    ranks = [TrigramWordSimilarity(term, field) for field in spec.trigram_fields]
+    if query is not None:
+        conditions.append(Q(search_vector=query))
+        ranks.append(Cast(SearchRank(F('search_vector'), query), FloatField()))
+
+    rank = Greatest(*ranks) if len(ranks) > 1 else ranks[0]
+    queryset = queryset.filter(reduce(or_, conditions)).annotate(**{RANK: Cast(rank, FloatField())})
+    # The vector is only needed in the WHERE clause
+    return queryset.defer('search_vector') if spec.has_vector else queryset
+
+
+def is_ranked(queryset):
+    """True if queryset came from apply_search() with a relevance to order by"""
+    return RANK in queryset.query.annotations
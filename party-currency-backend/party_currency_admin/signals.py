@@ -0,0 +1,127 @@
+from collections import Counter
+
+from django.apps import apps
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from authentication.models import CustomUser
+from events.models import Events as Event
+from payment.models import Transaction
+from payment.signals import transaction_status_changed
+from . import stats
+
+# Fields whose value as loaded is remembered, so a full save() only moves the
+# counters that actually changed
+USER_TRACKED_FIELDS = ('is_active', 'date_joined')
+TRANSACTION_TRACKED_FIELDS = ('status',)
+_UNKNOWN = object()
+
+
+def _remember(instance, fields):
+    # Read from __dict__ so deferred fields are not fetched
+    instance._stats_snapshot = {field: instance.__dict__.get(field, _UNKNOWN) for field in fields}
+
+
+def _previous(instance, fields):
+    """The tracked values as loaded, or None if any of them is unknown"""
+    snapshot = getattr(instance, '_stats_snapshot', None)
+    if snapshot is None or any(snapshot.get(field, _UNKNOWN) is _UNKNOWN for field in fields):
+        return None
+    return snapshot
+
+
+def _user_counters(is_active, date_joined):
+    if not is_active:
+        return Counter()
+    return Counter({'total_active_users': 1, stats.week_counter('new_active_users', date_joined): 1})
+
+
+def user_loaded(sender, instance, **kwargs):
+    _remember(instance, USER_TRACKED_FIELDS)
+
+
+def user_saved(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        stats.adjust(_user_counters(instance.is_active, instance.date_joined))
+    elif update_fields is None or set(USER_TRACKED_FIELDS) & set(update_fields):
+        previous = _previous(instance, USER_TRACKED_FIELDS)
+        if previous is None:
+            stats.invalidate()
+        else:
+            # e.g. a suspension; saves that leave both fields alone move nothing
+            deltas = _user_counters(instance.is_active, instance.date_joined)
+            deltas.subtract(_user_counters(previous['is_active'], previous['date_joined']))
+            stats.adjust(deltas)
+    _remember(instance, USER_TRACKED_FIELDS)
+
+
+# Deleting a subclass row (e.g. a Merchant) also deletes its CustomUser row,
+# which sends this signal, so only the base model is connected here
+@receiver(post_delete, sender=CustomUser)
+def user_deleted(sender, instance, **kwargs):
+    if instance.is_active:
+        stats.adjust({
+            'total_active_users': -1,
+            stats.week_counter('new_active_users', instance.date_joined): -1,
+        })
+
+
+# Saving a multi-table subclass such as Merchant sends post_save for the
+# subclass only, so every user model gets the load and save receivers
+for user_model in apps.get_models():
+    if issubclass(user_model, CustomUser):
+        post_init.connect(user_loaded, sender=user_model)
+        post_save.connect(user_saved, sender=user_model)
+
+
+@receiver(post_save, sender=Event)
+def event_saved(sender, instance, created, **kwargs):
+    if created:
+        stats.adjust({'total_events': 1, stats.week_counter('events', instance.created_at): 1})
+
+
+@receiver(post_delete, sender=Event)
+def event_deleted(sender, instance, **kwargs):
+    stats.adjust({'total_events': -1, stats.week_counter('events', instance.created_at): -1})
+
+
+@receiver(post_init, sender=Transaction)
+def transaction_loaded(sender, instance, **kwargs):
+    _remember(instance, TRANSACTION_TRACKED_FIELDS)
+
+
+@receiver(post_save, sender=Transaction)
+def transaction_saved(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        stats.adjust({
+            stats.STATUS_COUNTERS.get(instance.status): 1,
+            stats.week_counter('transactions', instance.created_at): 1,
+        })
+    elif update_fields is None:
+        # Status changes made through payment.services pass update_fields and
+        # arrive as transaction_status_changed instead
+        previous = _previous(instance, TRANSACTION_TRACKED_FIELDS)
+        if previous is None:
+            stats.invalidate()
+        elif previous['status'] != instance.status:
+            deltas = Counter()
+            deltas[stats.STATUS_COUNTERS.get(previous['status'])] -= 1
+            deltas[stats.STATUS_COUNTERS.get(instance.status)] += 1
+            stats.adjust(deltas)
+    _remember(instance, TRANSACTION_TRACKED_FIELDS)
+
+
+@receiver(post_delete, sender=Transaction)
+def transaction_deleted(sender, instance, **kwargs):
+    stats.adjust({
+        stats.STATUS_COUNTERS.get(instance.status): -1,
+        stats.week_counter('transactions', instance.created_at): -1,
+    })
+
+
+@receiver(transaction_status_changed)
+def transaction_status_moved(sender, transaction, previous_status, **kwargs):
+    stats.adjust({
+        stats.STATUS_COUNTERS.get(previous_status): -1,
+        stats.STATUS_COUNTERS.get(transaction.status): 1,
+    })
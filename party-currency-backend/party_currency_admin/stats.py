@@ -0,0 +1,152 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from authentication.models import CustomUser
+from events.models import Events as Event
+from payment.models import Transaction
+
+
+KEY_PREFIX = "admin_stats_"
+COUNTERS = (
+    'total_active_users',
+    'new_active_users_this_week',
+    'new_active_users_previous_week',
+    'total_completed_transactions',
+    'total_pending_transactions',
+    'transactions_this_week',
+    'transactions_previous_week',
+    'total_events',
+    'events_this_week',
+    'events_previous_week',
+)
+# Counter moved when a transaction enters or leaves a status
+STATUS_COUNTERS = {
+    Transaction.STATUS_SUCCESSFUL: 'total_completed_transactions',
+    Transaction.STATUS_PENDING: 'total_pending_transactions',
+}
+
+
+def _key(counter):
+    return f"{KEY_PREFIX}{counter}"
+
+
+def _periods(now):
+    start_of_this_period = now - timedelta(days=7)
+    return start_of_this_period, start_of_this_period - timedelta(days=7)
+
+
+def compute_counters(now=None):
+    """
+    Count everything the dashboard shows with one conditional-aggregation
+    query per table instead of one COUNT(*) per figure.
+    """
+    now = now or timezone.now()
+    start_of_this_period, start_of_previous_period = _periods(now)
+    this_week = Q(created_at__gte=start_of_this_period, created_at__lt=now)
+    previous_week = Q(created_at__gte=start_of_previous_period, created_at__lt=start_of_this_period)
+
+    users = CustomUser.objects.aggregate(
+        total_active_users=Count('pk', filter=Q(is_active=True)),
+        new_active_users_this_week=Count('pk', filter=Q(
+            is_active=True, date_joined__gte=start_of_this_period, date_joined__lt=now
+        )),
+        new_active_users_previous_week=Count('pk', filter=Q(
+            is_active=True, date_joined__gte=start_of_previous_period, date_joined__lt=start_of_this_period
+        )),
+    )
+    transactions = Transaction.objects.aggregate(
+        total_completed_transactions=Count('pk', filter=Q(status=Transaction.STATUS_SUCCESSFUL)),
+        total_pending_transactions=Count('pk', filter=Q(status=Transaction.STATUS_PENDING)),
+        transactions_this_week=Count('pk', filter=this_week),
+        transactions_previous_week=Count('pk', filter=previous_week),
+    )
+    events = Event.objects.aggregate(
+        total_events=Count('pk'),
+        events_this_week=Count('pk', filter=this_week),
+        events_previous_week=Count('pk', filter=previous_week),
+    )
+    return {**users, **transactions, **events}
+
+
+def get_counters():
+    """
+    Return the dashboard counters from the cached snapshot, recomputing it
+    once ADMIN_STATS_CACHE_SECONDS have passed or a counter is missing.
+
+    Between recomputes the counters are kept current by the signal handlers
+    in party_currency_admin.signals; the TTL bounds how far the 7-day windows
+    drift as rows age out of them.
+    """
+    cached = cache.get_many([_key(counter) for counter in COUNTERS])
+    if len(cached) == len(COUNTERS):
+        return {counter: cached[_key(counter)] for counter in COUNTERS}
+
+    counters = compute_counters()
+    cache.set_many(
+        {_key(counter): value for counter, value in counters.items()},
+        timeout=settings.ADMIN_STATS_CACHE_SECONDS
+    )
+    return counters
+
+
+def adjust(deltas):
+    """Apply {counter: delta} to the cached snapshot; counters not cached are left to the next recompute"""
+    for counter, delta in deltas.items():
+        if counter is None or not delta:
+            continue
+        try:
+            cache.incr(_key(counter), delta)
+        except ValueError:
+            pass
+
+
+def invalidate():
+    """Drop the snapshot after a change whose effect on the counters is unknown"""
+    cache.delete_many([_key(counter) for counter in COUNTERS])
+
+
+def week_counter(prefix, created_at, now=None):
+    """The '<prefix>_this_week' or '<prefix>_previous_week' counter a timestamp falls in, or None"""
+    if created_at is None:
+        return None
+    now = now or timezone.now()
+    start_of_this_period, start_of_previous_period = _periods(now)
+    if start_of_this_period <= created_at < now:
+        return f"{prefix}_this_week"
+    if start_of_previous_period <= created_at < start_of_this_period:
+        return f"{prefix}_previous_week"
+    return None
+
+
+def _percentage_increase(this_week, previous_week):
+    if previous_week > 0:
+        return ((this_week - previous_week) / previous_week) * 100
+    return 100 if this_week > 0 else 0
+
+
+def get_admin_statistics():
+    """The admin dashboard payload, built from the cached counters"""
+    counters = get_counters()
+    return {
+        'total_active_users': counters['total_active_users'],
+        'new_active_users_this_week': counters['new_active_users_this_week'],
+        'new_active_users_previous_week': counters['new_active_users_previous_week'],
+        'percentage_increase': round(_percentage_increase(
+            counters['new_active_users_this_week'], counters['new_active_users_previous_week']
+        ), 2),
+        'total_completed_transactions': counters['total_completed_transactions'],
+        'total_pending_transactions': counters['total_pending_transactions'],
+        'transactions_this_week': counters['transactions_this_week'],
+        'percentage_increase_transactions': round(_percentage_increase(
+            counters['transactions_this_week'], counters['transactions_previous_week']
+        ), 2),
+        'total_events': counters['total_events'],
+        'events_this_week': counters['events_this_week'],
+        'percentage_increase_events': round(_percentage_increase(
+            counters['events_this_week'], counters['events_previous_week']
+        ), 2),
+    }
@@ -0,0 +1,13 @@
+from celery import shared_task
+
+from .rollups import refresh_rollups
+
+
+@shared_task
+def refresh_rollups_task():
+    """
+    Celery task that folds transactions, users and events changed since the
+    last run into the daily rollups behind the admin time-series endpoint.
+    This task is scheduled to run every 15 minutes.
+    """
+    return refresh_rollups()
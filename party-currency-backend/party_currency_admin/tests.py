@@ -1,3 +1,408 @@
-from django.test import TestCase
+import base64
+import json
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import F, FloatField
+from django.db.models.functions import Cast
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from authentication.models import CustomUser, Merchant
+from events.models import Events
+from payment.models import Transaction
+from . import rollups, stats
+from .models import DailyMetricRollup, DailyTransactionRollup
+from .pagination import MAX_OFFSET_ROWS, InvalidCursor, KeysetPaginator
+from .search import EVENT_SEARCH, RANK, TRANSACTION_SEARCH, USER_SEARCH, _prefix_query, apply_search, is_ranked
+
+# Repeated amounts check the primary key tie-breaker
+AMOUNTS = ('500.00', '100.00', '300.00', '100.00', '700.00', '300.00', '100.00')
+
+
+class KeysetPaginatorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for i, amount in enumerate(AMOUNTS):
+            Transaction.objects.create(
+                amount=Decimal(amount),
+                customer_email=f"payer{i}@example.com",
+                payment_reference=f"partypage{i}",
+                transaction_reference=f"MNFY|partypage{i}",
+            )
+
+    def _walk(self, ordering, page_size=3):
+        """Follow next cursors to the end, then previous cursors back to the start"""
+        paginator = KeysetPaginator(Transaction.objects.all(), ordering, page_size)
+        forward, cursor = [], None
+        while True:
+            rows, pagination = paginator.page(cursor)
+            forward.append([row.pk for row in rows])
+            cursor = pagination['next_cursor']
+            if not cursor:
+                break
+            self.assertTrue(pagination['has_next'])
+
+        backward, cursor = [], pagination['previous_cursor']
+        while cursor:
+            rows, pagination = paginator.page(cursor)
+            backward.insert(0, [row.pk for row in rows])
+            cursor = pagination['previous_cursor']
+        self.assertFalse(pagination['has_previous'])
+        return forward, backward
+
+    def test_forward_and_back_round_trip(self):
+        for ordering in ('amount', '-amount'):
+            with self.subTest(ordering=ordering):
+                tie_breaker = '-pk' if ordering.startswith('-') else 'pk'
+                expected = list(Transaction.objects.order_by(ordering, tie_breaker).values_list('pk', flat=True))
+                forward, backward = self._walk(ordering)
+                self.assertEqual([pk for page in forward for pk in page], expected)
+                self.assertEqual([len(page) for page in forward], [3, 3, 1])
+                # Every page but the last is reached again on the way back
+                self.assertEqual(backward, forward[:-1])
+
+    def test_malformed_cursor_is_rejected(self):
+        paginator = KeysetPaginator(Transaction.objects.all(), 'amount')
+        for cursor in ('not-a-cursor!', 'e30', base64.urlsafe_b64encode(b'{"k": 1}').decode()):
+            with self.subTest(cursor=cursor), self.assertRaises(InvalidCursor):
+                paginator.page(cursor)
+
+    def test_cursor_for_another_ordering_is_rejected(self):
+        _, pagination = KeysetPaginator(Transaction.objects.all(), 'amount', 3).page()
+        with self.assertRaises(InvalidCursor):
+            KeysetPaginator(Transaction.objects.all(), '-amount', 3).page(pagination['next_cursor'])
+
+    def test_cursor_with_unparseable_key_is_rejected(self):
+        payload = {'o': 'amount', 'd': 'next', 'k': ['lots', '1']}
+        cursor = base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+        with self.assertRaises(InvalidCursor):
+            KeysetPaginator(Transaction.objects.all(), 'amount').page(cursor)
+
+    def test_bad_cursor_is_a_bad_request(self):
+        admin = CustomUser.objects.create_superuser(
+            username='admin@example.com', email='admin@example.com', password='secret',
+            first_name='Ada', last_name='Admin'
+        )
+        client = APIClient()
+        client.force_authenticate(admin)
+        response = client.get('/admin/get-users', {'cursor': 'not-a-cursor!'})
+        self.assertEqual(response.status_code, 400)
+
+
+class StatsSignalTests(TestCase):
+    """The cached dashboard counters must track the tables without a recompute"""
+
+    def setUp(self):
+        stats.invalidate()
+        self.addCleanup(stats.invalidate)
+        CustomUser.objects.create_user(username='first@example.com', email='first@example.com', password='secret')
+        stats.get_counters()
+
+    def assertSnapshotCurrent(self):
+        cached = cache.get_many([stats._key(counter) for counter in stats.COUNTERS])
+        self.assertEqual(len(cached), len(stats.COUNTERS), "the snapshot was invalidated")
+        self.assertEqual(
+            {counter: cached[stats._key(counter)] for counter in stats.COUNTERS},
+            stats.compute_counters()
+        )
+
+    def test_users_and_merchants(self):
+        user = CustomUser.objects.create_user(username='user@example.com', email='user@example.com', password='secret')
+        merchant = Merchant.objects.create_user(
+            username='shop@example.com', email='shop@example.com', password='secret', business_type='catering'
+        )
+        self.assertSnapshotCurrent()
+
+        merchant.is_active = False
+        merchant.save()
+        self.assertSnapshotCurrent()
+
+        merchant = Merchant.objects.get(pk=merchant.pk)
+        merchant.is_active = True
+        merchant.save(update_fields=['is_active'])
+        self.assertSnapshotCurrent()
+
+        # Saves that leave the tracked fields alone move nothing
+        user.first_name = 'Renamed'
+        user.save()
+        self.assertSnapshotCurrent()
+
+        merchant.delete()
+        self.assertSnapshotCurrent()
+        user.delete()
+        self.assertSnapshotCurrent()
+
+    def test_transactions(self):
+        transaction = Transaction.objects.create(
+            amount=Decimal('250.00'), customer_email='first@example.com',
+            payment_reference='partystats', transaction_reference='MNFY|partystats',
+        )
+        self.assertSnapshotCurrent()
+
+        transaction.status = Transaction.STATUS_SUCCESSFUL
+        transaction.save()
+        self.assertSnapshotCurrent()
+
+        transaction.delete()
+        self.assertSnapshotCurrent()
+
+
+class UserListingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create_superuser(
+            username='admin@example.com', email='admin@example.com', password='secret',
+            first_name='Ada', last_name='Admin'
+        )
+        for i, spend in enumerate(('300.00', '1200.00', '50.00', '800.00', '0.00')):
+            CustomUser.objects.create_user(
+                username=f"guest{i}@example.com", email=f"guest{i}@example.com", password='secret',
+                first_name=f"Guest{i}", last_name='Party',
+                total_amount_spent=Decimal(spend), successful_transactions=i,
+            )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def _walk(self, **params):
+        """Every row of the listing, following next_cursor"""
+        rows, cursor = [], None
+        while True:
+            query = dict(params, page_size=2, **({'cursor': cursor} if cursor else {}))
+            response = self.client.get('/admin/get-users', query)
+            self.assertEqual(response.status_code, 200)
+            rows.extend(response.data['users'])
+            cursor = response.data['pagination']['next_cursor']
+            if not cursor:
+                return rows
+
+    def test_sorted_by_spend_across_pages(self):
+        rows = self._walk(sort_by='spend_high')
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(
+            [row['total_amount'] for row in rows],
+            ['₦1200.00', '₦800.00', '₦300.00', '₦50.00', '₦0.00', '₦0.00']
+        )
+        self.assertEqual(rows[0]['email'], 'guest1@example.com')
+        self.assertEqual(rows[0]['transaction_count'], 1)
+
+    def test_sorted_by_transactions(self):
+        rows = self._walk(sort_by='transactions_high')
+        self.assertEqual([row['transaction_count'] for row in rows], [4, 3, 2, 1, 0, 0])
+
+    def test_search_and_total(self):
+        response = self.client.get('/admin/get-users', {'search': 'guest3', 'with_total': 'true'})
+        self.assertEqual([row['username'] for row in response.data['users']], ['guest3@example.com'])
+        self.assertEqual(response.data['pagination']['total_count'], 1)
+
+    def test_requires_superuser(self):
+        self.client.force_authenticate(CustomUser.objects.get(username='guest0@example.com'))
+        self.assertEqual(self.client.get('/admin/get-users').status_code, 403)
+
+
+class EventListingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create_superuser(
+            username='admin@example.com', email='admin@example.com', password='secret',
+            first_name='Ada', last_name='Admin'
+        )
+        for i in range(5):
+            Events.objects.create(
+                event_id=f"EVTlist{i}", event_name=f"Party {i}", start_date='2025-01-01',
+                end_date='2025-01-02', delivery_address='Lagos'
+            )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_cursor_pages_with_total(self):
+        response = self.client.get('/admin/get-events', {'page_size': 2, 'sort_by': 'name_asc', 'with_total': 'true'})
+        pagination = response.data['pagination']
+        self.assertEqual([event['event_name'] for event in response.data['events']], ['Party 0', 'Party 1'])
+        self.assertEqual(pagination['total_count'], 5)
+        self.assertFalse(pagination['has_previous'])
+
+        response = self.client.get('/admin/get-events', {
+            'page_size': 2, 'sort_by': 'name_asc', 'cursor': pagination['next_cursor']
+        })
+        self.assertEqual([event['event_name'] for event in response.data['events']], ['Party 2', 'Party 3'])
+        self.assertTrue(response.data['pagination']['has_previous'])
+
+    def test_offset_pages_still_work(self):
+        response = self.client.get('/admin/get-events', {'page': 2, 'page_size': 2, 'sort_by': 'name_asc'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['pagination']['current_page'], 2)
+        self.assertEqual(response.data['pagination']['total_pages'], 3)
+        self.assertEqual([event['event_name'] for event in response.data['events']], ['Party 2', 'Party 3'])
+
+    def test_deep_offset_pages_are_refused(self):
+        page = MAX_OFFSET_ROWS // 10 + 1
+        response = self.client.get('/admin/get-events', {'page': page, 'page_size': 10})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('next_cursor', response.data['error'])
+
+
+def _at(day, hour=12):
+    return timezone.make_aware(datetime.combine(day, datetime.min.time()) + timedelta(hours=hour))
+
+
+class RollupTests(TestCase):
+    # A Monday; the fixtures span two weeks
+    MONDAY = date(2025, 1, 6)
+    NOW = _at(date(2025, 1, 20))
+
+    def setUp(self):
+        self.transaction(self.MONDAY, '1000.00', Transaction.STATUS_SUCCESSFUL)
+        self.transaction(self.MONDAY, '400.00', Transaction.STATUS_FAILED)
+        self.transaction(self.MONDAY + timedelta(days=1), '250.00', Transaction.STATUS_SUCCESSFUL)
+        self.transaction(self.MONDAY + timedelta(days=1), '90.00', Transaction.STATUS_PENDING)
+        self.transaction(self.MONDAY + timedelta(days=7), '600.00', Transaction.STATUS_SUCCESSFUL)
+        user = CustomUser.objects.create_user(username='joined@example.com', email='joined@example.com', password='secret')
+        CustomUser.objects.filter(pk=user.pk).update(date_joined=_at(self.MONDAY))
+        event = Events.objects.create(
+            event_id='EVTrollup', event_name='Party', start_date='2025-01-10', end_date='2025-01-11',
+            delivery_address='Lagos'
+        )
+        Events.objects.filter(pk=event.pk).update(created_at=_at(self.MONDAY), updated_at=_at(self.MONDAY))
+
+    def transaction(self, day, amount, status, changed_at=None):
+        reference = f"partyroll{Transaction.objects.count()}"
+        row = Transaction.objects.create(
+            amount=Decimal(amount), status=status, customer_email='payer@example.com',
+            payment_reference=reference, transaction_reference=f"MNFY|{reference}",
+        )
+        Transaction.objects.filter(pk=row.pk).update(created_at=_at(day), updated_at=changed_at or _at(day))
+        return row
+
+    def test_first_refresh_rebuilds_every_day(self):
+        report = rollups.refresh_rollups(now=self.NOW)
+        self.assertEqual(report, {'transactions': 3, 'new_users': 1, 'new_events': 1})
+
+        monday, tuesday = rollups.get_timeseries(self.MONDAY, self.MONDAY + timedelta(days=1))
+        self.assertEqual(monday['period'], '2025-01-06')
+        self.assertEqual(monday['transactions'], 2)
+        self.assertEqual(monday['revenue'], '1000.00')
+        self.assertEqual(monday['success_rate'], 50.0)
+        self.assertEqual((monday['new_users'], monday['new_events']), (1, 1))
+        # Pending transactions are counted but left out of the success rate
+        self.assertEqual(tuesday['transactions'], 2)
+        self.assertEqual(tuesday['success_rate'], 100.0)
+
+    def test_weeks_start_on_monday_and_keep_to_the_range(self):
+        rollups.refresh_rollups(now=self.NOW)
+        first, second = rollups.get_timeseries(self.MONDAY + timedelta(days=1), self.MONDAY + timedelta(days=7), 'week')
+        self.assertEqual(first['period'], '2025-01-06')
+        self.assertEqual((first['transactions'], first['revenue']), (2, '250.00'))
+        self.assertEqual((first['new_users'], first['new_events']), (0, 0))
+        self.assertEqual((second['period'], second['revenue']), ('2025-01-13', '600.00'))
+
+    def test_later_refresh_only_rebuilds_changed_days(self):
+        rollups.refresh_rollups(now=self.NOW)
+        pending = Transaction.objects.get(status=Transaction.STATUS_PENDING)
+        Transaction.objects.filter(pk=pending.pk).update(
+            status=Transaction.STATUS_SUCCESSFUL, updated_at=self.NOW + timedelta(minutes=5)
+        )
+
+        report = rollups.refresh_rollups(now=self.NOW + timedelta(minutes=15))
+        self.assertEqual(report, {'transactions': 1, 'new_users': 0, 'new_events': 0})
+        self.assertEqual(
+            DailyTransactionRollup.objects.get(day=self.MONDAY + timedelta(days=1), status=Transaction.STATUS_SUCCESSFUL).amount,
+            Decimal('340.00')
+        )
+        self.assertFalse(DailyTransactionRollup.objects.filter(status=Transaction.STATUS_PENDING).exists())
+        self.assertEqual(DailyMetricRollup.objects.count(), 2)
+
+    def test_rows_committed_behind_the_watermark_are_picked_up(self):
+        rollups.refresh_rollups(now=self.NOW)
+        self.transaction(self.MONDAY + timedelta(days=2), '75.00', Transaction.STATUS_SUCCESSFUL,
+                         changed_at=self.NOW - timedelta(seconds=60))
+        self.assertEqual(rollups.refresh_source('transactions', now=self.NOW + timedelta(minutes=15)), 1)
+        self.assertTrue(DailyTransactionRollup.objects.filter(day=self.MONDAY + timedelta(days=2)).exists())
+
+    @override_settings(ROLLUP_WATERMARK_OVERLAP_SECONDS=0)
+    def test_without_overlap_late_rows_are_missed(self):
+        rollups.refresh_rollups(now=self.NOW)
+        self.transaction(self.MONDAY + timedelta(days=2), '75.00', Transaction.STATUS_SUCCESSFUL,
+                         changed_at=self.NOW - timedelta(seconds=60))
+        self.assertEqual(rollups.refresh_source('transactions', now=self.NOW + timedelta(minutes=15)), 0)
+
+    def test_endpoint_validates_the_range(self):
+        admin = CustomUser.objects.create_superuser(
+            username='admin@example.com', email='admin@example.com', password='secret',
+            first_name='Ada', last_name='Admin'
+        )
+        client = APIClient()
+        client.force_authenticate(admin)
+        rollups.refresh_rollups(now=self.NOW)
+
+        response = client.get('/admin/get-analytics-timeseries', {'start': '2025-01-06', 'end': '2025-01-19', 'interval': 'week'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['revenue'] for row in response.data['series']], ['1250.00', '600.00'])
+
+        for params in ({'interval': 'month'}, {'start': '2025-01-10', 'end': '2025-01-01'}, {'start': 'yesterday'}):
+            with self.subTest(params=params):
+                self.assertEqual(client.get('/admin/get-analytics-timeseries', params).status_code, 400)
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create_superuser(
+            username='admin@example.com', email='admin@example.com', password='secret',
+            first_name='Ada', last_name='Admin'
+        )
+        for i, (name, email) in enumerate((('Tunde Bakare', 'tunde@example.com'), ('Ngozi Eze', 'ngozi@example.com'))):
+            Transaction.objects.create(
+                amount=Decimal('100.00') * (i + 1), status=Transaction.STATUS_SUCCESSFUL,
+                customer_name=name, customer_email=email,
+                payment_reference=f"partysearch{i}", transaction_reference=f"MNFY|partysearch{i}",
+            )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_prefix_query_matches_every_word(self):
+        self.assertEqual(_prefix_query("Tunde's  PARTY").source_expressions[-1].value, 'tunde:* & s:* & party:*')
+        self.assertIsNone(_prefix_query('!?'))
+
+    def test_postgres_search_is_ranked(self):
+        with mock.patch.object(connections['default'], 'vendor', 'postgresql'):
+            transactions = apply_search(Transaction.objects.all(), 'tunde', TRANSACTION_SEARCH)
+            users = apply_search(CustomUser.objects.all(), 'tunde', USER_SEARCH)
+        self.assertTrue(is_ranked(transactions))
+        self.assertIn('search_vector', transactions.query.deferred_loading[0])
+        self.assertIn('search_vector', str(transactions.query.where))
+        # Users have no vector and are matched on trigrams alone
+        self.assertTrue(is_ranked(users))
+        self.assertNotIn('search_vector', str(users.query.where))
+
+    def test_other_databases_fall_back_to_icontains(self):
+        transactions = apply_search(Transaction.objects.all(), ' ngozi@ ', TRANSACTION_SEARCH)
+        self.assertFalse(is_ranked(transactions))
+        self.assertEqual([row.customer_name for row in transactions], ['Ngozi Eze'])
+        self.assertEqual(apply_search(Events.objects.all(), '   ', EVENT_SEARCH).count(), Events.objects.count())
+
+    def test_search_defaults_to_relevance_and_falls_back_to_newest(self):
+        response = self.client.get('/admin/get-all-transactions', {'search': 'partysearch'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['filters']['sort_by'], 'relevance')
+        self.assertEqual(
+            [row['payment_reference'] for row in response.data['transactions']], ['partysearch1', 'partysearch0']
+        )
+
+    def test_cursor_pages_over_a_rank(self):
+        queryset = Transaction.objects.annotate(**{RANK: Cast(F('amount'), FloatField())})
+        paginator = KeysetPaginator(queryset, f'-{RANK}', 1)
+        first, pagination = paginator.page()
+        second, pagination = paginator.page(pagination['next_cursor'])
+        self.assertEqual([first[0].customer_name, second[0].customer_name], ['Ngozi Eze', 'Tunde Bakare'])
+        self.assertFalse(pagination['has_next'])
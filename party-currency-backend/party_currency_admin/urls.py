@@ -1,5 +1,5 @@
 from django.urls import path
-from .views import get_users, suspend_user, activate_user, delete_user, get_admin_statistics, get_events, get_pending_events, get_user, change_event_status, get_transactions, get_event_transaction
+from .views import get_users, suspend_user, activate_user, delete_user, get_admin_statistics, get_analytics_timeseries, get_events, get_pending_events, get_user, change_event_status, get_transactions, get_event_transaction
 
 
 urlpatterns = [
@@ -8,6 +8,7 @@ urlpatterns = [
     path('activate-user/<str:user_id>', activate_user, name='activate_user'),
     path('delete-user/<str:user_id>', delete_user, name='delete_user'),
     path('get-admin-statistics', get_admin_statistics, name='get_admin_statistics'),
+    path('get-analytics-timeseries', get_analytics_timeseries, name='get_analytics_timeseries'),
     path('get-events', get_events, name='get_events'),
     path('get-pending-event', get_pending_events, name='get_events_offset'),
     path('get-user', get_user, name='get_user'),
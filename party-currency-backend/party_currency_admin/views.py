@@ -1,4 +1,6 @@
+import csv
 from django.shortcuts import render
+from django.http import StreamingHttpResponse
 from rest_framework.decorators import api_view, authentication_classes, permission_classes
 from rest_framework.response import Response
 from authentication.models import CustomUser
@@ -7,38 +9,130 @@ from events.models import Events as Event
 from rest_framework.authentication import TokenAuthentication, SessionAuthentication
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from events.serializers import EventSerializerFull
-from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
-from django.db.models import Q
 import math
 from authentication.serializers import UserSerializer2
 from payment.serializers import TransactionSerializer
+from django.conf import settings
+from django.utils.dateparse import parse_date
+from . import rollups, stats
+from .pagination import paginate, parse_page_size
+from .search import EVENT_SEARCH, RANK, TRANSACTION_SEARCH, USER_SEARCH, apply_search, is_ranked
 # Your existing views remain the same...
 
+# sort_by values of the event listings and the ordering they map to
+EVENT_SORT_MAPPING = {
+    'newest': '-created_at',           # Newest events first
+    'oldest': 'created_at',            # Oldest events first
+    'name_asc': 'event_name',          # Event name A-Z
+    'name_desc': '-event_name',        # Event name Z-A
+    'date_early': 'start_date',        # Earliest start date first
+    'date_late': '-start_date',        # Latest start date first
+}
+# Raw field names accepted by get_pending_events, with the old title/date aliases
+EVENT_SORT_FIELDS = {
+    'created_at': 'created_at', '-created_at': '-created_at',
+    'event_name': 'event_name', '-event_name': '-event_name',
+    'start_date': 'start_date', '-start_date': '-start_date',
+    'title': 'event_name', '-title': '-event_name',
+    'date': 'start_date', '-date': '-start_date',
+}
+
+# sort_by values of the user listing and the ordering they map to
+USER_SORT_MAPPING = {
+    'newest': '-date_joined',               # Most recently joined first
+    'oldest': 'date_joined',                # Earliest joined first
+    'username_asc': 'username',             # Username A-Z
+    'username_desc': '-username',           # Username Z-A
+    'spend_high': '-total_amount_spent',    # Highest successful spend first
+    'spend_low': 'total_amount_spent',      # Lowest successful spend first
+    'transactions_high': '-successful_transactions',
+}
+USER_EXPORT_COLUMNS = ['username', 'email', 'name', 'role', 'isActive', 'date_joined', 'last_login', 'total_amount', 'transaction_count']
+
+
+def _user_row(user):
+    return {
+        'username': user.username,
+        'email': user.email,
+        'name': f"{user.first_name} {user.last_name}",
+        'role': user.type,
+        'isActive': user.is_active,
+        'date_joined': user.date_joined,
+        "last_login": user.last_login,
+        "total_amount": f"₦{user.total_amount_spent:.2f}",
+        'transaction_count': user.successful_transactions,
+    }
+
+
+class _Echo:
+    """File-like object handing each CSV line straight back to the response"""
+    def write(self, value):
+        return value
+
+
+def _stream_users_csv(queryset):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(USER_EXPORT_COLUMNS)
+    for user in queryset.iterator(chunk_size=2000):
+        row = _user_row(user)
+        yield writer.writerow([row[column] for column in USER_EXPORT_COLUMNS])
+
+
 @api_view(['GET'])
 @authentication_classes([TokenAuthentication, SessionAuthentication])
 @permission_classes([IsAuthenticated])
 def get_users(request):
     if not request.user.is_superuser:
         return Response({'error': 'Access denied. Superuser privileges required.'}, status=403)
-        
-    users = CustomUser.objects.all()
-    tran = Transaction.objects.filter(customer_email=request.user.email)
-    total = 0
-    for t in tran:
-        if t.status == 'success':  # Fixed bug: was tran.status instead of t.status
-            total += t.amount
-        
-    user_data = []
-    for user in users:
-        user_data.append({
-            'username': user.username,
-            'name': f"{user.first_name} {user.last_name}",
-            'role': user.type,
-            'isActive': user.is_active,
-            "last_login": user.last_login,
-            "total_amount": f"₦{total}"
-        })
-    return Response({'users': user_data})
+
+    try:
+        # Get query parameters
+        search = request.GET.get('search', '')
+        # Default to the most relevant first when searching, newest first otherwise
+        sort_by = request.GET.get('sort_by', 'relevance' if search else 'newest')
+        role = request.GET.get('role')
+
+        try:
+            page_size = parse_page_size(request)
+        except ValueError:
+            return Response({'error': 'Invalid page or page_size parameter'}, status=400)
+
+        users_queryset = CustomUser.objects.all()
+        if role:
+            users_queryset = users_queryset.filter(type=role)
+        users_queryset = apply_search(users_queryset, search, USER_SEARCH)
+
+        # Default to newest if invalid sort parameter, or if results are not ranked
+        if sort_by == 'relevance' and is_ranked(users_queryset):
+            ordering = f'-{RANK}'
+        else:
+            ordering = USER_SORT_MAPPING.get(sort_by, '-date_joined')
+
+        # Every matching user, streamed as CSV rather than built in memory
+        if request.GET.get('export') == 'csv':
+            users_queryset = users_queryset.order_by(ordering, '-pk' if ordering.startswith('-') else 'pk')
+            response = StreamingHttpResponse(_stream_users_csv(users_queryset), content_type='text/csv')
+            response['Content-Disposition'] = 'attachment; filename="users.csv"'
+            return response
+
+        try:
+            users_page, pagination = paginate(request, users_queryset, ordering, page_size)
+        except ValueError as e:
+            return Response({'error': str(e) or 'Invalid page parameter'}, status=400)
+
+        return Response({
+            'users': [_user_row(user) for user in users_page],
+            'pagination': pagination,
+            'filters': {
+                'search': search,
+                'sort_by': sort_by,
+                'role': role,
+                'available_sort_options': list(USER_SORT_MAPPING.keys()) + ['relevance']
+            }
+        }, status=200)
+
+    except Exception as e:
+        return Response({'error': f'An error occurred: {str(e)}'}, status=500)
 
 
 @api_view(['PUT'])
@@ -91,7 +185,7 @@ def delete_user(request, user_id):
         # Update all related transactions
         for transaction in transactions:
             transaction.customer_email = f"{user.username} deleted"
-            transaction.save()
+            transaction.save(update_fields=['customer_email', 'updated_at'])
             
         user.delete()
         return Response({'message': 'User deleted successfully'}, status=200)
@@ -103,7 +197,7 @@ def delete_user(request, user_id):
 
 from django.db.models import Count
 from django.utils import timezone
-from datetime import timedelta
+from datetime import datetime, timedelta
 
 @api_view(['GET'])
 @authentication_classes([TokenAuthentication, SessionAuthentication])
@@ -113,92 +207,46 @@ def get_admin_statistics(request):
         return Response({'error': 'Access denied. Superuser privileges required.'}, status=403)
     
     try:
-        # Get current date and time
-        now = timezone.now()
-        
-        # Define periods: last 7 days and previous 7 days
-        start_of_this_period = now - timedelta(days=7)
-        start_of_previous_period = start_of_this_period - timedelta(days=7)
-        
-        # Get total active users count
-        total_active_users = CustomUser.objects.filter(is_active=True).count()
-        # Get total events
-        total_events = Event.objects.all().count()
-        # Get total transactions completed
-        total_completed_transactions = Transaction.objects.filter(status='successful').count()
-        # Get total transactions pending
-        total_pending_transactions = Transaction.objects.filter(status='pending').count()
-        
-        # Get new active users in this period (last 7 days)
-        new_users_this_week = CustomUser.objects.filter(
-            is_active=True,
-            date_joined__gte=start_of_this_period,
-            date_joined__lt=now
-        ).count()
-        # Get new active users in previous period (previous 7 days)
-        new_users_previous_week = CustomUser.objects.filter(
-            is_active=True,
-            date_joined__gte=start_of_previous_period,
-            date_joined__lt=start_of_this_period
-        ).count()
-        
-        # Get transactions in this period (last 7 days)
-        transactions_this_week = Transaction.objects.filter(
-            created_at__gte=start_of_this_period,
-            created_at__lt=now
-        ).count()
-        # Get transactions in previous period (previous 7 days)
-        transactions_previous_week = Transaction.objects.filter(
-            created_at__gte=start_of_previous_period,
-            created_at__lt=start_of_this_period
-        ).count()
-        
-        # Get events in this period (last 7 days)
-        events_this_week = Event.objects.filter(
-            created_at__gte=start_of_this_period,
-            created_at__lt=now
-        ).count()
-        # Get events in previous period (previous 7 days)
-        events_previous_week = Event.objects.filter(
-            created_at__gte=start_of_previous_period,
-            created_at__lt=start_of_this_period
-        ).count()
-        
-        # Calculate percentage increase for users
-        if new_users_previous_week > 0:
-            percentage_increase = ((new_users_this_week - new_users_previous_week) / 
-                                  new_users_previous_week) * 100
-        else:
-            percentage_increase = 100 if new_users_this_week > 0 else 0
-            
-        # Calculate percentage increase for transactions
-        if transactions_previous_week > 0:
-            percentage_increase_transactions = ((transactions_this_week - transactions_previous_week) / 
-                                               transactions_previous_week) * 100
-        else:
-            percentage_increase_transactions = 100 if transactions_this_week > 0 else 0
-            
-        # Calculate percentage increase for events
-        if events_previous_week > 0:
-            percentage_increase_events = ((events_this_week - events_previous_week) / 
-                                         events_previous_week) * 100
-        else:
-            percentage_increase_events = 100 if events_this_week > 0 else 0
+        # Counters come from a cached snapshot kept current by signal handlers
+        return Response(stats.get_admin_statistics(), status=200)
         
+    except Exception as e:
+        return Response({'error': f'An error occurred: {str(e)}'}, status=500)
+
+
+@api_view(['GET'])
+@authentication_classes([TokenAuthentication, SessionAuthentication])
+@permission_classes([IsAuthenticated])
+def get_analytics_timeseries(request):
+    if not request.user.is_superuser:
+        return Response({'error': 'Access denied. Superuser privileges required.'}, status=403)
+
+    interval = request.GET.get('interval', 'day')
+    if interval not in rollups.INTERVALS:
+        return Response({'error': f"interval must be one of {', '.join(rollups.INTERVALS)}"}, status=400)
+
+    try:
+        end = parse_date(request.GET['end']) if request.GET.get('end') else timezone.localdate()
+        start = parse_date(request.GET['start']) if request.GET.get('start') else end - timedelta(days=29)
+    except ValueError:
+        start = end = None
+    if start is None or end is None:
+        return Response({'error': 'start and end must be dates in YYYY-MM-DD format'}, status=400)
+    if start > end:
+        return Response({'error': 'start must not be after end'}, status=400)
+    if (end - start).days >= settings.ADMIN_TIMESERIES_MAX_DAYS:
+        return Response({'error': f'Range must not exceed {settings.ADMIN_TIMESERIES_MAX_DAYS} days'}, status=400)
+
+    try:
+        # Read only from the daily rollups kept by party_currency_admin.tasks.refresh_rollups_task
         return Response({
-            'total_active_users': total_active_users,
-            'new_active_users_this_week': new_users_this_week,
-            'new_active_users_previous_week': new_users_previous_week,
-            'percentage_increase': round(percentage_increase, 2),
-            'total_completed_transactions': total_completed_transactions,
-            'total_pending_transactions': total_pending_transactions,
-            'transactions_this_week': transactions_this_week,
-            'percentage_increase_transactions': round(percentage_increase_transactions, 2),
-            'total_events': total_events,
-            'events_this_week': events_this_week,
-            'percentage_increase_events': round(percentage_increase_events, 2)
+            'message': 'Analytics retrieved successfully',
+            'interval': interval,
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'series': rollups.get_timeseries(start, end, interval),
         }, status=200)
-        
+
     except Exception as e:
         return Response({'error': f'An error occurred: {str(e)}'}, status=500)
 
@@ -213,69 +261,31 @@ def get_events(request):
     
     try:
         # Get query parameters
-        page = request.GET.get('page', 1)
-        page_size = request.GET.get('page_size', 10)
         search = request.GET.get('search', '')
-        sort_by = request.GET.get('sort_by', 'newest')  # Default to newest first
+        # Default to the most relevant first when searching, newest first otherwise
+        sort_by = request.GET.get('sort_by', 'relevance' if search else 'newest')
         
-        # Convert to integers
         try:
-            page = int(page)
-            page_size = int(page_size)
+            page_size = parse_page_size(request)
         except ValueError:
             return Response({'error': 'Invalid page or page_size parameter'}, status=400)
         
-        # Limit page_size to prevent abuse
-        if page_size > 100:
-            page_size = 100
-        
-        # Define sort parameter mapping
-        sort_mapping = {
-            'newest': '-created_at',           # Newest events first
-            'oldest': 'created_at',            # Oldest events first
-            'name_asc': 'event_name',          # Event name A-Z
-            'name_desc': '-event_name',        # Event name Z-A
-            'date_early': 'start_date',        # Earliest start date first
-            'date_late': '-start_date',        # Latest start date first
-        }
-        
         # Start with all events
         events_queryset = Event.objects.all()  # Note: using Events (your model name)
         
         # Apply search filter if provided
-        if search:
-            events_queryset = events_queryset.filter(
-                Q(event_name__icontains=search) |
-                Q(event_description__icontains=search) |
-                Q(street_address__icontains=search) |
-                Q(city__icontains=search) |
-                Q(state__icontains=search) |
-                Q(event_author__icontains=search)|
-                Q(delivery_status__icontains=search)
-
-            )
+        events_queryset = apply_search(events_queryset, search, EVENT_SEARCH)
         
-        # Apply sorting
-        if sort_by in sort_mapping:
-            django_sort_field = sort_mapping[sort_by]
-            events_queryset = events_queryset.order_by(django_sort_field)
+        # Default to newest if invalid sort parameter, or if results are not ranked
+        if sort_by == 'relevance' and is_ranked(events_queryset):
+            ordering = f'-{RANK}'
         else:
-            # Default to newest if invalid sort parameter
-            events_queryset = events_queryset.order_by('-created_at')
-        
-        # Create paginator
-        paginator = Paginator(events_queryset, page_size)
-        total_pages = paginator.num_pages
-        total_count = paginator.count
+            ordering = EVENT_SORT_MAPPING.get(sort_by, '-created_at')
         
         try:
-            events_page = paginator.page(page)
-        except PageNotAnInteger:
-            events_page = paginator.page(1)
-            page = 1
-        except EmptyPage:
-            events_page = paginator.page(paginator.num_pages)
-            page = paginator.num_pages
+            events_page, pagination = paginate(request, events_queryset, ordering, page_size)
+        except ValueError as e:
+            return Response({'error': str(e) or 'Invalid page parameter'}, status=400)
         
         # Serialize the events
         serializer = EventSerializerFull(events_page, many=True)
@@ -283,20 +293,11 @@ def get_events(request):
         # Prepare response data
         response_data = {
             'events': serializer.data,
-            'pagination': {
-                'current_page': page,
-                'page_size': page_size,
-                'total_pages': total_pages,
-                'total_count': total_count,
-                'has_next': events_page.has_next(),
-                'has_previous': events_page.has_previous(),
-                'next_page': page + 1 if events_page.has_next() else None,
-                'previous_page': page - 1 if events_page.has_previous() else None,
-            },
+            'pagination': pagination,
             'filters': {
                 'search': search,
                 'sort_by': sort_by,
-                'available_sort_options': list(sort_mapping.keys())
+                'available_sort_options': list(EVENT_SORT_MAPPING.keys()) + ['relevance']
             }
         }
         
@@ -338,54 +339,32 @@ def get_pending_events(request):
     
     try:
         # Get query parameters
-        page = request.GET.get('page', 1)
-        page_size = request.GET.get('page_size', 10)  # Default to 10 events per page
         search = request.GET.get('search', '')
-        sort_by = request.GET.get('sort_by', '-created_at')  # Default sort by newest first
+        # Default to the most relevant first when searching, newest first otherwise
+        sort_by = request.GET.get('sort_by', 'relevance' if search else '-created_at')
         
-        # Convert to integers
         try:
-            page = int(page)
-            page_size = int(page_size)
+            page_size = parse_page_size(request)
         except ValueError:
             return Response({'error': 'Invalid page or page_size parameter'}, status=400)
         
-        # Limit page_size to prevent abuse
-        if page_size > 100:
-            page_size = 100
-        
         # Start with all events
         events_queryset = Event.objects.filter(delivery_status='pending')
 
         
         # Apply search filter if provided
-        if search:
-            events_queryset = events_queryset.filter(
-                Q(title__icontains=search) |
-                Q(description__icontains=search) |
-                Q(location__icontains=search)
-            )
+        events_queryset = apply_search(events_queryset, search, EVENT_SEARCH)
         
-        # Apply sorting
-        valid_sort_fields = ['created_at', '-created_at', 'title', '-title', 'date', '-date']
-        if sort_by in valid_sort_fields:
-            events_queryset = events_queryset.order_by(sort_by)
+        # Accepts the sort_by values of get_events as well as raw field names
+        if sort_by == 'relevance' and is_ranked(events_queryset):
+            ordering = f'-{RANK}'
         else:
-            events_queryset = events_queryset.order_by('-created_at')
-        
-        # Create paginator
-        paginator = Paginator(events_queryset, page_size)
-        total_pages = paginator.num_pages
-        total_count = paginator.count
+            ordering = EVENT_SORT_MAPPING.get(sort_by) or EVENT_SORT_FIELDS.get(sort_by, '-created_at')
         
         try:
-            events_page = paginator.page(page)
-        except PageNotAnInteger:
-            events_page = paginator.page(1)
-            page = 1
-        except EmptyPage:
-            events_page = paginator.page(paginator.num_pages)
-            page = paginator.num_pages
+            events_page, pagination = paginate(request, events_queryset, ordering, page_size)
+        except ValueError as e:
+            return Response({'error': str(e) or 'Invalid page parameter'}, status=400)
         
         # Serialize the events
         serializer = EventSerializerFull(events_page, many=True)
@@ -393,16 +372,7 @@ def get_pending_events(request):
         # Prepare response data
         response_data = {
             'events': serializer.data,
-            'pagination': {
-                'current_page': page,
-                'page_size': page_size,
-                'total_pages': total_pages,
-                'total_count': total_count,
-                'has_next': events_page.has_next(),
-                'has_previous': events_page.has_previous(),
-                'next_page': page + 1 if events_page.has_next() else None,
-                'previous_page': page - 1 if events_page.has_previous() else None,
-            },
+            'pagination': pagination,
             'filters': {
                 'search': search,
                 'sort_by': sort_by
@@ -436,19 +406,11 @@ def get_events_offset(request):
         # Start with all events
         events_queryset = Event.objects.all()
         # Apply search filter if provided
-        if search:
-            events_queryset = events_queryset.filter(
-                Q(title__icontains=search) |
-                Q(description__icontains=search) |
-                Q(location__icontains=search)
-            )
+        events_queryset = apply_search(events_queryset, search, EVENT_SEARCH)
         
         # Apply sorting
-        valid_sort_fields = ['created_at', '-created_at', 'title', '-title', 'date', '-date']
-        if sort_by in valid_sort_fields:
-            events_queryset = events_queryset.order_by(sort_by)
-        else:
-            events_queryset = events_queryset.order_by('-created_at')
+        ordering = EVENT_SORT_MAPPING.get(sort_by) or EVENT_SORT_FIELDS.get(sort_by, '-created_at')
+        events_queryset = events_queryset.order_by(ordering, '-pk' if ordering.startswith('-') else 'pk')
         
         # Get total count
         total_count = events_queryset.count()
@@ -564,24 +526,18 @@ def get_transactions(request):
     
     try:
         # Get query parameters
-        page = request.GET.get('page', 1)
-        page_size = request.GET.get('page_size', 10)
         search = request.GET.get('search', '')
-        sort_by = request.GET.get('sort_by', 'newest')
+        # Default to the most relevant first when searching, newest first otherwise
+        sort_by = request.GET.get('sort_by', 'relevance' if search else 'newest')
         status_filter = request.GET.get('status', 'successful')  # successful, failed, pending, all
         date_from = request.GET.get('date_from')  # YYYY-MM-DD format
         date_to = request.GET.get('date_to')      # YYYY-MM-DD format
         
-        # Convert to integers
         try:
-            page = int(page)
-            page_size = int(page_size)
+            page_size = parse_page_size(request)
         except ValueError:
             return Response({'error': 'Invalid page or page_size parameter'}, status=400)
         
-        if page_size > 100:
-            page_size = 100
-        
         # Sort mapping
         sort_mapping = {
             'newest': '-created_at',
@@ -614,31 +570,18 @@ def get_transactions(request):
                 return Response({'error': 'Invalid date_to format. Use YYYY-MM-DD'}, status=400)
         
         # Apply search filter
-        if search:
-            transactions_queryset = transactions_queryset.filter(
-                Q(customer_name__icontains=search) |
-                Q(customer_email__icontains=search) |
-                Q(transaction_reference__icontains=search) |
-                Q(payment_reference__icontains=search) |
-                Q(event_id__icontains=search)
-            )
+        transactions_queryset = apply_search(transactions_queryset, search, TRANSACTION_SEARCH)
         
-        # Apply sorting
-        if sort_by in sort_mapping:
-            transactions_queryset = transactions_queryset.order_by(sort_mapping[sort_by])
+        # Default to newest if invalid sort parameter, or if results are not ranked
+        if sort_by == 'relevance' and is_ranked(transactions_queryset):
+            ordering = f'-{RANK}'
         else:
-            transactions_queryset = transactions_queryset.order_by('-created_at')
-        
-        # Pagination
-        paginator = Paginator(transactions_queryset, page_size)
-        total_pages = paginator.num_pages
-        total_count = paginator.count
+            ordering = sort_mapping.get(sort_by, '-created_at')
         
         try:
-            transactions_page = paginator.page(page)
-        except (PageNotAnInteger, EmptyPage):
-            transactions_page = paginator.page(1)
-            page = 1
+            transactions_page, pagination = paginate(request, transactions_queryset, ordering, page_size)
+        except ValueError as e:
+            return Response({'error': str(e) or 'Invalid page parameter'}, status=400)
         
         # Serialize
         serializer = TransactionSerializer(transactions_page, many=True)
@@ -647,14 +590,7 @@ def get_transactions(request):
         response_data = {
             'message': f'{status_filter.title()} transactions retrieved successfully',
             'transactions': serializer.data,
-            'pagination': {
-                'current_page': page,
-                'page_size': page_size,
-                'total_pages': total_pages,
-                'total_count': total_count,
-                'has_next': transactions_page.has_next(),
-                'has_previous': transactions_page.has_previous(),
-            },
+            'pagination': pagination,
             'filters': {
                 'search': search,
                 'sort_by': sort_by,
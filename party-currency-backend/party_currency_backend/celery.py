@@ -20,4 +20,32 @@ app.conf.beat_schedule = {
         'task': 'merchant.tasks.check_and_delete_reserved_accounts_task',
         'schedule': crontab(hour=0, minute=0),  # Run daily at midnight
     },
-} 
\ No newline at end of file
+    'retry-failed-reserved-account-deletions': {
+        'task': 'merchant.tasks.retry_failed_reserved_account_deletions_task',
+        'schedule': crontab(minute=30),  # Run hourly
+    },
+    'reconcile-pending-transactions': {
+        'task': 'payment.tasks.reconcile_pending_transactions_task',
+        'schedule': crontab(minute='*/10'),  # Run every 10 minutes
+    },
+    'process-pending-webhook-events': {
+        'task': 'payment.tasks.process_pending_webhook_events_task',
+        'schedule': crontab(minute='*'),  # Run every minute
+    },
+    'sync-reserved-account-transactions': {
+        'task': 'merchant.tasks.sync_reserved_account_transactions_task',
+        'schedule': crontab(minute='*/15'),  # Run every 15 minutes
+    },
+    'requeue-stalled-currency-images': {
+        'task': 'currencies.tasks.requeue_stalled_currency_images_task',
+        'schedule': crontab(minute='*/10'),  # Run every 10 minutes
+    },
+    'collect-drive-garbage': {
+        'task': 'google_drive.tasks.collect_drive_garbage_task',
+        'schedule': crontab(hour=3, minute=30),  # Run daily at 03:30
+    },
+    'refresh-admin-rollups': {
+        'task': 'party_currency_admin.tasks.refresh_rollups_task',
+        'schedule': crontab(minute='*/15'),  # Run every 15 minutes
+    },
+}
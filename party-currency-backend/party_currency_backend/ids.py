@@ -0,0 +1,95 @@
+"""
+Shared ID service for events, currencies and payment references.
+
+IDs are a prefix followed by 14 base62 characters:
+
+    <prefix><timestamp:7><node:4><sequence:3>
+
+The timestamp is milliseconds since EPOCH_MS, so IDs sort by creation time.
+The node is drawn at random per process (and redrawn after a fork), and the
+sequence counts IDs issued by that process within the same millisecond. No
+database lookup is needed to guarantee uniqueness.
+
+An event ID (EVT + 14) stays within the 20 characters Monnify and
+CustomUser.virtual_account_reference allow for an account reference.
+"""
+import os
+import secrets
+import threading
+import time
+
+EVENT_ID_PREFIX = 'EVT'
+CURRENCY_ID_PREFIX = 'CUR'
+PAYMENT_REFERENCE_PREFIX = 'party'
+
+# Digits sort before letters in ASCII, so fixed-width base62 sorts numerically
+ALPHABET = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz'
+BASE = len(ALPHABET)
+TIMESTAMP_LENGTH = 7
+NODE_LENGTH = 4
+SEQUENCE_LENGTH = 3
+MAX_SEQUENCE = BASE ** SEQUENCE_LENGTH
+# 2024-01-01T00:00:00Z; 7 base62 digits of milliseconds last about 110 years from here
+EPOCH_MS = 1704067200000
+
+
+def _encode(value, length):
+    chars = []
+    for _ in range(length):
+        value, remainder = divmod(value, BASE)
+        chars.append(ALPHABET[remainder])
+    return ''.join(reversed(chars))
+
+
+class IdGenerator:
+    """Thread-safe generator of k-sortable IDs"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reseed()
+
+    def _reseed(self):
+        self._node = _encode(secrets.randbelow(BASE ** NODE_LENGTH), NODE_LENGTH)
+        self._last_ms = 0
+        self._sequence = 0
+
+    def new_id(self, prefix=''):
+        with self._lock:
+            now_ms = max(int(time.time() * 1000) - EPOCH_MS, self._last_ms)
+            if now_ms == self._last_ms:
+                self._sequence += 1
+                if self._sequence >= MAX_SEQUENCE:
+                    # Sequence exhausted for this millisecond, borrow the next one
+                    now_ms += 1
+                    self._sequence = 0
+            else:
+                self._sequence = 0
+            self._last_ms = now_ms
+            return (
+                f"{prefix}{_encode(now_ms, TIMESTAMP_LENGTH)}"
+                f"{self._node}{_encode(self._sequence, SEQUENCE_LENGTH)}"
+            )
+
+
+_generator = IdGenerator()
+
+if hasattr(os, 'register_at_fork'):
+    # Forked workers must not share the parent's node and sequence
+    os.register_at_fork(after_in_child=_generator._reseed)
+
+
+def generate_id(prefix=''):
+    """Return a new unique, time-ordered ID starting with prefix"""
+    return _generator.new_id(prefix)
+
+
+def generate_event_id():
+    return generate_id(EVENT_ID_PREFIX)
+
+
+def generate_currency_id():
+    return generate_id(CURRENCY_ID_PREFIX)
+
+
+def generate_payment_reference():
+    return generate_id(PAYMENT_REFERENCE_PREFIX)
@@ -96,6 +96,97 @@ DATABASES = {
     )
 }
 
+# Cache configuration
+# Shared state such as the Monnify access token lives here, so production should
+# point REDIS_URL at Redis to share it between gunicorn workers. Without it every
+# process falls back to its own in-memory cache.
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Monnify payment provider, read once at startup by payment.monnify.MonnifyClient
+MONNIFY_BASE_URL = os.getenv('MONNIFY_BASE_URL')
+MONNIFY_CONTRACT_CODE = os.getenv('MONNIFY_CONTRACT_CODE')
+
+# Seconds before the admin dashboard counters are recounted from the database,
+# see party_currency_admin.stats; in between they are updated from signals
+ADMIN_STATS_CACHE_SECONDS = int(os.getenv('ADMIN_STATS_CACHE_SECONDS', 300))
+
+# How far before the last watermark the daily rollup refresh rescans, to catch
+# rows committed late, see party_currency_admin.rollups
+ROLLUP_WATERMARK_OVERLAP_SECONDS = int(os.getenv('ROLLUP_WATERMARK_OVERLAP_SECONDS', 300))
+
+# Longest range, in days, the admin time-series endpoint returns
+ADMIN_TIMESERIES_MAX_DAYS = int(os.getenv('ADMIN_TIMESERIES_MAX_DAYS', 731))
+
+# On-disk cache of files downloaded from Google Drive, see google_drive.cache
+DRIVE_CACHE_DIR = os.getenv('DRIVE_CACHE_DIR', os.path.join(BASE_DIR, 'drive_cache'))
+DRIVE_CACHE_MAX_BYTES = int(os.getenv('DRIVE_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+# Bytes fetched from Drive (and written to the client) per chunk when streaming
+DRIVE_DOWNLOAD_CHUNK_SIZE = int(os.getenv('DRIVE_DOWNLOAD_CHUNK_SIZE', 1024 * 1024))
+# Drive API calls per second allowed to each process and the burst above that,
+# see google_drive.quota. Keep rate x processes under the project's per-user quota.
+DRIVE_API_RATE_PER_SECOND = float(os.getenv('DRIVE_API_RATE_PER_SECOND', 10))
+DRIVE_API_BURST = int(os.getenv('DRIVE_API_BURST', 20))
+DRIVE_API_MAX_ATTEMPTS = int(os.getenv('DRIVE_API_MAX_ATTEMPTS', 5))
+# Orphaned Drive files and local upload leftovers, see google_drive.cleanup.
+# The scheduled job only reports until DRIVE_GC_DRY_RUN is set to False.
+DRIVE_GC_DRY_RUN = os.getenv('DRIVE_GC_DRY_RUN', 'True') == 'True'
+DRIVE_GC_MIN_AGE_HOURS = int(os.getenv('DRIVE_GC_MIN_AGE_HOURS', 24))
+# Processes used to resize images into thumbnails, see google_drive.derivatives
+IMAGE_VARIANT_WORKERS = int(os.getenv('IMAGE_VARIANT_WORKERS', 2))
+
+# Where each kind of uploaded asset is stored, see media_storage. BACKEND is
+# 'drive', 'local', 's3' or the dotted path of a StorageBackend subclass;
+# FOLDER_ID is used by Drive and PREFIX by the local and S3 backends. Every
+# backend renders thumbnails of new images unless VARIANTS is set to False.
+MEDIA_STORAGE = {
+    'currency_images': {
+        'BACKEND': os.getenv('CURRENCY_IMAGE_STORAGE', 'drive'),
+        'FOLDER_ID': os.getenv('GOOGLE_DRIVE_FOLDER_ID'),
+        'PREFIX': 'currencies',
+    },
+    'profile_pictures': {
+        'BACKEND': os.getenv('PROFILE_PICTURE_STORAGE', 'drive'),
+        'FOLDER_ID': os.getenv('PROFILE_PICTURE_FOLDER_ID', '1xg-UFjBtNMUeX3RbLsyOsBsmDOJzj2Sk'),
+        'PREFIX': 'profile_pictures',
+    },
+}
+MEDIA_STORAGE_LOCAL_DIR = os.getenv('MEDIA_STORAGE_LOCAL_DIR', os.path.join(BASE_DIR, 'media_storage_files'))
+# S3 or an S3-compatible stand-in such as MinIO (set MEDIA_S3_ENDPOINT_URL).
+# The 's3' backend needs the optional boto3 from requirements.txt.
+MEDIA_S3_BUCKET = os.getenv('MEDIA_S3_BUCKET')
+MEDIA_S3_ENDPOINT_URL = os.getenv('MEDIA_S3_ENDPOINT_URL')
+MEDIA_S3_REGION = os.getenv('MEDIA_S3_REGION')
+MEDIA_S3_ACCESS_KEY_ID = os.getenv('MEDIA_S3_ACCESS_KEY_ID')
+MEDIA_S3_SECRET_ACCESS_KEY = os.getenv('MEDIA_S3_SECRET_ACCESS_KEY')
+
+# Django file storages. 'currency_staging' holds uploaded currency images until
+# a Celery worker moves them to MEDIA_STORAGE, so web and worker processes must
+# both reach it: on separate hosts or containers point CURRENCY_STAGING_STORAGE
+# at a shared bucket (e.g. 'storages.backends.s3.S3Storage', which needs the
+# optional django-storages and boto3 from requirements.txt), or mount a shared
+# volume and set CURRENCY_STAGING_SHARED_FILESYSTEM=True. `check --deploy`
+# fails while it is a local directory not declared shared.
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage'},
+    'currency_staging': {
+        'BACKEND': os.getenv('CURRENCY_STAGING_STORAGE', 'django.core.files.storage.FileSystemStorage'),
+    },
+}
+CURRENCY_STAGING_SHARED_FILESYSTEM = os.getenv('CURRENCY_STAGING_SHARED_FILESYSTEM', 'False') == 'True'
+
 # Email settings
 EMAIL_BACKEND = os.getenv('EMAIL_BACKEND')
 # EMAIL_HOST = 'smtp.gmail.com'
@@ -107,7 +198,6 @@ EMAIL_BACKEND = os.getenv('EMAIL_BACKEND')
 # Static files configuration for production
 STATIC_URL = '/static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
 
 # Google OAuth2 settings
@@ -138,6 +228,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'corsheaders',
     'authentication',
     'testapp',
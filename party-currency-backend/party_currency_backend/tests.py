@@ -0,0 +1,89 @@
+import os
+import re
+from unittest import mock, skipUnless
+
+from django.test import SimpleTestCase
+
+from . import ids
+from .ids import (
+    ALPHABET,
+    EPOCH_MS,
+    MAX_SEQUENCE,
+    IdGenerator,
+    generate_currency_id,
+    generate_event_id,
+    generate_id,
+    generate_payment_reference,
+)
+
+ID_PATTERN = re.compile(f"^[{ALPHABET}]{{14}}$")
+
+
+class IdGeneratorTests(SimpleTestCase):
+    def test_format(self):
+        for generate, prefix in (
+            (generate_event_id, 'EVT'),
+            (generate_currency_id, 'CUR'),
+            (generate_payment_reference, 'party'),
+        ):
+            with self.subTest(prefix=prefix):
+                new_id = generate()
+                self.assertTrue(new_id.startswith(prefix))
+                self.assertRegex(new_id[len(prefix):], ID_PATTERN)
+        # Event IDs double as Monnify account references
+        self.assertLessEqual(len(generate_event_id()), 20)
+
+    def test_ids_sort_in_creation_order(self):
+        issued = [generate_id() for _ in range(2000)]
+        self.assertEqual(sorted(issued), issued)
+        self.assertEqual(len(set(issued)), len(issued))
+
+    def test_sequence_orders_ids_within_a_millisecond(self):
+        generator = IdGenerator()
+        with mock.patch('party_currency_backend.ids.time.time', return_value=(EPOCH_MS + 1000) / 1000):
+            issued = [generator.new_id()]
+            # Skip ahead to just before the sequence runs out
+            generator._sequence = MAX_SEQUENCE - 3
+            issued += [generator.new_id() for _ in range(5)]
+        self.assertEqual(sorted(issued), issued)
+        self.assertEqual(len(set(issued)), len(issued))
+        # The exhausted sequence borrowed the next millisecond
+        self.assertNotEqual(issued[0][:7], issued[-1][:7])
+
+    def test_clock_going_back_keeps_order(self):
+        generator = IdGenerator()
+        with mock.patch('party_currency_backend.ids.time.time', return_value=(EPOCH_MS + 5000) / 1000):
+            first = generator.new_id()
+        with mock.patch('party_currency_backend.ids.time.time', return_value=(EPOCH_MS + 1000) / 1000):
+            second = generator.new_id()
+        self.assertLess(first, second)
+
+    @skipUnless(hasattr(os, 'fork'), "needs os.fork")
+    def test_forked_child_gets_a_new_node(self):
+        parent_node = generate_id()[7:11]
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            try:
+                os.close(read_fd)
+                os.write(write_fd, generate_id().encode())
+            finally:
+                os._exit(0)
+        os.close(write_fd)
+        with os.fdopen(read_fd) as f:
+            child_id = f.read()
+        os.waitpid(pid, 0)
+
+        self.assertRegex(child_id, ID_PATTERN)
+        # A clash has a 1 in 62**4 chance; the parent's node must not be inherited as is
+        self.assertNotEqual(child_id[7:11], parent_node)
+        self.assertEqual(generate_id()[7:11], parent_node)
+
+    def test_reseed_draws_a_new_node(self):
+        generator = IdGenerator()
+        with mock.patch.object(ids.secrets, 'randbelow', side_effect=[1, 2]):
+            generator._reseed()
+            first = generator.new_id()[7:11]
+            generator._reseed()
+            second = generator.new_id()[7:11]
+        self.assertEqual((first, second), ('0001', '0002'))
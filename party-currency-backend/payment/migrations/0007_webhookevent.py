@@ -0,0 +1,31 @@
+# Generated by Django 5.1.7 on 2026-10-18 10:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payment', '0006_transaction_breakdown'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WebhookEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_type', models.CharField(max_length=100)),
+                ('reference', models.CharField(blank=True, max_length=255)),
+                ('payload', models.TextField()),
+                ('status', models.CharField(default='received', max_length=20)),
+                ('attempts', models.IntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'received_at'], name='payment_web_status_0c0265_idx')],
+                'constraints': [models.UniqueConstraint(fields=('event_type', 'reference'), name='unique_webhook_event')],
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.7 on 2026-10-18 10:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payment', '0008_transaction_payment_tra_created_0d0f1d_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['amount', 'id'], name='payment_tra_amount_8e4c28_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['customer_name', 'id'], name='payment_tra_custome_abbea4_idx'),
+        ),
+    ]
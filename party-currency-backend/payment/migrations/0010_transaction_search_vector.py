@@ -0,0 +1,67 @@
+# Generated by Django 5.1.7 on 2026-10-18 10:51
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+# The search vector and trigram indexes behind party_currency_admin.search.
+# Only PostgreSQL has them; on other databases the admin search falls back to icontains.
+FORWARD_SQL = [
+    """
+    CREATE OR REPLACE FUNCTION payment_transaction_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('simple', coalesce(NEW.customer_name, '') || ' ' || coalesce(NEW.customer_email, '')), 'A') ||
+            setweight(to_tsvector('simple', coalesce(NEW.payment_reference, '') || ' ' || coalesce(NEW.transaction_reference, '') || ' ' || coalesce(NEW.event_id, '')), 'B');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER payment_transaction_search_vector_trigger
+    BEFORE INSERT OR UPDATE ON payment_transaction
+    FOR EACH ROW EXECUTE FUNCTION payment_transaction_search_vector_update()
+    """,
+    # Fires the trigger for existing rows
+    "UPDATE payment_transaction SET customer_name = customer_name",
+    "CREATE INDEX payment_transaction_search_vector_idx ON payment_transaction USING gin (search_vector)",
+    "CREATE INDEX payment_transaction_customer_name_trgm_idx ON payment_transaction USING gin (customer_name gin_trgm_ops)",
+    "CREATE INDEX payment_transaction_customer_email_trgm_idx ON payment_transaction USING gin (customer_email gin_trgm_ops)",
+    "CREATE INDEX payment_transaction_payment_reference_trgm_idx ON payment_transaction USING gin (payment_reference gin_trgm_ops)",
+    "CREATE INDEX payment_transaction_transaction_reference_trgm_idx ON payment_transaction USING gin (transaction_reference gin_trgm_ops)",
+]
+REVERSE_SQL = [
+    "DROP INDEX IF EXISTS payment_transaction_transaction_reference_trgm_idx",
+    "DROP INDEX IF EXISTS payment_transaction_payment_reference_trgm_idx",
+    "DROP INDEX IF EXISTS payment_transaction_customer_email_trgm_idx",
+    "DROP INDEX IF EXISTS payment_transaction_customer_name_trgm_idx",
+    "DROP INDEX IF EXISTS payment_transaction_search_vector_idx",
+    "DROP TRIGGER IF EXISTS payment_transaction_search_vector_trigger ON payment_transaction",
+    "DROP FUNCTION IF EXISTS payment_transaction_search_vector_update()",
+]
+
+
+def _run_on_postgresql(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payment', '0009_transaction_payment_tra_amount_8e4c28_idx_and_more'),
+        # Installs pg_trgm
+        ('events', '0009_events_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(_run_on_postgresql(FORWARD_SQL), _run_on_postgresql(REVERSE_SQL)),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.7 on 2026-10-18 10:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payment', '0010_transaction_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['customer_email', 'status'], name='payment_tra_custome_31fad6_idx'),
+        ),
+    ]
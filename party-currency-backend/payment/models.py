@@ -1,7 +1,13 @@
 # models.py
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 
 class Transaction(models.Model):
+    STATUS_PENDING = 'pending'
+    STATUS_SUCCESSFUL = 'successful'
+    STATUS_FAILED = 'failed'
+    STATUS_EXPIRED = 'expired'
+
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     customer_name = models.CharField(max_length=255, blank=True)
     customer_email = models.EmailField()
@@ -17,4 +23,46 @@ class Transaction(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     redirect_url = models.URLField(blank=True)
-    breakdown = models.CharField(max_length=555, default="")
\ No newline at end of file
+    breakdown = models.CharField(max_length=555, default="")
+    # Filled by a database trigger on PostgreSQL, see party_currency_admin.search
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # Scanned by the admin analytics rollups, see party_currency_admin.rollups
+            models.Index(fields=['created_at']),
+            models.Index(fields=['updated_at']),
+            # Keyset pagination of the admin listings, see party_currency_admin.pagination
+            models.Index(fields=['amount', 'id']),
+            models.Index(fields=['customer_name', 'id']),
+            # Per-user spend in the admin user listing
+            models.Index(fields=['customer_email', 'status']),
+        ]
+
+
+class WebhookEvent(models.Model):
+    """Raw Monnify webhook notification, stored before it is applied"""
+    STATUS_RECEIVED = 'received'
+    STATUS_PROCESSED = 'processed'
+    STATUS_FAILED = 'failed'
+
+    event_type = models.CharField(max_length=100)
+    reference = models.CharField(max_length=255, blank=True)
+    payload = models.TextField()
+    status = models.CharField(max_length=20, default=STATUS_RECEIVED)
+    attempts = models.IntegerField(default=0)
+    error = models.TextField(blank=True)
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            # Monnify redelivers notifications until acknowledged
+            models.UniqueConstraint(fields=['event_type', 'reference'], name='unique_webhook_event'),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'received_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.event_type} - {self.reference}"
@@ -0,0 +1,348 @@
+# monnify.py
+import logging
+import math
+import os
+import random
+import threading
+import time
+import uuid
+from email.utils import parsedate_to_datetime
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from requests.adapters import HTTPAdapter
+from rest_framework import status
+from rest_framework.response import Response
+
+from .utils import MonnifyAuth, MonnifyTokenManager, release_lock
+
+logger = logging.getLogger(__name__)
+
+
+class MonnifyUnavailable(requests.exceptions.RequestException):
+    """Raised without calling Monnify while its circuit is open or the bulkhead is full"""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker whose state lives in the shared cache, so every worker
+    stops calling Monnify once enough calls have failed. After OPEN_SECONDS a
+    single probe call is let through; its outcome closes or reopens the circuit.
+
+    A 429 is not a failure: Monnify is up but wants fewer calls, so every
+    worker holds off until its Retry-After has passed instead.
+    """
+    FAILURE_THRESHOLD = 5
+    FAILURE_WINDOW_SECONDS = 30
+    OPEN_SECONDS = 30
+    PROBE_TIMEOUT_SECONDS = 60
+
+    def __init__(self, name):
+        self.failures_key = f"circuit_{name}_failures"
+        self.open_key = f"circuit_{name}_open_until"
+        self.probe_key = f"circuit_{name}_probe"
+        self.throttled_key = f"circuit_{name}_throttled_until"
+
+    def before_call(self):
+        """
+        Return True when this call is the half-open probe.
+
+        Raises:
+            MonnifyUnavailable: While the circuit is open, another probe is
+                running or Monnify's rate limit window has not passed
+        """
+        throttled_until = cache.get(self.throttled_key)
+        if throttled_until is not None and throttled_until > time.time():
+            raise MonnifyUnavailable(
+                "Payment provider is rate limiting requests",
+                retry_after=math.ceil(throttled_until - time.time())
+            )
+        open_until = cache.get(self.open_key)
+        if open_until is None:
+            return False
+        remaining = open_until - time.time()
+        if remaining > 0:
+            raise MonnifyUnavailable("Payment provider circuit is open", retry_after=math.ceil(remaining))
+        if not cache.add(self.probe_key, True, timeout=self.PROBE_TIMEOUT_SECONDS):
+            raise MonnifyUnavailable("Payment provider circuit is half-open", retry_after=self.OPEN_SECONDS)
+        return True
+
+    def record_success(self, probe):
+        if probe:
+            cache.delete_many([self.open_key, self.failures_key, self.probe_key])
+            logger.info("Monnify circuit closed")
+
+    def record_failure(self, probe):
+        if probe:
+            self._open()
+            cache.delete(self.probe_key)
+            return
+        cache.add(self.failures_key, 0, timeout=self.FAILURE_WINDOW_SECONDS)
+        try:
+            failures = cache.incr(self.failures_key)
+        except ValueError:
+            # The window expired between add and incr
+            cache.set(self.failures_key, 1, timeout=self.FAILURE_WINDOW_SECONDS)
+            failures = 1
+        if failures >= self.FAILURE_THRESHOLD:
+            self._open()
+
+    def record_throttled(self, probe, retry_after):
+        """Back every worker off for retry_after seconds without counting a failure"""
+        cache.set(self.throttled_key, time.time() + retry_after, timeout=math.ceil(retry_after) + 1)
+        if probe:
+            # Still half-open; the first call after the wait becomes the probe
+            cache.delete(self.probe_key)
+
+    def _open(self):
+        # Keep the marker past OPEN_SECONDS so the next caller becomes the probe
+        cache.set(self.open_key, time.time() + self.OPEN_SECONDS, timeout=self.OPEN_SECONDS * 10)
+        cache.delete(self.failures_key)
+        logger.warning(f"Monnify circuit opened for {self.OPEN_SECONDS}s")
+
+
+class Bulkhead:
+    """
+    Caps how many workers can be inside Monnify calls at once. Each call holds
+    one of SLOTS cache keys; a slot left behind by a crashed worker frees
+    itself after SLOT_TIMEOUT_SECONDS.
+    """
+    SLOTS = 10
+    SLOT_TIMEOUT_SECONDS = 60
+
+    def __init__(self, name):
+        self.key_prefix = f"bulkhead_{name}_slot_"
+
+    def acquire(self):
+        """
+        Take a free slot and return it as (key, token) for release().
+
+        Raises:
+            MonnifyUnavailable: If every slot is taken
+        """
+        token = uuid.uuid4().hex
+        for slot in random.sample(range(self.SLOTS), self.SLOTS):
+            key = f"{self.key_prefix}{slot}"
+            if cache.add(key, token, timeout=self.SLOT_TIMEOUT_SECONDS):
+                return key, token
+        raise MonnifyUnavailable("Too many concurrent payment provider calls", retry_after=1)
+
+    def release(self, slot):
+        # A slot that timed out may already belong to another call
+        release_lock(*slot)
+
+
+def provider_unavailable_response(exc):
+    """503 response telling the client when to retry a call refused by the breaker or bulkhead"""
+    response = Response({
+        "error": "Payment provider temporarily unavailable",
+        "detail": str(exc)
+    }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    response['Retry-After'] = str(exc.retry_after)
+    return response
+
+
+class MonnifyClient:
+    """
+    Monnify API client backed by one pooled keep-alive session, so calls reuse
+    TCP/TLS connections instead of opening a new one per request.
+    """
+    # (connect, read) timeouts in seconds per endpoint
+    TIMEOUTS = {
+        'login': (3.05, 10),
+        'init_transaction': (3.05, 20),
+        'query_transaction': (3.05, 15),
+        'create_reserved_account': (3.05, 30),
+        'delete_reserved_account': (3.05, 20),
+        'reserved_account_transactions': (3.05, 20),
+    }
+    DEFAULT_TIMEOUT = (3.05, 30)
+    MAX_RETRIES = 3
+    BACKOFF_BASE_SECONDS = 0.25
+    BACKOFF_MAX_SECONDS = 4
+    RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+    # How long everyone waits after a 429 that carries no Retry-After
+    THROTTLE_SECONDS = 1
+    POOL_MAXSIZE = 20
+
+    def __init__(self, base_url=None, contract_code=None):
+        self.base_url = (base_url or settings.MONNIFY_BASE_URL or '').rstrip('/')
+        self.contract_code = contract_code or settings.MONNIFY_CONTRACT_CODE
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.POOL_MAXSIZE, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({
+            'Content-Type': 'application/json',
+            'Accept': 'application/json',
+        })
+        self.circuit_breaker = CircuitBreaker('monnify')
+        self.bulkhead = Bulkhead('monnify')
+
+    # Endpoints
+
+    def login(self):
+        return self._request(
+            'POST', '/api/v1/auth/login', 'login',
+            idempotent=True, authenticated=False,
+            headers={'Authorization': MonnifyAuth.generate_basic_auth()},
+            json={}
+        )
+
+    def init_transaction(self, payload):
+        return self._request(
+            'POST', '/api/v1/merchant/transactions/init-transaction', 'init_transaction',
+            json=payload
+        )
+
+    def query_transaction(self, payment_reference):
+        return self._request(
+            'GET', '/api/v2/merchant/transactions/query', 'query_transaction',
+            idempotent=True,
+            params={'paymentReference': payment_reference}
+        )
+
+    def create_reserved_account(self, payload):
+        return self._request(
+            'POST', '/api/v2/bank-transfer/reserved-accounts', 'create_reserved_account',
+            json=payload
+        )
+
+    def delete_reserved_account(self, account_reference):
+        return self._request(
+            'DELETE', f'/api/v1/bank-transfer/reserved-accounts/reference/{account_reference}',
+            'delete_reserved_account',
+            idempotent=True
+        )
+
+    def get_reserved_account_transactions(self, account_reference, page=0, size=100):
+        return self._request(
+            'GET', '/api/v1/bank-transfer/reserved-accounts/transactions',
+            'reserved_account_transactions',
+            idempotent=True,
+            params={'accountReference': account_reference, 'page': page, 'size': size}
+        )
+
+    # Transport
+
+    def _request(self, method, path, endpoint, idempotent=False, authenticated=True, headers=None, **kwargs):
+        """
+        Send a request through the pooled session.
+
+        Idempotent calls are retried on connection errors and retryable status
+        codes with full-jitter exponential backoff. Any call rejected with a 401
+        is retried once with a freshly issued token. Every attempt goes through
+        the circuit breaker and bulkhead.
+
+        Raises:
+            MonnifyUnavailable: If the circuit is open or the bulkhead is full
+        """
+        if not self.base_url:
+            raise requests.exceptions.InvalidURL("MONNIFY_BASE_URL not configured")
+
+        url = f"{self.base_url}{path}"
+        timeout = self.TIMEOUTS.get(endpoint, self.DEFAULT_TIMEOUT)
+        attempt = 0
+        token_refreshed = False
+
+        while True:
+            request_headers = dict(headers or {})
+            if authenticated:
+                request_headers['Authorization'] = f"Bearer {MonnifyTokenManager.get_token()['token']}"
+
+            try:
+                response = self._guarded_send(method, url, headers=request_headers, timeout=timeout, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if not idempotent or attempt >= self.MAX_RETRIES:
+                    raise
+                attempt += 1
+                logger.warning(f"Monnify {endpoint} failed ({str(e)}), retry {attempt}/{self.MAX_RETRIES}")
+                time.sleep(self._backoff(attempt))
+                continue
+
+            if response.status_code == 401 and authenticated and not token_refreshed:
+                logger.info(f"Monnify rejected the access token on {endpoint}, refreshing")
+                MonnifyTokenManager.invalidate()
+                token_refreshed = True
+                continue
+
+            if response.status_code in self.RETRY_STATUS_CODES and idempotent and attempt < self.MAX_RETRIES:
+                retry_after = self._retry_after(response)
+                if retry_after is not None and retry_after > self.BACKOFF_MAX_SECONDS:
+                    # Too long to hold the worker; the caller gets the response as is
+                    return response
+                attempt += 1
+                logger.warning(f"Monnify {endpoint} returned {response.status_code}, retry {attempt}/{self.MAX_RETRIES}")
+                time.sleep(retry_after if retry_after is not None else self._backoff(attempt))
+                continue
+
+            return response
+
+    def _guarded_send(self, method, url, **kwargs):
+        probe = self.circuit_breaker.before_call()
+        try:
+            slot = self.bulkhead.acquire()
+        except MonnifyUnavailable:
+            if probe:
+                cache.delete(self.circuit_breaker.probe_key)
+            raise
+
+        try:
+            response = self.session.request(method, url, **kwargs)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            self.circuit_breaker.record_failure(probe)
+            raise
+        finally:
+            self.bulkhead.release(slot)
+
+        if response.status_code == 429:
+            self.circuit_breaker.record_throttled(probe, self._retry_after(response))
+        elif response.status_code in self.RETRY_STATUS_CODES:
+            self.circuit_breaker.record_failure(probe)
+        else:
+            self.circuit_breaker.record_success(probe)
+        return response
+
+    def _retry_after(self, response):
+        """
+        Seconds the response asks us to wait, from a delay or HTTP-date
+        Retry-After. A 429 without one waits THROTTLE_SECONDS.
+        """
+        value = response.headers.get('Retry-After')
+        if value:
+            try:
+                return max(float(value), 0)
+            except ValueError:
+                try:
+                    return max(parsedate_to_datetime(value).timestamp() - time.time(), 0)
+                except (TypeError, ValueError):
+                    pass
+        return self.THROTTLE_SECONDS if response.status_code == 429 else None
+
+    def _backoff(self, attempt):
+        return random.uniform(0, min(self.BACKOFF_MAX_SECONDS, self.BACKOFF_BASE_SECONDS * (2 ** attempt)))
+
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+
+def get_monnify_client():
+    """
+    Return the process-wide Monnify client. A new one is built after a fork so
+    worker processes never share pooled sockets with their parent.
+    """
+    global _client, _client_pid
+    pid = os.getpid()
+    if _client is None or _client_pid != pid:
+        with _client_lock:
+            if _client is None or _client_pid != pid:
+                _client = MonnifyClient()
+                _client_pid = pid
+    return _client
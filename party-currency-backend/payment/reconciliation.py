@@ -0,0 +1,205 @@
+# reconciliation.py
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import transaction as db_transaction
+from django.utils import timezone
+
+from .models import Transaction
+from .monnify import get_monnify_client
+from .services import settle_transaction
+from .signals import transaction_status_changed
+from .utils import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 200
+MAX_WORKERS = 8
+REQUESTS_PER_SECOND = 10
+# Leave fresh checkouts to the callback and webhook
+PENDING_GRACE_PERIOD = timedelta(minutes=15)
+# Checkouts Monnify still reports as pending after this are given up on
+PENDING_EXPIRY = timedelta(days=2)
+STATS_CACHE_KEY = "payment_reconciliation_stats"
+
+PAID_STATUSES = ('PAID', 'OVERPAID')
+FAILED_STATUSES = ('FAILED', 'CANCELLED', 'USER_CANCELLED', 'REVERSED')
+EXPIRED_STATUSES = ('EXPIRED', 'ABANDONED')
+PENDING_STATUS = 'PENDING'
+# Monnify answers these, with requestSuccessful false, for references it never saw
+NOT_FOUND_STATUS_CODES = (400, 404)
+# Returned by _query_payment_status when Monnify could not be asked
+LOOKUP_FAILED = object()
+
+
+def _query_payment_status(client, limiter, payment_reference):
+    """
+    Return Monnify's paymentStatus, None when Monnify does not know the
+    payment, or LOOKUP_FAILED when it could not be asked (network error, open
+    circuit, full bulkhead, server error) and the row should be retried later.
+    """
+    if limiter is not None:
+        limiter.acquire()
+    try:
+        response = client.query_transaction(payment_reference)
+        data = response.json()
+    except Exception as e:
+        logger.warning(f"Could not query Monnify for {payment_reference}: {str(e)}")
+        return LOOKUP_FAILED
+    if not isinstance(data, dict):
+        return LOOKUP_FAILED
+    if data.get('requestSuccessful'):
+        return (data.get('responseBody') or {}).get('paymentStatus') or LOOKUP_FAILED
+    if response.status_code in NOT_FOUND_STATUS_CODES:
+        return None
+    logger.warning(f"Monnify lookup for {payment_reference} failed with {response.status_code}")
+    return LOOKUP_FAILED
+
+
+def _resolve_outcome(transaction, payment_status, now):
+    if payment_status is LOOKUP_FAILED:
+        return None
+    if payment_status in PAID_STATUSES:
+        return Transaction.STATUS_SUCCESSFUL
+    if payment_status in FAILED_STATUSES:
+        return Transaction.STATUS_FAILED
+    if payment_status in EXPIRED_STATUSES:
+        return Transaction.STATUS_EXPIRED
+    # Only give up on checkouts Monnify reports as pending or never initialised
+    if payment_status in (None, PENDING_STATUS) and transaction.created_at < now - PENDING_EXPIRY:
+        return Transaction.STATUS_EXPIRED
+    return None
+
+
+def _close_unpaid(outcomes):
+    """
+    Mark unpaid transactions failed or expired with one bulk_update. Rows are
+    re-read under lock so a payment settled meanwhile is left untouched. Events
+    keep their status, since a newer checkout for the same event may be open.
+
+    updated_at is the time of the write, not of the run, so the admin rollups
+    (which scan by updated_at) see every chunk.
+    """
+    with db_transaction.atomic():
+        rows = list(
+            Transaction.objects.select_for_update(skip_locked=True)
+            .filter(pk__in=outcomes.keys(), status=Transaction.STATUS_PENDING)
+        )
+        written_at = timezone.now()
+        for row in rows:
+            row.status = outcomes[row.pk]
+            row.updated_at = written_at
+        Transaction.objects.bulk_update(rows, ['status', 'updated_at'])
+
+        def notify():
+            for row in rows:
+                transaction_status_changed.send(
+                    sender=Transaction, transaction=row, previous_status=Transaction.STATUS_PENDING
+                )
+        db_transaction.on_commit(notify)
+    return rows
+
+
+def verify_transaction(payment_reference):
+    """
+    Ask Monnify about one transaction and settle it if the answer is final:
+    paid, or failed, cancelled or expired. Payments still pending at Monnify,
+    unknown to it or that could not be looked up are left to the webhook and
+    reconcile_pending_transactions.
+
+    Returns:
+        str: The transaction's status afterwards
+    """
+    payment_status = _query_payment_status(get_monnify_client(), None, payment_reference)
+    if payment_status in PAID_STATUSES:
+        return settle_transaction(payment_reference, paid=True)[0].status
+    if payment_status in FAILED_STATUSES or payment_status in EXPIRED_STATUSES:
+        return settle_transaction(payment_reference, paid=False)[0].status
+    return Transaction.objects.values_list('status', flat=True).get(payment_reference=payment_reference)
+
+
+def enqueue_verification(payment_reference):
+    """Hand a returning checkout to Celery; the reconciler picks it up if the broker is down"""
+    from .tasks import verify_transaction_task
+
+    try:
+        verify_transaction_task.delay(payment_reference)
+    except Exception as e:
+        logger.error(f"Could not queue verification of {payment_reference}: {str(e)}")
+
+
+def reconcile_pending_transactions(limit=None):
+    """
+    Re-verify pending transactions with Monnify and settle or close them.
+
+    Pending rows older than the grace period are walked in primary-key chunks.
+    Each chunk is queried in parallel on a bounded thread pool behind a shared
+    rate limiter; paid rows go through settle_transaction and the rest are
+    closed in bulk.
+
+    Args:
+        limit (Optional[int]): Maximum number of transactions to check this run
+
+    Returns:
+        dict: Counts, throughput and remaining backlog for this run
+    """
+    started = time.monotonic()
+    now = timezone.now()
+    client = get_monnify_client()
+    limiter = RateLimiter(REQUESTS_PER_SECOND)
+    stats = {'checked': 0, 'settled': 0, 'failed': 0, 'expired': 0, 'unchanged': 0, 'lookup_failed': 0}
+
+    pending = Transaction.objects.filter(
+        status=Transaction.STATUS_PENDING,
+        created_at__lt=now - PENDING_GRACE_PERIOD
+    ).only('pk', 'payment_reference', 'created_at')
+
+    last_pk = 0
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="reconcile") as executor:
+        while limit is None or stats['checked'] < limit:
+            size = CHUNK_SIZE if limit is None else min(CHUNK_SIZE, limit - stats['checked'])
+            chunk = list(pending.filter(pk__gt=last_pk).order_by('pk')[:size])
+            if not chunk:
+                break
+            last_pk = chunk[-1].pk
+
+            payment_statuses = executor.map(
+                lambda t: _query_payment_status(client, limiter, t.payment_reference), chunk
+            )
+
+            unpaid = {}
+            for transaction, payment_status in zip(chunk, payment_statuses):
+                if payment_status is LOOKUP_FAILED:
+                    # Left pending for the next run
+                    stats['lookup_failed'] += 1
+                    continue
+                outcome = _resolve_outcome(transaction, payment_status, now)
+                if outcome == Transaction.STATUS_SUCCESSFUL:
+                    if settle_transaction(transaction.payment_reference, paid=True)[1]:
+                        stats['settled'] += 1
+                elif outcome:
+                    unpaid[transaction.pk] = outcome
+                else:
+                    stats['unchanged'] += 1
+
+            for row in _close_unpaid(unpaid):
+                stats[row.status] += 1
+            stats['checked'] += len(chunk)
+
+    elapsed = time.monotonic() - started
+    stats['duration_seconds'] = round(elapsed, 2)
+    stats['throughput_per_second'] = round(stats['checked'] / elapsed, 2) if elapsed else 0
+    stats['backlog'] = Transaction.objects.filter(status=Transaction.STATUS_PENDING).count()
+    stats['finished_at'] = timezone.now().isoformat()
+    cache.set(STATS_CACHE_KEY, stats, timeout=None)
+
+    logger.info(
+        f"Reconciled {stats['checked']} pending transactions in {stats['duration_seconds']}s "
+        f"({stats['throughput_per_second']}/s): {stats['settled']} settled, {stats['failed']} failed, "
+        f"{stats['expired']} expired, {stats['unchanged']} unchanged, {stats['lookup_failed']} lookups failed, "
+        f"backlog {stats['backlog']}"
+    )
+    return stats
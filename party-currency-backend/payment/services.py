@@ -0,0 +1,77 @@
+# services.py
+import logging
+
+from django.db import transaction as db_transaction
+from django.db.models import F
+from django.utils import timezone
+
+from authentication.models import CustomUser as CUser
+from events.models import Events
+from .models import Transaction
+from .signals import transaction_status_changed
+
+logger = logging.getLogger(__name__)
+
+# A successful payment is final; a failed or expired one may still succeed
+# later, e.g. when a bank transfer lands after the customer left the checkout.
+ALLOWED_TRANSITIONS = {
+    Transaction.STATUS_PENDING: (Transaction.STATUS_SUCCESSFUL, Transaction.STATUS_FAILED, Transaction.STATUS_EXPIRED),
+    Transaction.STATUS_FAILED: (Transaction.STATUS_SUCCESSFUL,),
+    Transaction.STATUS_EXPIRED: (Transaction.STATUS_SUCCESSFUL,),
+}
+
+
+def settle_transaction(payment_reference, paid):
+    """
+    Apply a verified Monnify payment outcome to the transaction, its event and
+    the paying user in one database transaction.
+
+    The transaction row is locked while its status is checked, so callback,
+    webhook and reconciliation deliveries of the same payment are applied once.
+
+    Args:
+        payment_reference (str): Reference of the payment.models.Transaction
+        paid (bool): Whether Monnify reported the payment as PAID
+
+    Returns:
+        tuple: (Transaction, bool) where the bool is False if the outcome had
+               already been applied or is not a valid transition
+
+    Raises:
+        Transaction.DoesNotExist: If no transaction has this reference
+    """
+    new_status = Transaction.STATUS_SUCCESSFUL if paid else Transaction.STATUS_FAILED
+
+    with db_transaction.atomic():
+        transaction = Transaction.objects.select_for_update().get(payment_reference=payment_reference)
+        if new_status not in ALLOWED_TRANSITIONS.get(transaction.status, ()):
+            return transaction, False
+
+        previous_status = transaction.status
+        transaction.status = new_status
+        transaction.save(update_fields=['status', 'updated_at'])
+        db_transaction.on_commit(lambda: transaction_status_changed.send(
+            sender=Transaction, transaction=transaction, previous_status=previous_status
+        ))
+
+        if transaction.event_id:
+            event_updates = {
+                'transaction_id': payment_reference,
+                'payment_status': new_status,
+                'updated_at': timezone.now(),
+            }
+            if paid:
+                event_updates['delivery_status'] = 'pending'
+            if not Events.objects.filter(event_id=transaction.event_id).update(**event_updates):
+                logger.warning(f"Event {transaction.event_id} not found while settling {payment_reference}")
+
+        if paid:
+            updated = CUser.objects.filter(email=transaction.user_id).update(
+                total_amount_spent=F('total_amount_spent') + transaction.amount,
+                successful_transactions=F('successful_transactions') + 1,
+            )
+            if not updated:
+                logger.warning(f"User {transaction.user_id} not found while settling {payment_reference}")
+
+    logger.info(f"Settled {payment_reference} as {new_status}")
+    return transaction, True
@@ -0,0 +1,6 @@
+# signals.py
+from django.dispatch import Signal
+
+# Sent after commit whenever a transaction's status moves, e.g. on settlement.
+# Receivers get transaction (the updated Transaction) and previous_status.
+transaction_status_changed = Signal()
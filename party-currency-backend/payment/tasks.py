@@ -0,0 +1,54 @@
+from datetime import timedelta
+
+from celery import shared_task
+from django.utils import timezone
+
+from .models import WebhookEvent
+from .reconciliation import reconcile_pending_transactions, verify_transaction
+from .webhooks import process_webhook_event, MAX_ATTEMPTS
+
+
+@shared_task
+def process_webhook_event_task(event_id):
+    """
+    Celery task that applies a stored Monnify webhook notification.
+    It is queued as soon as the notification has been acknowledged.
+    """
+    process_webhook_event(event_id)
+
+
+@shared_task
+def process_pending_webhook_events_task():
+    """
+    Celery task that retries webhook events which were never queued or failed
+    to apply. This task is scheduled to run every minute.
+    """
+    cutoff = timezone.now() - timedelta(minutes=1)
+    event_ids = WebhookEvent.objects.filter(
+        status=WebhookEvent.STATUS_RECEIVED,
+        received_at__lt=cutoff,
+        attempts__lt=MAX_ATTEMPTS
+    ).values_list('pk', flat=True)[:500]
+
+    for event_id in event_ids:
+        process_webhook_event(event_id)
+
+
+@shared_task
+def reconcile_pending_transactions_task():
+    """
+    Celery task that re-verifies pending transactions with Monnify and
+    settles, fails or expires them. This task is scheduled to run every
+    10 minutes and returns the run's metrics.
+    """
+    return reconcile_pending_transactions()
+
+
+@shared_task
+def verify_transaction_task(payment_reference):
+    """
+    Celery task that asks Monnify about a checkout the customer has just
+    returned from and settles it if the outcome is final. It is queued by
+    the payment callback.
+    """
+    return verify_transaction(payment_reference)
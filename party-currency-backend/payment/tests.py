@@ -1,3 +1,370 @@
+import hashlib
+import hmac
+import json
+import os
+import time
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+import requests
+from django.core.cache import cache
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from authentication.models import CustomUser
+from events.models import Events
+from .models import Transaction, WebhookEvent
+from .monnify import Bulkhead, CircuitBreaker, MonnifyClient, MonnifyUnavailable
+from .reconciliation import (
+    LOOKUP_FAILED,
+    PENDING_EXPIRY,
+    reconcile_pending_transactions,
+    _query_payment_status,
+)
+from .services import ALLOWED_TRANSITIONS, settle_transaction
+from .utils import MonnifyTokenManager
+from .webhooks import process_webhook_event, verify_signature
+
+SECRET_KEY = 'test-monnify-secret'
+
+
+def _create_transaction(reference, user, event_id='', amount='1500.00', **kwargs):
+    return Transaction.objects.create(
+        amount=Decimal(amount),
+        customer_email=user.email,
+        user_id=user.email,
+        event_id=event_id,
+        payment_reference=reference,
+        transaction_reference=f"MNFY|{reference}",
+        **kwargs
+    )
+
+
+class SettleTransactionTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username='payer@example.com', email='payer@example.com', password='secret'
+        )
+        Events.objects.create(
+            event_id='EVTsettle', event_name='Party', start_date='2025-01-01',
+            end_date='2025-01-02', delivery_address='Lagos'
+        )
+        self.transaction = _create_transaction('partysettle', self.user, event_id='EVTsettle')
+
+    def test_paid_settlement_is_applied_once(self):
+        transaction, applied = settle_transaction('partysettle', paid=True)
+        self.assertTrue(applied)
+        self.assertEqual(transaction.status, Transaction.STATUS_SUCCESSFUL)
+
+        # A redelivery (callback, webhook and reconciler all report the same payment)
+        transaction, applied = settle_transaction('partysettle', paid=True)
+        self.assertFalse(applied)
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.total_amount_spent, Decimal('1500.00'))
+        self.assertEqual(self.user.successful_transactions, 1)
+        event = Events.objects.get(event_id='EVTsettle')
+        self.assertEqual(event.payment_status, Transaction.STATUS_SUCCESSFUL)
+        self.assertEqual(event.transaction_id, 'partysettle')
+
+    def test_failed_payment_can_still_succeed(self):
+        transaction, applied = settle_transaction('partysettle', paid=False)
+        self.assertTrue(applied)
+        self.assertEqual(transaction.status, Transaction.STATUS_FAILED)
+
+        transaction, applied = settle_transaction('partysettle', paid=True)
+        self.assertTrue(applied)
+        self.assertEqual(transaction.status, Transaction.STATUS_SUCCESSFUL)
+
+    def test_successful_payment_is_final(self):
+        settle_transaction('partysettle', paid=True)
+        transaction, applied = settle_transaction('partysettle', paid=False)
+        self.assertFalse(applied)
+        self.assertEqual(transaction.status, Transaction.STATUS_SUCCESSFUL)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.successful_transactions, 1)
+
+    def test_allowed_transitions(self):
+        self.assertNotIn(Transaction.STATUS_SUCCESSFUL, ALLOWED_TRANSITIONS)
+        for status in (Transaction.STATUS_FAILED, Transaction.STATUS_EXPIRED):
+            self.assertEqual(ALLOWED_TRANSITIONS[status], (Transaction.STATUS_SUCCESSFUL,))
+        self.assertIn(Transaction.STATUS_FAILED, ALLOWED_TRANSITIONS[Transaction.STATUS_PENDING])
+
+    def test_unknown_reference_raises(self):
+        with self.assertRaises(Transaction.DoesNotExist):
+            settle_transaction('partyunknown', paid=True)
+
+
+@mock.patch.dict(os.environ, {'MONNIFY_SECRET_KEY': SECRET_KEY})
+class WebhookTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = CustomUser.objects.create_user(
+            username='hook@example.com', email='hook@example.com', password='secret'
+        )
+        _create_transaction('partyhook', self.user)
+        self.body = json.dumps({
+            'eventType': 'SUCCESSFUL_TRANSACTION',
+            'eventData': {
+                'transactionReference': 'MNFY|partyhook',
+                'paymentReference': 'partyhook',
+                'paymentStatus': 'PAID',
+                'product': {'type': 'WEB_SDK'},
+            },
+        }).encode()
+
+    def _sign(self, body):
+        return hmac.new(SECRET_KEY.encode(), body, hashlib.sha512).hexdigest()
+
+    def _post(self, body, signature):
+        return self.client.post(
+            '/payments/webhook', body, content_type='application/json',
+            HTTP_MONNIFY_SIGNATURE=signature
+        )
+
+    def test_verify_signature(self):
+        self.assertTrue(verify_signature(self.body, self._sign(self.body)))
+        self.assertFalse(verify_signature(self.body + b' ', self._sign(self.body)))
+        self.assertFalse(verify_signature(self.body, None))
+        with mock.patch.dict(os.environ, {'MONNIFY_SECRET_KEY': ''}):
+            self.assertFalse(verify_signature(self.body, self._sign(self.body)))
+
+    def test_invalid_signature_is_rejected(self):
+        response = self._post(self.body, 'not-a-signature')
+        self.assertEqual(response.status_code, 401)
+        self.assertFalse(WebhookEvent.objects.exists())
+
+    @mock.patch('payment.webhooks.enqueue_webhook_event')
+    def test_redelivery_is_stored_and_queued_once(self, enqueue):
+        for _ in range(2):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self._post(self.body, self._sign(self.body))
+            self.assertEqual(response.status_code, 200)
+
+        event = WebhookEvent.objects.get()
+        self.assertEqual(event.reference, 'MNFY|partyhook')
+        enqueue.assert_called_once_with(event.pk)
+
+    @mock.patch('payment.webhooks.enqueue_webhook_event')
+    def test_processing_settles_once(self, enqueue):
+        self._post(self.body, self._sign(self.body))
+        event = WebhookEvent.objects.get()
+
+        process_webhook_event(event.pk)
+        process_webhook_event(event.pk)
+
+        event.refresh_from_db()
+        self.assertEqual(event.status, WebhookEvent.STATUS_PROCESSED)
+        self.assertEqual(event.attempts, 1)
+        self.assertEqual(Transaction.objects.get(payment_reference='partyhook').status, Transaction.STATUS_SUCCESSFUL)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.successful_transactions, 1)
+
+
+class FakeResponse:
+    def __init__(self, status_code, data):
+        self.status_code = status_code
+        self.data = data
+
+    def json(self):
+        return self.data
+
+
+class FakeMonnifyClient:
+    """Answers query_transaction from a {payment_reference: response or exception} map"""
+
+    def __init__(self, answers):
+        self.answers = answers
+
+    def query_transaction(self, payment_reference):
+        answer = self.answers[payment_reference]
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+
+def _found(payment_status):
+    return FakeResponse(200, {'requestSuccessful': True, 'responseBody': {'paymentStatus': payment_status}})
+
+
+NOT_FOUND = FakeResponse(404, {'requestSuccessful': False, 'responseMessage': 'Transaction not found'})
+SERVER_ERROR = FakeResponse(500, {'requestSuccessful': False, 'responseMessage': 'Internal error'})
+
+
+class ReconciliationTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username='recon@example.com', email='recon@example.com', password='secret'
+        )
+        self.answers = {}
+        patcher = mock.patch(
+            'payment.reconciliation.get_monnify_client', return_value=FakeMonnifyClient(self.answers)
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _pending(self, reference, answer, age):
+        transaction = _create_transaction(reference, self.user)
+        Transaction.objects.filter(pk=transaction.pk).update(created_at=timezone.now() - age)
+        self.answers[reference] = answer
+
+    def _status(self, reference):
+        return Transaction.objects.get(payment_reference=reference).status
+
+    def test_outcomes(self):
+        recent = timedelta(hours=1)
+        stale = PENDING_EXPIRY + timedelta(hours=1)
+        self._pending('partypaid', _found('PAID'), recent)
+        self._pending('partyfailed', _found('FAILED'), recent)
+        self._pending('partyabandoned', _found('ABANDONED'), recent)
+        self._pending('partywaiting', _found('PENDING'), recent)
+        self._pending('partystalepending', _found('PENDING'), stale)
+        self._pending('partynotfound', NOT_FOUND, stale)
+        self._pending('partyrecentnotfound', NOT_FOUND, recent)
+        # Too fresh to be checked at all
+        _create_transaction('partyfresh', self.user)
+
+        stats = reconcile_pending_transactions()
+
+        self.assertEqual(self._status('partypaid'), Transaction.STATUS_SUCCESSFUL)
+        self.assertEqual(self._status('partyfailed'), Transaction.STATUS_FAILED)
+        self.assertEqual(self._status('partyabandoned'), Transaction.STATUS_EXPIRED)
+        self.assertEqual(self._status('partywaiting'), Transaction.STATUS_PENDING)
+        self.assertEqual(self._status('partystalepending'), Transaction.STATUS_EXPIRED)
+        self.assertEqual(self._status('partynotfound'), Transaction.STATUS_EXPIRED)
+        self.assertEqual(self._status('partyrecentnotfound'), Transaction.STATUS_PENDING)
+        self.assertEqual(self._status('partyfresh'), Transaction.STATUS_PENDING)
+        self.assertEqual(stats['checked'], 7)
+        self.assertEqual(stats['settled'], 1)
+        self.assertEqual(stats['failed'], 1)
+        self.assertEqual(stats['expired'], 3)
+        self.assertEqual(stats['unchanged'], 2)
+        self.assertEqual(stats['lookup_failed'], 0)
+
+    def test_lookup_failures_are_not_expired(self):
+        stale = PENDING_EXPIRY + timedelta(hours=1)
+        self._pending('partytimeout', ConnectionError('timed out'), stale)
+        self._pending('partyservererror', SERVER_ERROR, stale)
+        self._pending('partygarbled', FakeResponse(200, ['unexpected']), stale)
+
+        stats = reconcile_pending_transactions()
+
+        for reference in ('partytimeout', 'partyservererror', 'partygarbled'):
+            self.assertEqual(self._status(reference), Transaction.STATUS_PENDING)
+        self.assertEqual(stats['lookup_failed'], 3)
+        self.assertEqual(stats['expired'], 0)
+
+    def test_query_payment_status(self):
+        client = FakeMonnifyClient({
+            'a': _found('PAID'),
+            'b': NOT_FOUND,
+            'c': SERVER_ERROR,
+            'd': FakeResponse(200, {'requestSuccessful': True, 'responseBody': {}}),
+        })
+        self.assertEqual(_query_payment_status(client, None, 'a'), 'PAID')
+        self.assertIsNone(_query_payment_status(client, None, 'b'))
+        self.assertIs(_query_payment_status(client, None, 'c'), LOOKUP_FAILED)
+        self.assertIs(_query_payment_status(client, None, 'd'), LOOKUP_FAILED)
+
+
+class CacheLockTests(TestCase):
+    """A worker only releases locks it still holds"""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def _login_while_lock_expires(self):
+        # The lock times out mid-login and another worker takes it
+        cache.set(MonnifyTokenManager.LOCK_KEY, 'other-worker')
+        return 'token', 3600
+
+    def test_token_lock_is_released(self):
+        with mock.patch.object(MonnifyTokenManager, '_login', return_value=('token', 3600)):
+            self.assertEqual(MonnifyTokenManager._refresh_blocking()['token'], 'token')
+        self.assertIsNone(cache.get(MonnifyTokenManager.LOCK_KEY))
+
+    def test_expired_token_lock_is_not_released(self):
+        with mock.patch.object(MonnifyTokenManager, '_login', side_effect=self._login_while_lock_expires):
+            MonnifyTokenManager._refresh_blocking()
+        self.assertEqual(cache.get(MonnifyTokenManager.LOCK_KEY), 'other-worker')
+
+    def test_expired_bulkhead_slot_is_not_released(self):
+        bulkhead = Bulkhead('locktest')
+        key, token = slot = bulkhead.acquire()
+        self.assertEqual(cache.get(key), token)
+        bulkhead.release(slot)
+        self.assertIsNone(cache.get(key))
+
+        slot = bulkhead.acquire()
+        cache.set(slot[0], 'other-call')
+        bulkhead.release(slot)
+        self.assertEqual(cache.get(slot[0]), 'other-call')
+
+
+def _http_response(status_code, retry_after=None):
+    response = requests.Response()
+    response.status_code = status_code
+    if retry_after is not None:
+        response.headers['Retry-After'] = retry_after
+    return response
+
+
+@mock.patch.object(MonnifyTokenManager, 'get_token', return_value={'token': 'token'})
+class RateLimitTests(TestCase):
+    """A 429 is back-off, not an outage"""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.client = MonnifyClient(base_url='https://monnify.test', contract_code='contract')
+        self.send = self._patch(mock.patch.object(self.client.session, 'request'))
+
+        # Sleeping moves a fake clock on instead of waiting
+        self.now = time.time()
+        self._patch(mock.patch('payment.monnify.time.time', side_effect=lambda: self.now))
+        self.sleep = self._patch(mock.patch('payment.monnify.time.sleep', side_effect=self._advance))
+
+    def _patch(self, patcher):
+        patched = patcher.start()
+        self.addCleanup(patcher.stop)
+        return patched
+
+    def _advance(self, seconds):
+        self.now += seconds
+
+    def _query(self):
+        return self.client.query_transaction('partylimited')
+
+    def test_retry_after_is_honoured(self, get_token):
+        self.send.side_effect = [_http_response(429, '2'), _http_response(200)]
+        self.assertEqual(self._query().status_code, 200)
+        self.sleep.assert_called_once_with(2.0)
+
+    def test_throttling_never_opens_the_circuit(self, get_token):
+        self.send.side_effect = lambda *args, **kwargs: _http_response(429, '0')
+        for _ in range(CircuitBreaker.FAILURE_THRESHOLD):
+            self.assertEqual(self._query().status_code, 429)
+        self.assertIsNone(cache.get(self.client.circuit_breaker.open_key))
+        self.assertIsNone(cache.get(self.client.circuit_breaker.failures_key))
+
+    def test_long_retry_after_backs_off_every_caller(self, get_token):
+        self.send.return_value = _http_response(429, '120')
+        self.assertEqual(self._query().status_code, 429)
+        self.sleep.assert_not_called()
+
+        with self.assertRaises(MonnifyUnavailable) as raised:
+            self._query()
+        self.assertGreater(raised.exception.retry_after, 100)
+        self.assertEqual(self.send.call_count, 1)
+        self.assertIsNone(cache.get(self.client.circuit_breaker.open_key))
 
-# Create your tests here.
+    def test_server_errors_still_open_the_circuit(self, get_token):
+        self.send.side_effect = lambda *args, **kwargs: _http_response(503)
+        # Each query makes MAX_RETRIES + 1 attempts, so the second one trips the breaker
+        self.assertEqual(self._query().status_code, 503)
+        with self.assertRaises(MonnifyUnavailable):
+            self._query()
+        self.assertIsNotNone(cache.get(self.client.circuit_breaker.open_key))
@@ -1,8 +1,9 @@
 from django.urls import path
-from .views import InitializeTransactionView,generate_transcation_ID,callback
+from .views import InitializeTransactionView,generate_transcation_ID,callback,webhook
 urlpatterns = [
     path("pay",InitializeTransactionView.as_view(),name="make payment "),
     path("create-transaction",generate_transcation_ID),
-    path("callback",callback,name="callback")
+    path("callback",callback,name="callback"),
+    path("webhook",webhook,name="webhook")
 
 ]
\ No newline at end of file
@@ -1,59 +1,182 @@
 # utils.py
 import base64
+import logging
+import threading
+import time
+import uuid
 import requests
 from django.conf import settings
+from django.core.cache import cache
 from dotenv import load_dotenv
 import os
 
 # Load environment variables
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """Thread-safe token bucket allowing `rate` calls per second with bursts up to `burst`"""
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.capacity = float(burst or max(rate, 1))
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a call is allowed"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def release_lock(key, token):
+    """
+    Delete a lock taken with cache.add(key, token) unless it has expired and
+    another worker now holds it. The check and the delete are two cache calls,
+    so this only guards against locks that expired well before release.
+    """
+    if cache.get(key) == token:
+        cache.delete(key)
+
+
+class MonnifyAuthError(requests.exceptions.RequestException):
+    """Raised when Monnify refuses to issue an access token"""
+
+
+class MonnifyTokenManager:
+    """
+    Keeps one Monnify access token in the shared Django cache so every
+    gunicorn worker reuses the same login until shortly before it expires.
+    """
+    CACHE_KEY = "monnify_access_token"
+    LOCK_KEY = "monnify_access_token_lock"
+    EXPIRY_SKEW_SECONDS = 60  # Stop handing out a token this long before expiresIn
+    REFRESH_AHEAD_SECONDS = 300  # Refresh in the background once this close to expiry
+    LOCK_TIMEOUT_SECONDS = 30
+    WAIT_TIMEOUT_SECONDS = 10
+    WAIT_INTERVAL_SECONDS = 0.1
+
+    @classmethod
+    def get_token(cls):
+        """
+        Return the cached token entry, logging in again only when it is missing
+        or about to expire. Only one worker performs the login at a time.
+        """
+        entry = cls._get_valid_entry()
+        if entry:
+            if entry['expires_at'] - time.time() < cls.REFRESH_AHEAD_SECONDS:
+                cls._refresh_in_background()
+            return entry
+        return cls._refresh_blocking()
+
+    @classmethod
+    def invalidate(cls):
+        """Drop the cached token, e.g. after Monnify rejected it with a 401"""
+        cache.delete(cls.CACHE_KEY)
+
+    @classmethod
+    def _get_valid_entry(cls):
+        entry = cache.get(cls.CACHE_KEY)
+        if entry and entry['expires_at'] - cls.EXPIRY_SKEW_SECONDS > time.time():
+            return entry
+        return None
+
+    @classmethod
+    def _refresh_blocking(cls):
+        deadline = time.time() + cls.WAIT_TIMEOUT_SECONDS
+        token = uuid.uuid4().hex
+        while True:
+            if cache.add(cls.LOCK_KEY, token, timeout=cls.LOCK_TIMEOUT_SECONDS):
+                try:
+                    # Another worker may have refreshed between our miss and the lock
+                    return cls._get_valid_entry() or cls._fetch_and_store()
+                finally:
+                    release_lock(cls.LOCK_KEY, token)
+
+            # Another worker is logging in, wait for its result
+            time.sleep(cls.WAIT_INTERVAL_SECONDS)
+            entry = cls._get_valid_entry()
+            if entry:
+                return entry
+            if time.time() > deadline:
+                logger.warning("Timed out waiting for Monnify token refresh, logging in directly")
+                return cls._fetch_and_store()
+
+    @classmethod
+    def _refresh_in_background(cls):
+        token = uuid.uuid4().hex
+        if not cache.add(cls.LOCK_KEY, token, timeout=cls.LOCK_TIMEOUT_SECONDS):
+            return  # Someone else is already refreshing
+
+        def refresh():
+            try:
+                cls._fetch_and_store()
+            except Exception as e:
+                logger.warning(f"Background Monnify token refresh failed: {str(e)}")
+            finally:
+                release_lock(cls.LOCK_KEY, token)
+
+        threading.Thread(target=refresh, name="monnify-token-refresh", daemon=True).start()
+
+    @classmethod
+    def _fetch_and_store(cls):
+        token, expires_in = cls._login()
+        entry = {
+            'token': token,
+            'expires_at': time.time() + expires_in,
+        }
+        cache.set(cls.CACHE_KEY, entry, timeout=max(int(expires_in) - cls.EXPIRY_SKEW_SECONDS, 1))
+        logger.info(f"Refreshed Monnify access token, expires in {expires_in}s")
+        return entry
+
+    @staticmethod
+    def _login():
+        from .monnify import get_monnify_client
+
+        response = get_monnify_client().login()
+        if response.status_code == 200:
+            data = response.json()
+            if data.get('requestSuccessful'):
+                return data['responseBody']['accessToken'], int(data['responseBody']['expiresIn'])
+        raise MonnifyAuthError('Failed to get access token')
+
+
 class MonnifyAuth:
     @staticmethod
     def generate_basic_auth():
         api_key = os.getenv('MONNIFY_API_KEY')
-        secret_key = os.getenv('MONNIFY_SECRET_KEY')  
-        
+        secret_key = os.getenv('MONNIFY_SECRET_KEY')
+
         if not api_key or not secret_key:
             raise ValueError("Monnify API credentials not found in environment variables")
-            
+
         auth_string = f"{api_key}:{secret_key}"
         encoded_auth = base64.b64encode(auth_string.encode()).decode()
         return f"Basic {encoded_auth}"
 
     @staticmethod
     def get_access_token():
-        """Get access token from Monnify API"""
-        headers = {
-            'Authorization': MonnifyAuth.generate_basic_auth(),
-            'Content-Type': 'application/json'
-        }
-        
+        """Get access token from Monnify API, reusing the shared cached token"""
         try:
-            response = requests.post(
-                f"{os.getenv('MONNIFY_BASE_URL')}/api/v1/auth/login",
-                headers=headers,
-                json={}
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
-                if data.get('requestSuccessful'):
-                    return {
-                        'success': True,
-                        'token': data['responseBody']['accessToken'],
-                        'expires_in': data['responseBody']['expiresIn']
-                    }
-               
-            
+            entry = MonnifyTokenManager.get_token()
             return {
-                'success': False,
-                'error': 'Failed to get access token'
+                'success': True,
+                'token': entry['token'],
+                'expires_in': int(entry['expires_at'] - time.time())
             }
-            
         except requests.exceptions.RequestException as e:
             return {
                 'success': False,
                 'error': str(e)
             }
-# payment/admin.py
\ No newline at end of file
@@ -5,16 +5,17 @@ from rest_framework.response import Response
 from rest_framework import status
 from django.conf import settings
 from .serializers import TransactionSerializer
-from rest_framework.decorators import api_view, permission_classes, throttle_classes
+from rest_framework.decorators import api_view, permission_classes, throttle_classes, authentication_classes
 from .models import Transaction
 from events.models import Events
-import time
 import os
 from dotenv import load_dotenv
-from .utils import MonnifyAuth
+from .monnify import get_monnify_client, MonnifyUnavailable, provider_unavailable_response
+from .reconciliation import enqueue_verification
+from party_currency_backend.ids import generate_payment_reference
+from .webhooks import verify_signature, store_webhook_event
 from rest_framework.permissions import AllowAny
 from rest_framework.throttling import UserRateThrottle, AnonRateThrottle
-from authentication.models import CustomUser as CUser
 from django.http import HttpResponseRedirect
 
 class UserThrottle(UserRateThrottle):
@@ -27,11 +28,6 @@ class InitializeTransactionView(APIView):
         transaction = Transaction.objects.get(payment_reference=request.data['payment_reference'])
         
             # Prepare the request to Monnify API
-        headers = {
-                'Authorization': f"Bearer {MonnifyAuth.get_access_token()['token']}",
-                'Content-Type': 'application/json'
-            }
-        print(headers)
         payload = {
                 'amount': float(transaction.amount),
                 'customerName': transaction.customer_name,
@@ -45,11 +41,7 @@ class InitializeTransactionView(APIView):
             }
 
         try:
-            response = requests.post(
-                    f"{os.getenv('MONNIFY_BASE_URL')}/api/v1/merchant/transactions/init-transaction",
-                    json=payload,
-                    headers=headers
-                )
+            response = get_monnify_client().init_transaction(payload)
 
             response_data = response.json()
 
@@ -57,7 +49,7 @@ class InitializeTransactionView(APIView):
                     # Update transaction with reference from Monnify
                    
                     transaction.transaction_reference = response_data['responseBody']['transactionReference']
-                    transaction.save()
+                    transaction.save(update_fields=['transaction_reference', 'updated_at'])
                     event = Events.objects.get(event_id=transaction.event_id)
                     event.payment_status='successful'
                     event.delivery_status='pending'
@@ -65,6 +57,9 @@ class InitializeTransactionView(APIView):
 
             return Response(response_data, status=status.HTTP_200_OK)
 
+        except MonnifyUnavailable as e:
+                return provider_unavailable_response(e)
+
         except requests.exceptions.RequestException as e:
                 return Response({
                     'error': 'Failed to initialize transaction',
@@ -91,11 +86,11 @@ def generate_transcation_ID(request):
         amount=sum(amount.values()),    
         customer_name=f"{request.user.first_name} {request.user.last_name}",
         customer_email=request.user.email,
-        payment_reference=f"party{int(time.time())}",
+        payment_reference=generate_payment_reference(),
         payment_description=f"Payment for {request.data['event_id']}",
         currency_code="NGN",
         breakdown=str(amount),
-        contract_code=os.getenv("MONNIFY_CONTRACT_CODE"),  # Fixed the missing comma
+        contract_code=get_monnify_client().contract_code,
         event_id=request.data['event_id'],
         user_id=request.user.email  # Storing user email as user_id
     )
@@ -122,62 +117,20 @@ def callback(request):
         transaction = Transaction.objects.get(payment_reference=payment_reference)
         transaction_reference = transaction.transaction_reference
         
-        # Verify with Monnify
-        headers = {
-            'Authorization': f"Bearer {MonnifyAuth.get_access_token()['token']}",
-            'Content-Type': 'application/json'
-        }
-        
-        verification_response = requests.get(
-            f"{os.getenv('MONNIFY_BASE_URL')}/api/v2/merchant/transactions/query?paymentReference={payment_reference}",
-            headers=headers
-        )
-        
-        verification_data = verification_response.json()
-        
-        if verification_data.get('requestSuccessful') and verification_data['responseBody'].get('paymentStatus') == "PAID":
-           
-            transaction.status = "successful"
-            transaction.save()
-            
-            # Update event
-            if transaction.event_id:
-                try:
-                    event = Events.objects.get(event_id=transaction.event_id)
-                    event.transaction_id = payment_reference
-                    event.payment_status = 'successful'
-                    event.delivery_status = 'pending'
-                    event.save()
-                except Events.DoesNotExist:
-                    pass  # Continue even if event not found
-            
-            # Update user total
-            try:
-                user = CUser.objects.get(email=transaction.user_id)
-                user.total_amount_spent = user.total_amount_spent + transaction.amount
-                user.save()
-            except (CUser.DoesNotExist, Exception) as e:
-                print(f"Error updating user total: {str(e)}")
-            
+        # Settled by the webhook or reconciler, no need to wait on Monnify
+        if transaction.status == Transaction.STATUS_SUCCESSFUL:
             redirect_url = f"{frontend_url}/manage-event?transaction_reference={transaction_reference}"
             return HttpResponseRedirect(redirect_url)
-            
-        else:
-            # Payment failed
-            transaction.status = "failed"
-            transaction.save()
-            
-            if transaction.event_id:
-                try:
-                    event = Events.objects.get(event_id=transaction.event_id)
-                    event.transaction_id = payment_reference
-                    event.payment_status = 'failed'
-                    event.save()
-                except Events.DoesNotExist:
-                    pass
-            
+        
+        if transaction.status in (Transaction.STATUS_FAILED, Transaction.STATUS_EXPIRED):
             redirect_url = f"{frontend_url}/manage-event?transaction_reference={transaction_reference}&status=failed"
             return HttpResponseRedirect(redirect_url)
+        
+        # Not settled yet: verify in the background rather than holding the redirect
+        # on Monnify; bank transfers in particular often stay PENDING for a while
+        enqueue_verification(payment_reference)
+        redirect_url = f"{frontend_url}/manage-event?transaction_reference={transaction_reference}&status=pending"
+        return HttpResponseRedirect(redirect_url)
             
     except Transaction.DoesNotExist:
         redirect_url = f"{frontend_url}/manage-event?error=transaction_not_found"
@@ -190,4 +143,27 @@ def callback(request):
             error_redirect += f"?transaction_reference={transaction_reference}&error=processing_failed"
         else:
             error_redirect += "?error=processing_failed"
-        return HttpResponseRedirect(error_redirect)
\ No newline at end of file
+        return HttpResponseRedirect(error_redirect)
+
+
+@api_view(["POST"])
+@authentication_classes([])
+@permission_classes([AllowAny])
+@throttle_classes([])
+def webhook(request):
+    """
+    Receive Monnify transaction notifications.
+
+    The payload is verified and stored, then applied by a Celery task so
+    Monnify gets its acknowledgement without waiting on any settlement work.
+    """
+    body = request.body
+    if not verify_signature(body, request.headers.get("monnify-signature")):
+        return Response({"error": "Invalid signature"}, status=status.HTTP_401_UNAUTHORIZED)
+
+    try:
+        store_webhook_event(body)
+    except ValueError:
+        return Response({"error": "Invalid payload"}, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response({"message": "received"}, status=status.HTTP_200_OK)
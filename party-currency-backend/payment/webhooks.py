@@ -0,0 +1,115 @@
+# webhooks.py
+import hashlib
+import hmac
+import json
+import logging
+import os
+
+from django.db import transaction as db_transaction
+from django.utils import timezone
+from dotenv import load_dotenv
+
+from merchant.sync import transaction_from_webhook, upsert_transactions
+from .models import Transaction, WebhookEvent
+from .services import settle_transaction
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+SUCCESSFUL_TRANSACTION = 'SUCCESSFUL_TRANSACTION'
+RESERVED_ACCOUNT = 'RESERVED_ACCOUNT'
+PAID_STATUSES = ('PAID', 'OVERPAID')
+MAX_ATTEMPTS = 5
+
+
+def verify_signature(body, signature):
+    """
+    Check the monnify-signature header, an HMAC-SHA512 of the raw request body
+    keyed with the Monnify secret key.
+    """
+    secret_key = os.getenv('MONNIFY_SECRET_KEY')
+    if not secret_key or not signature:
+        return False
+    expected = hmac.new(secret_key.encode(), body, hashlib.sha512).hexdigest()
+    return hmac.compare_digest(expected, signature)
+
+
+def store_webhook_event(body):
+    """
+    Persist a verified notification and queue it for processing.
+
+    Returns:
+        tuple: (WebhookEvent, created) where created is False for redeliveries
+    """
+    payload = json.loads(body)
+    event_data = payload.get('eventData') or {}
+    event, created = WebhookEvent.objects.get_or_create(
+        event_type=payload.get('eventType', ''),
+        reference=event_data.get('transactionReference') or event_data.get('paymentReference', ''),
+        defaults={'payload': body.decode()}
+    )
+    if created:
+        db_transaction.on_commit(lambda: enqueue_webhook_event(event.pk))
+    return event, created
+
+
+def enqueue_webhook_event(event_id):
+    """Hand an event to Celery; the periodic sweep picks it up if the broker is down"""
+    from .tasks import process_webhook_event_task
+
+    try:
+        process_webhook_event_task.delay(event_id)
+    except Exception as e:
+        logger.error(f"Could not queue webhook event {event_id}: {str(e)}")
+
+
+def process_webhook_event(event_id):
+    """Apply a stored notification to local state"""
+    event = WebhookEvent.objects.get(pk=event_id)
+    if event.status == WebhookEvent.STATUS_PROCESSED:
+        return
+
+    event.attempts += 1
+    try:
+        event_data = json.loads(event.payload).get('eventData') or {}
+        if event.event_type == SUCCESSFUL_TRANSACTION:
+            product_type = (event_data.get('product') or {}).get('type')
+            if product_type == RESERVED_ACCOUNT:
+                handle_reserved_account_inflow(event_data)
+            else:
+                handle_transaction_completion(event_data)
+        else:
+            logger.info(f"Ignoring Monnify {event.event_type} notification {event.reference}")
+
+        event.status = WebhookEvent.STATUS_PROCESSED
+        event.error = ''
+        event.processed_at = timezone.now()
+    except Exception as e:
+        logger.exception(f"Failed to process webhook event {event_id}: {str(e)}")
+        event.status = WebhookEvent.STATUS_FAILED if event.attempts >= MAX_ATTEMPTS else WebhookEvent.STATUS_RECEIVED
+        event.error = str(e)
+    event.save(update_fields=['status', 'attempts', 'error', 'processed_at'])
+
+
+def handle_transaction_completion(event_data):
+    """Settle a checkout transaction reported through the webhook"""
+    payment_reference = event_data.get('paymentReference')
+    if event_data.get('paymentStatus') not in PAID_STATUSES:
+        # Partial payments stay pending until the customer completes them
+        logger.info(f"Payment {payment_reference} reported as {event_data.get('paymentStatus')}")
+        return
+
+    try:
+        settle_transaction(payment_reference, paid=True)
+    except Transaction.DoesNotExist:
+        logger.warning(f"Webhook for unknown payment reference {payment_reference}")
+
+
+def handle_reserved_account_inflow(event_data):
+    """Record a transfer into an event's reserved account in the local mirror"""
+    if not event_data.get('paymentReference'):
+        logger.warning("Reserved account inflow without a payment reference")
+        return
+    upsert_transactions([transaction_from_webhook(event_data)])
@@ -4,17 +4,19 @@ from  rest_framework.decorators import api_view,authentication_classes,permissio
 from rest_framework.response import Response
 from rest_framework.authentication import TokenAuthentication,SessionAuthentication
 from rest_framework.permissions import IsAuthenticated,AllowAny
-from google_drive.models import GoogleDriveFile
-from google_drive.utils import upload_file_to_drive
+from media_storage import get_storage, storage_for_reference
 from authentication.models import CustomUser
-from django.core.files.storage import default_storage
 import os
-from django.core.files.base import ContentFile
+import logging
 from rest_framework import status
 from rest_framework.throttling import UserRateThrottle, AnonRateThrottle
 from payment.serializers import TransactionSerializer
 from payment.models import Transaction
 
+logger = logging.getLogger(__name__)
+
+PROFILE_PICTURES = 'profile_pictures'
+
 # Add these classes for custom throttling
 class UserThrottle(UserRateThrottle):
     scope = 'user'
@@ -138,6 +140,26 @@ def edit_user(request):
             "error": f"An error occurred: {str(e)}"
         }, status=500)
 
+
+def _release_picture(reference):
+    """Drop a profile picture the user no longer points at"""
+    if not reference:
+        return
+    storage, key = storage_for_reference(reference, PROFILE_PICTURES)
+    if storage is None:
+        return
+    try:
+        storage.delete(key)
+    except Exception as e:
+        logger.warning(f"Could not delete replaced profile picture {reference}: {str(e)}")
+
+
+def _picture_url(storage, key):
+    """The URL clients have always been given: a Drive file link, or the backend reference elsewhere"""
+    if storage.scheme == 'drive':
+        return f"https://drive.google.com/file/d/{key}"
+    return storage.reference(key)
+
      
 @api_view(["PUT"])
 @throttle_classes([UserThrottle])
@@ -148,18 +170,21 @@ def upload_picture(request):
         return Response({"error": "No profile picture provided"}, status=status.HTTP_400_BAD_REQUEST)
     try:
         profile_picture = request.FILES['profile_picture']
-        # Save the file temporarily
         file_name = f"{user.email}_profile_picture{os.path.splitext(profile_picture.name)[1]}"
-        file_path = default_storage.save(f'tmp/{file_name}', ContentFile(profile_picture.read()))
-        # Upload the file to Google Drive
-        folder_id = '1xg-UFjBtNMUeX3RbLsyOsBsmDOJzj2Sk'  # Replace with your folder ID
-        file_id = upload_file_to_drive(file_path, file_name, folder_id)
+        # Stream the upload straight to the profile picture storage backend
+        storage = get_storage(PROFILE_PICTURES)
+        key = storage.put(profile_picture, file_name, profile_picture.content_type)
+        reference = storage.reference(key)
         # Update the user's profile picture field
-        user.profile_picture = file_id
-        user.save()
-        # Clean up the temporary file
-        default_storage.delete(file_path)
-        return Response({"message": "Profile picture updated successfully", "profile_picture":f"https://drive.google.com/file/d/{file_id}"}, status=status.HTTP_200_OK)
+        previous_reference = user.profile_picture
+        user.profile_picture = reference
+        user.save(update_fields=['profile_picture'])
+        _release_picture(previous_reference)
+        return Response({
+            "message": "Profile picture updated successfully",
+            "profile_picture": _picture_url(storage, key),
+            "profile_picture_reference": reference,
+        }, status=status.HTTP_200_OK)
     except Exception as e:
         # Handle any errors during the process
         print("others")
@@ -172,8 +197,10 @@ def get_picture(request):
     if not user.profile_picture:
         return Response({"profile_picture": "https://drive.google.com/file/d/1f0umstb0KjrMoDqK-om2jrzyKsI2RhGx"}, status=200)
     
+    # Pictures saved before storage backends existed are bare Drive file IDs
+    storage, key = storage_for_reference(user.profile_picture, PROFILE_PICTURES)
     return Response({
-        "profile_picture":f"https://drive.google.com/file/d/{user.profile_picture}"
+        "profile_picture": _picture_url(storage, key) if storage else f"https://drive.google.com/file/d/{user.profile_picture}"
     })
 
 
@@ -40,19 +40,59 @@ const adminApi = {
     }
   },
 
-  // Get all users
-  getUsers: async () => {
+  /**
+   * Fetches one page of users, searched and sorted on the server
+   * @param {Object} [options]
+   * @param {string|null} [options.cursor=null] - next_cursor or previous_cursor of the page shown
+   * @param {number} [options.pageSize=10] - Number of users per page (at most 100)
+   * @param {string} [options.search=""] - Search query (name, email, username)
+   * @param {string} [options.sortBy="newest"] - newest, oldest, username_asc, username_desc,
+   *   spend_high, spend_low, transactions_high or relevance
+   * @param {boolean} [options.withTotal=true] - Include an (approximate) total_count
+   * @returns {Promise<{
+   *   users: Array<{
+   *     username: string,
+   *     email: string,
+   *     name: string,
+   *     role: string,
+   *     isActive: boolean,
+   *     date_joined: string,
+   *     last_login: string|null,
+   *     total_amount: string,
+   *     transaction_count: number
+   *   }>,
+   *   pagination: {
+   *     page_size: number,
+   *     has_next: boolean,
+   *     has_previous: boolean,
+   *     next_cursor: string|null,
+   *     previous_cursor: string|null,
+   *     total_count?: number,
+   *     total_count_is_estimate?: boolean
+   *   }
+   * }>}
+   */
+  getUsers: async ({
+    cursor = null,
+    pageSize = 10,
+    search = "",
+    sortBy = "newest",
+    withTotal = true,
+  } = {}) => {
     try {
       const { accessToken } = getAuth();
+      const params = { page_size: pageSize, sort_by: sortBy };
+      if (cursor) params.cursor = cursor;
+      if (search) params.search = search;
+      if (withTotal) params.with_total = true;
       const response = await axios.get(`${BASE_URL}/admin/get-users`, {
         headers: {
           Authorization: `Token ${accessToken}`,
           "Content-Type": "application/json",
         },
+        params,
       });
-      // Ensure we return an array
-      const data = response.data;
-      return Array.isArray(data) ? data : data?.users || [];
+      return response.data;
     } catch (error) {
       console.error("Error fetching users:", error);
       throw error.response?.data || error.message;
@@ -121,11 +161,14 @@ const adminApi = {
     }
   },
   /**
-   * Fetches events with pagination, search and sorting
-   * @param {number} [page=1] - Page number
-   * @param {number} [pageSize=10] - Number of items per page
-   * @param {string} [search=""] - Search query
-   * @param {string} [sortBy="-created_at"] - Sort field and direction
+   * Fetches one page of events, searched and sorted on the server
+   * @param {Object} [options]
+   * @param {string|null} [options.cursor=null] - next_cursor or previous_cursor of the page shown
+   * @param {number} [options.pageSize=10] - Number of items per page (at most 100)
+   * @param {string} [options.search=""] - Search query
+   * @param {string} [options.sortBy="newest"] - newest, oldest, name_asc, name_desc,
+   *   date_early, date_late or relevance
+   * @param {boolean} [options.withTotal=true] - Include an (approximate) total_count
    * @returns {Promise<{
    *   events: Array<{
    *     event_id: string,
@@ -149,14 +192,13 @@ const adminApi = {
    *     currency_id: string|null
    *   }>,
    *   pagination: {
-   *     current_page: number,
    *     page_size: number,
-   *     total_pages: number,
-   *     total_count: number,
    *     has_next: boolean,
    *     has_previous: boolean,
-   *     next_page: number|null,
-   *     previous_page: number|null
+   *     next_cursor: string|null,
+   *     previous_cursor: string|null,
+   *     total_count?: number,
+   *     total_count_is_estimate?: boolean
    *   },
    *   filters: {
    *     search: string,
@@ -164,25 +206,25 @@ const adminApi = {
    *   }
    * }>}
    */
-  getEvents: async (
-    page = 1,
+  getEvents: async ({
+    cursor = null,
     pageSize = 10,
     search = "",
-    sortBy = "-created_at"
-  ) => {
+    sortBy = "newest",
+    withTotal = true,
+  } = {}) => {
     try {
       const { accessToken } = getAuth();
+      const params = { page_size: pageSize, sort_by: sortBy };
+      if (cursor) params.cursor = cursor;
+      if (search) params.search = search;
+      if (withTotal) params.with_total = true;
       const response = await axios.get(`${BASE_URL}/admin/get-events`, {
         headers: {
           Authorization: `Token ${accessToken}`,
           "Content-Type": "application/json",
         },
-        params: {
-          page,
-          page_size: pageSize,
-          search,
-          sort_by: sortBy,
-        },
+        params,
       });
       return response.data;
     } catch (error) {
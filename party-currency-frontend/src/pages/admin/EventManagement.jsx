@@ -33,6 +33,9 @@ import { cn } from "@/lib/utils";
 import { toast } from "react-hot-toast";
 import EventCard from "@/components/events/EventCard";
 
+// Wait for the admin to stop typing before searching on the server
+const SEARCH_DEBOUNCE_MS = 300;
+
 // Main Component
 export default function EventManagement() {
   const [events, setEvents] = useState([]);
@@ -45,11 +48,12 @@ export default function EventManagement() {
     newStatus: null,
   });
 
-  // Pagination and filters
+  // Pagination and filters; pages are fetched with next/previous cursors
   const [currentPage, setCurrentPage] = useState(1);
   const [pagination, setPagination] = useState(null);
   const [searchTerm, setSearchTerm] = useState("");
-  const [sortBy, setSortBy] = useState("-created_at");
+  const [debouncedSearch, setDebouncedSearch] = useState("");
+  const [sortBy, setSortBy] = useState("newest");
   const pageSize = 20;
 
   // State for delivery status changes
@@ -67,9 +71,6 @@ export default function EventManagement() {
     error: null,
   });
 
-  // State for client-side filtering
-  const [allEvents, setAllEvents] = useState([]);
-
   // Delivery status options
   const deliveryStatusOptions = [
     {
@@ -95,16 +96,16 @@ export default function EventManagement() {
   ];
 
   // Fetch events
-  const fetchEvents = async (
-    page = currentPage,
-    search = searchTerm, // eslint-disable-line no-unused-vars
-    sort = sortBy
-  ) => {
+  const fetchEvents = async (cursor = null) => {
     try {
       setLoading(true);
       setError(null);
-      // Temporarily disable search parameter due to backend 'title' field error
-      const response = await adminApi.getEvents(page, pageSize, "", sort);
+      const response = await adminApi.getEvents({
+        cursor,
+        pageSize,
+        search: debouncedSearch,
+        sortBy,
+      });
 
       // Transform events to ensure postal_code is a string
       const transformedEvents = (response.events || []).map((event) => ({
@@ -112,7 +113,6 @@ export default function EventManagement() {
         postal_code: event.postal_code ? String(event.postal_code) : "",
       }));
 
-      setAllEvents(transformedEvents);
       setEvents(transformedEvents);
       setPagination(response.pagination);
     } catch (err) {
@@ -123,53 +123,50 @@ export default function EventManagement() {
     }
   };
 
-  // Initial load
   useEffect(() => {
-    fetchEvents();
-  }, []);
-
-  // Client-side search function
-  const performClientSearch = (searchValue) => {
-    if (!searchValue.trim()) {
-      setEvents(allEvents);
-      return;
-    }
-
-    const filtered = allEvents.filter(
-      (event) =>
-        event.event_name?.toLowerCase().includes(searchValue.toLowerCase()) ||
-        event.event_description
-          ?.toLowerCase()
-          .includes(searchValue.toLowerCase()) ||
-        event.event_author?.toLowerCase().includes(searchValue.toLowerCase()) ||
-        event.city?.toLowerCase().includes(searchValue.toLowerCase()) ||
-        event.state?.toLowerCase().includes(searchValue.toLowerCase()) ||
-        event.street_address?.toLowerCase().includes(searchValue.toLowerCase())
+    const timer = setTimeout(
+      () => setDebouncedSearch(searchTerm.trim()),
+      SEARCH_DEBOUNCE_MS
     );
+    return () => clearTimeout(timer);
+  }, [searchTerm]);
 
-    setEvents(filtered);
-  };
+  // Initial load, and again from the first page when the search or sort changes
+  useEffect(() => {
+    setCurrentPage(1);
+    fetchEvents();
+  }, [debouncedSearch, sortBy]);
 
   // Handle search
   const handleSearch = (value) => {
     setSearchTerm(value);
-    // Use client-side search instead of backend search
-    performClientSearch(value);
   };
 
   // Handle sort change
   const handleSortChange = (value) => {
     setSortBy(value);
-    setCurrentPage(1);
-    fetchEvents(1, searchTerm, value);
   };
 
   // Handle page change
-  const handlePageChange = (page) => {
-    setCurrentPage(page);
-    fetchEvents(page, searchTerm, sortBy);
+  const handleNextPage = () => {
+    if (!pagination?.next_cursor) return;
+    setCurrentPage((page) => page + 1);
+    fetchEvents(pagination.next_cursor);
+  };
+
+  const handlePreviousPage = () => {
+    if (!pagination?.previous_cursor) return;
+    setCurrentPage((page) => Math.max(page - 1, 1));
+    fetchEvents(pagination.previous_cursor);
   };
 
+  const totalCount = pagination?.total_count;
+  const approximate = pagination?.total_count_is_estimate ? "~" : "";
+  const totalPages =
+    typeof totalCount === "number"
+      ? Math.max(Math.ceil(totalCount / pageSize), currentPage)
+      : null;
+
   // Handle admin section toggle
   const toggleAdminSection = (eventId) => {
     setExpandedAdminSections((prev) => ({
@@ -288,10 +285,11 @@ export default function EventManagement() {
               Manage event deliveries and author information
             </p>
           </div>
-          {pagination && (
+          {typeof totalCount === "number" && (
             <div className="bg-bluePrimary/10 px-3 py-1.5 rounded-lg border border-bluePrimary/20">
               <span className="text-sm font-medium text-bluePrimary">
-                {pagination.total_count} total events
+                {approximate}
+                {totalCount} total events
               </span>
             </div>
           )}
@@ -314,12 +312,13 @@ export default function EventManagement() {
                   <SlidersHorizontal className="w-4 h-4 text-gray-500" />
                 </SelectTrigger>
                 <SelectContent align="end">
-                  <SelectItem value="-created_at">Newest First</SelectItem>
-                  <SelectItem value="created_at">Oldest First</SelectItem>
-                  <SelectItem value="event_name">Name A-Z</SelectItem>
-                  <SelectItem value="-event_name">Name Z-A</SelectItem>
-                  <SelectItem value="start_date">Start Date (Early)</SelectItem>
-                  <SelectItem value="-start_date">Start Date (Late)</SelectItem>
+                  <SelectItem value="newest">Newest First</SelectItem>
+                  <SelectItem value="oldest">Oldest First</SelectItem>
+                  <SelectItem value="name_asc">Name A-Z</SelectItem>
+                  <SelectItem value="name_desc">Name Z-A</SelectItem>
+                  <SelectItem value="date_early">Start Date (Early)</SelectItem>
+                  <SelectItem value="date_late">Start Date (Late)</SelectItem>
+                  <SelectItem value="relevance">Best Match</SelectItem>
                 </SelectContent>
               </Select>
             </div>
@@ -501,76 +500,38 @@ export default function EventManagement() {
         )}
 
         {/* Pagination */}
-        {pagination && pagination.total_pages > 1 && (
+        {pagination && (pagination.has_next || pagination.has_previous) && (
           <Card className="p-3 sm:p-4 border-bluePrimary/20 bg-gradient-to-r from-bluePrimary/5 to-gold/5">
             <div className="flex flex-col sm:flex-row justify-between items-center gap-3 sm:gap-4">
               <div className="text-xs sm:text-sm text-gray-600 order-2 sm:order-1">
-                Page {pagination.current_page} of {pagination.total_pages}
-                <span className="hidden sm:inline">
-                  {" "}
-                  • {pagination.total_count} total events
-                </span>
+                Page {currentPage}
+                {totalPages ? ` of ${approximate}${totalPages}` : ""}
+                {typeof totalCount === "number" && (
+                  <span className="hidden sm:inline">
+                    {" "}
+                    • {approximate}
+                    {totalCount} total events
+                  </span>
+                )}
               </div>
 
               <div className="flex items-center gap-1 sm:gap-2 order-1 sm:order-2">
                 <Button
                   variant="outline"
                   size="sm"
-                  onClick={() => handlePageChange(pagination.current_page - 1)}
-                  disabled={!pagination.has_previous}
+                  onClick={handlePreviousPage}
+                  disabled={!pagination.has_previous || loading}
                   className="h-8 px-2 sm:px-3 text-xs border-bluePrimary/30 text-bluePrimary hover:bg-bluePrimary/10"
                 >
                   <ChevronLeft className="w-3 h-3 sm:mr-1" />
                   <span className="hidden sm:inline">Previous</span>
                 </Button>
 
-                <div className="flex items-center gap-1">
-                  {Array.from(
-                    { length: Math.min(5, pagination.total_pages) },
-                    (_, i) => {
-                      let pageNum;
-                      if (pagination.total_pages <= 5) {
-                        pageNum = i + 1;
-                      } else if (pagination.current_page <= 3) {
-                        pageNum = i + 1;
-                      } else if (
-                        pagination.current_page >=
-                        pagination.total_pages - 2
-                      ) {
-                        pageNum = pagination.total_pages - 4 + i;
-                      } else {
-                        pageNum = pagination.current_page - 2 + i;
-                      }
-
-                      return (
-                        <Button
-                          key={pageNum}
-                          variant={
-                            pageNum === pagination.current_page
-                              ? "default"
-                              : "outline"
-                          }
-                          size="sm"
-                          onClick={() => handlePageChange(pageNum)}
-                          className={cn(
-                            "w-7 h-7 p-0 text-xs",
-                            pageNum === pagination.current_page
-                              ? "bg-bluePrimary hover:bg-bluePrimary/90"
-                              : "border-bluePrimary/30 text-bluePrimary hover:bg-bluePrimary/10"
-                          )}
-                        >
-                          {pageNum}
-                        </Button>
-                      );
-                    }
-                  )}
-                </div>
-
                 <Button
                   variant="outline"
                   size="sm"
-                  onClick={() => handlePageChange(pagination.current_page + 1)}
-                  disabled={!pagination.has_next}
+                  onClick={handleNextPage}
+                  disabled={!pagination.has_next || loading}
                   className="h-8 px-2 sm:px-3 text-xs border-bluePrimary/30 text-bluePrimary hover:bg-bluePrimary/10"
                 >
                   <span className="hidden sm:inline">Next</span>
@@ -17,7 +17,14 @@ import {
   ChevronLeft,
   ChevronRight,
   Users2,
+  SlidersHorizontal,
 } from "lucide-react";
+import {
+  Select,
+  SelectContent,
+  SelectItem,
+  SelectTrigger,
+} from "@/components/ui/select";
 import { ActionMenu } from "@/components/admin/ActionMenu";
 import {
   DeleteDialog,
@@ -27,9 +34,18 @@ import {
 import adminApi from "@/api/adminApi";
 import { cn } from "@/lib/utils";
 
+const ITEMS_PER_PAGE = 10;
+// Wait for the admin to stop typing before searching on the server
+const SEARCH_DEBOUNCE_MS = 300;
+
 export default function UserManagement() {
   const [searchQuery, setSearchQuery] = useState("");
+  const [debouncedSearch, setDebouncedSearch] = useState("");
+  const [sortBy, setSortBy] = useState("newest");
+  // The listing is paged with cursors: remember the one the current page was fetched with
+  const [currentCursor, setCurrentCursor] = useState(null);
   const [currentPage, setCurrentPage] = useState(1);
+  const [pagination, setPagination] = useState(null);
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState(null);
   const [selectedUser, setSelectedUser] = useState(null);
@@ -39,24 +55,20 @@ export default function UserManagement() {
   const [loadingAction, setLoadingAction] = useState(null);
   const [actionError, setActionError] = useState(null);
   const [users, setUsers] = useState([]);
-  const [filteredUsers, setFilteredUsers] = useState([]);
-  const ITEMS_PER_PAGE = 10;
 
   useEffect(() => {
-    fetchUsers();
-  }, []); // Remove currentPage dependency since we'll handle pagination client-side
+    const timer = setTimeout(
+      () => setDebouncedSearch(searchQuery.trim()),
+      SEARCH_DEBOUNCE_MS
+    );
+    return () => clearTimeout(timer);
+  }, [searchQuery]);
 
   useEffect(() => {
-    // Filter and paginate users when search query changes
-    const filtered = users.filter(
-      (user) =>
-        user?.email?.toLowerCase().includes(searchQuery.toLowerCase()) ||
-        user?.name?.toLowerCase().includes(searchQuery.toLowerCase()) ||
-        user?.role?.toLowerCase().includes(searchQuery.toLowerCase())
-    );
-    setFilteredUsers(filtered);
-    setCurrentPage(1); // Reset to first page when search changes
-  }, [searchQuery, users]);
+    // A new search or sort order starts again from the first page
+    setCurrentPage(1);
+    fetchUsers(null);
+  }, [debouncedSearch, sortBy]);
 
   const formatDate = (timestamp) => {
     if (!timestamp) return "--";
@@ -76,38 +88,38 @@ export default function UserManagement() {
     }
   };
 
-  const fetchUsers = async () => {
+  const fetchUsers = async (cursor = currentCursor) => {
     setLoading(true);
     setError(null);
     try {
-      const response = await adminApi.getUsers();
+      const response = await adminApi.getUsers({
+        cursor,
+        pageSize: ITEMS_PER_PAGE,
+        search: debouncedSearch,
+        sortBy,
+      });
 
       // Transform the data to match our needs
-      const transformedData = Array.isArray(response)
-        ? response
-        : response?.users || [];
-      const formattedUsers = transformedData.map((user) => {
+      const formattedUsers = (response?.users || []).map((user) => {
         return {
           id: user.username, // Use username as ID since it's the unique identifier
-          email: user.username,
-          name: user.name || "--",
+          email: user.email || user.username,
+          name: user.name?.trim() || "--",
           role: user.role?.toLowerCase() || "--",
           status: user.isActive ? "Active" : "Inactive",
           last_activity: formatDate(user.last_login),
-          total_transaction:
-            typeof user.total_transaction === "number"
-              ? `₦${user.total_transaction.toLocaleString()}`
-              : "₦0",
+          total_transaction: user.total_amount || "₦0.00",
         };
       });
 
       setUsers(formattedUsers);
-      setFilteredUsers(formattedUsers);
+      setPagination(response?.pagination || null);
+      setCurrentCursor(cursor);
     } catch (err) {
       console.error("Error fetching users:", err);
-      setError(err.message || "Failed to load users");
+      setError(err.error || err.message || "Failed to load users");
       setUsers([]);
-      setFilteredUsers([]);
+      setPagination(null);
     } finally {
       setLoading(false);
     }
@@ -249,15 +261,23 @@ export default function UserManagement() {
     return actions;
   };
 
-  const handlePageChange = (page) => {
-    setCurrentPage(page);
+  const handleNextPage = () => {
+    if (!pagination?.next_cursor) return;
+    setCurrentPage((page) => page + 1);
+    fetchUsers(pagination.next_cursor);
   };
 
-  // Calculate pagination
-  const totalPages = Math.ceil(filteredUsers.length / ITEMS_PER_PAGE);
-  const startIndex = (currentPage - 1) * ITEMS_PER_PAGE;
-  const endIndex = startIndex + ITEMS_PER_PAGE;
-  const currentUsers = filteredUsers.slice(startIndex, endIndex);
+  const handlePreviousPage = () => {
+    if (!pagination?.previous_cursor) return;
+    setCurrentPage((page) => Math.max(page - 1, 1));
+    fetchUsers(pagination.previous_cursor);
+  };
+
+  const totalCount = pagination?.total_count;
+  const totalPages =
+    typeof totalCount === "number"
+      ? Math.max(Math.ceil(totalCount / ITEMS_PER_PAGE), currentPage)
+      : null;
 
   const EmptyState = () => (
     <div className="text-center py-8 sm:py-12">
@@ -324,17 +344,34 @@ export default function UserManagement() {
 
         <div className="bg-white rounded-lg shadow overflow-hidden">
           <div className="p-3 sm:p-6 border-b">
-            <div className="flex items-center justify-between">
+            <div className="flex items-center justify-between gap-2">
               <div className="relative w-full sm:w-auto">
                 <Search className="absolute left-3 top-1/2 transform -translate-y-1/2 text-gray-400 h-3 w-3 sm:h-4 sm:w-4" />
                 <Input
                   type="text"
-                  placeholder="Name, Email, Role..."
+                  placeholder="Name, Email, Username..."
                   value={searchQuery}
                   onChange={(e) => setSearchQuery(e.target.value)}
                   className="pl-8 sm:pl-10 h-8 sm:h-auto text-sm sm:text-base"
                 />
               </div>
+              <Select value={sortBy} onValueChange={setSortBy}>
+                <SelectTrigger className="w-8 h-8 border-0 bg-transparent hover:bg-gray-100 p-0 focus:ring-0 focus:ring-offset-0">
+                  <SlidersHorizontal className="w-4 h-4 text-gray-500" />
+                </SelectTrigger>
+                <SelectContent align="end">
+                  <SelectItem value="newest">Newest First</SelectItem>
+                  <SelectItem value="oldest">Oldest First</SelectItem>
+                  <SelectItem value="username_asc">Username A-Z</SelectItem>
+                  <SelectItem value="username_desc">Username Z-A</SelectItem>
+                  <SelectItem value="spend_high">Highest Spend</SelectItem>
+                  <SelectItem value="spend_low">Lowest Spend</SelectItem>
+                  <SelectItem value="transactions_high">
+                    Most Transactions
+                  </SelectItem>
+                  <SelectItem value="relevance">Best Match</SelectItem>
+                </SelectContent>
+              </Select>
             </div>
           </div>
 
@@ -342,7 +379,7 @@ export default function UserManagement() {
             <LoadingState />
           ) : error ? (
             <div className="p-4 sm:p-6 text-center text-red-500 text-sm sm:text-base">{error}</div>
-          ) : !currentUsers || currentUsers.length === 0 ? (
+          ) : users.length === 0 ? (
             <EmptyState />
           ) : (
             <div className="overflow-x-auto">
@@ -361,7 +398,7 @@ export default function UserManagement() {
                   </TableRow>
                 </TableHeader>
                 <TableBody>
-                  {currentUsers.map((user) => (
+                  {users.map((user) => (
                     <TableRow key={user.id}>
                       <TableCell className="text-left pl-3 sm:pl-10 py-2 sm:py-4 text-xs sm:text-sm">
                         <div className="truncate max-w-[120px] sm:max-w-none" title={user.name}>
@@ -414,65 +451,36 @@ export default function UserManagement() {
             </div>
           )}
 
-          {!loading && !error && filteredUsers.length > 0 && (
+          {!loading && !error && users.length > 0 && (
             <div className="p-3 sm:p-4 flex flex-col sm:flex-row items-center justify-center gap-2 sm:gap-2">
               <div className="flex items-center gap-1 sm:gap-2 order-2 sm:order-1">
-              <Button
-                variant="outline"
-                size="sm"
-                onClick={() => handlePageChange(currentPage - 1)}
-                disabled={currentPage === 1 || loading}
-                  className="text-gray-600 hover:bg-gray-100 h-7 sm:h-auto px-2 sm:px-3"
-              >
-                  <ChevronLeft className="h-3 w-3 sm:h-4 sm:w-4" />
-              </Button>
-
-                <div className="flex items-center gap-1">
-                  {[...Array(Math.min(totalPages, 5))].map((_, i) => {
-                    let pageNum;
-                    if (totalPages <= 5) {
-                      pageNum = i + 1;
-                    } else if (currentPage <= 3) {
-                      pageNum = i + 1;
-                    } else if (currentPage >= totalPages - 2) {
-                      pageNum = totalPages - 4 + i;
-                    } else {
-                      pageNum = currentPage - 2 + i;
-                    }
-
-                    return (
                 <Button
-                        key={pageNum}
                   variant="outline"
                   size="sm"
-                        onClick={() => handlePageChange(pageNum)}
-                        className={cn(
-                          "w-6 h-6 sm:w-auto sm:h-auto p-0 sm:px-3 text-xs sm:text-sm",
-                          currentPage === pageNum
-                      ? "bg-bluePrimary text-white hover:bg-bluePrimary/90"
-                      : "text-gray-600 hover:bg-gray-100"
-                        )}
-                  disabled={loading}
+                  onClick={handlePreviousPage}
+                  disabled={!pagination?.has_previous || loading}
+                  className="text-gray-600 hover:bg-gray-100 h-7 sm:h-auto px-2 sm:px-3"
                 >
-                        {pageNum}
+                  <ChevronLeft className="h-3 w-3 sm:h-4 sm:w-4" />
                 </Button>
-                    );
-                  })}
-                </div>
-
-              <Button
-                variant="outline"
-                size="sm"
-                onClick={() => handlePageChange(currentPage + 1)}
-                disabled={currentPage === totalPages || loading}
+
+                <Button
+                  variant="outline"
+                  size="sm"
+                  onClick={handleNextPage}
+                  disabled={!pagination?.has_next || loading}
                   className="text-gray-600 hover:bg-gray-100 h-7 sm:h-auto px-2 sm:px-3"
-              >
+                >
                   <ChevronRight className="h-3 w-3 sm:h-4 sm:w-4" />
-              </Button>
+                </Button>
               </div>
-              
+
               <div className="text-xs sm:text-sm text-gray-600 order-1 sm:order-2">
-                Page {currentPage} of {totalPages} • {filteredUsers.length} users
+                Page {currentPage}
+                {totalPages ? ` of ${pagination.total_count_is_estimate ? "~" : ""}${totalPages}` : ""}
+                {typeof totalCount === "number"
+                  ? ` • ${pagination.total_count_is_estimate ? "~" : ""}${totalCount.toLocaleString()} users`
+                  : ""}
               </div>
             </div>
           )}
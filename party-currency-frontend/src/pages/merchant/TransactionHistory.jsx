@@ -53,6 +53,9 @@ const demoTransactions = [
   }
 ];
 
+const SYNC_RETRY_MS = 3000;
+const SYNC_MAX_RETRIES = 5;
+
 export default function TransactionHistory() {
   const [searchQuery, setSearchQuery] = useState("");
   const [isMobileMenuOpen, setIsMobileMenuOpen] = useState(false);
@@ -63,6 +66,24 @@ export default function TransactionHistory() {
   const [accountReference, setAccountReference] = useState("");
 
   useEffect(() => {
+    let syncRetryTimer;
+    let syncRetries = 0;
+
+    // A newly created account is mirrored in the background, so poll until
+    // the server stops reporting it as syncing.
+    const loadTransactions = async (reference) => {
+      const transactionData = await fetchTransactions(reference);
+      setTransactions(transactionData.transactions || []);
+      if (transactionData.syncing && syncRetries < SYNC_MAX_RETRIES) {
+        syncRetries += 1;
+        syncRetryTimer = setTimeout(() => {
+          loadTransactions(reference).catch((error) => {
+            console.error("Error refreshing transactions:", error);
+          });
+        }, SYNC_RETRY_MS);
+      }
+    };
+
     const loadTransactionData = async () => {
       try {
         setLoading(true);
@@ -73,8 +94,7 @@ export default function TransactionHistory() {
           setAccountReference(accountData.account_reference);
           
           // Use the account reference to fetch transactions
-          const transactionData = await fetchTransactions(accountData.account_reference);
-          setTransactions(transactionData.transactions || []);
+          await loadTransactions(accountData.account_reference);
         } else {
           setError("No virtual account found");
         }
@@ -94,6 +114,7 @@ export default function TransactionHistory() {
 
     window.addEventListener('sidebarStateChange', handleSidebarStateChange);
     return () => {
+      clearTimeout(syncRetryTimer);
       window.removeEventListener('sidebarStateChange', handleSidebarStateChange);
     };
   }, []);